@@ -1,6 +1,5 @@
 import streamlit as st
 import sys
-import joblib
 import utils.func
 import os
 
@@ -11,24 +10,26 @@ st.set_page_config(
 )
 
 #========== LOAD MÔ HÌNH ĐẦU TIÊN =======================
-df_balanced_2_label = utils.func.load_data()
 BASE_DIR = os.path.dirname(__file__)  # lấy đường dẫn thư mục hiện tại (predictApp)
 
 model_file = os.path.join(BASE_DIR, "lr_model_2label.pkl")
 vectorizer_file = os.path.join(BASE_DIR, "count_2label.pkl")
-# Nếu mô hình chưa được huấn luyện và lưu, ta sẽ huấn luyện và lưu mô hình
-#model_file = 'lr_model_2label.pkl'
-#vectorizer_file = 'count_2label.pkl'
-
-# Nếu mô hình đã tồn tại, tải mô hình và vectorizer đã lưu
-try:
-    model = joblib.load(model_file)
-    vectorizer = joblib.load(vectorizer_file)
-except FileNotFoundError:
-    # Nếu chưa có mô hình, huấn luyện và lưu lại
-    model, vectorizer = utils.func.train_model(df_balanced_2_label)
-    joblib.dump(model, model_file)
-    joblib.dump(vectorizer, vectorizer_file)
+artifact_dir = os.path.join(BASE_DIR, utils.func.ARTIFACT_DIR)
+
+# Nếu chưa có artifact model: chuyển từ pickle cũ (một lần), hoặc huấn luyện nếu pickle cũng chưa có
+if not os.path.exists(os.path.join(artifact_dir, utils.func.MANIFEST_FILE)):
+    try:
+        model, vectorizer = utils.func.load_model(artifact_dir, model_file, vectorizer_file)
+        metadata = {"converted_from": ["lr_model_2label.pkl", "count_2label.pkl"]}
+    except FileNotFoundError:
+        # Nếu chưa có mô hình, huấn luyện và lưu lại (chỉ lúc này mới cần dữ liệu huấn luyện)
+        df_balanced_2_label = utils.func.load_data()
+        model, vectorizer = utils.func.train_model(df_balanced_2_label)
+        metadata = {"trained_on_rows": len(df_balanced_2_label)}
+    utils.func.save_model(model, vectorizer, artifact_dir, metadata)
+
+# Mở endpoint /metrics nếu có METRICS_PORT (một lần cho cả tiến trình)
+utils.func.get_metrics_server()
 
 # Load danh sách từ cấm
 bad_words = utils.func.load_bad_words("bad_words.txt")
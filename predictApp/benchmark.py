@@ -0,0 +1,501 @@
+# benchmark.py
+# Bộ đo hiệu năng cho toàn bộ đường dự đoán.
+#
+#   python benchmark.py clean    [--file data_test_file.csv] [--repeat 3] [--workers 4]
+#       So sánh clean_data từng dòng, clean_batch theo lô và clean_parallel (kết quả phải giống hệt).
+#
+#   python benchmark.py pipeline [--sizes 1000,100000,1000000] [--output bench.json] [--compare old.json]
+#                                [--translator stub --translator-latency-ms 0] [--profile cprofile]
+#       Đo từng bước: dịch (translator giả lập, không cần mạng), regex, word_tokenize,
+#       vectorizer.transform, model.predict, FastScorer, đọc/ghi CSV; độ trễ p50/p90/p99 mỗi dòng,
+#       thông lượng theo lô, RSS đỉnh, thời gian load model lần đầu / lần sau.
+#       Mỗi kho dữ liệu được đo trong một tiến trình mới, nên RSS đỉnh là của riêng kho đó.
+#
+#   python benchmark.py memory   [--workers 4] [--vocab-size 1000000]
+#       Chạy N tiến trình worker cùng lúc cho mỗi cách load model (pickle joblib, artifact + dict,
+#       artifact + từ điển gọn mmap, FastScorer) và đo RSS / bộ nhớ riêng (Private) / PSS của mỗi worker.
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import tempfile
+import subprocess
+import multiprocessing
+import numpy as np
+import pandas as pd
+import utils.func
+import utils.parallel
+import utils.translate
+
+
+# ====== clean: clean_data / clean_batch / clean_parallel ======
+def bench_clean_data(texts):
+    return [utils.func.clean_data(text) for text in texts]
+
+
+def bench_clean_batch(texts):
+    return utils.func.clean_batch(texts).tolist()
+
+
+def bench_clean_parallel(texts, workers):
+    return utils.parallel.clean_parallel(texts, workers=workers).tolist()
+
+
+def run(fn, texts, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(texts)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main_clean(args):
+    texts = pd.read_csv(args.file)[args.column].tolist()
+    # Gọi một lần để underthesea nạp mô hình CRF, tránh tính vào lần đo đầu tiên
+    utils.func.clean_data("khởi động")
+
+    expected, t_row = run(bench_clean_data, texts, args.repeat)
+    actual, t_batch = run(bench_clean_batch, texts, args.repeat)
+    # Khởi động pool trước để không tính thời gian nạp tokenizer của các tiến trình con
+    utils.parallel.clean_parallel(texts, workers=args.workers)
+    parallel, t_parallel = run(lambda t: bench_clean_parallel(t, args.workers), texts, args.repeat)
+
+    mismatches = sum(
+        1 for a, b, c in zip(expected, actual, parallel) if not (a.split() == b.split() == c.split())
+    )
+    print(f"Số dòng: {len(texts)}")
+    print(f"clean_data  : {len(texts) / t_row:10.1f} dòng/giây ({t_row:.3f}s)")
+    print(f"clean_batch : {len(texts) / t_batch:10.1f} dòng/giây ({t_batch:.3f}s)")
+    print(f"clean_parallel ({args.workers} tiến trình): {len(texts) / t_parallel:10.1f} dòng/giây ({t_parallel:.3f}s)")
+    print(f"Tăng tốc    : x{t_row / t_batch:.2f} (batch), x{t_row / t_parallel:.2f} (parallel)")
+    print(f"Khác biệt   : {mismatches} dòng")
+    if mismatches:
+        raise SystemExit(1)
+
+
+# ====== pipeline: công cụ đo ======
+def make_translator(name, latency_ms=0.0):
+    # Translator cắm được: "stub" giữ nguyên văn bản (có thể giả lập độ trễ mạng),
+    # "google" gọi Google Translate thật
+    if name == "google":
+        return utils.translate.google_translate_batch
+
+    def stub(texts):
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+        return list(texts)
+    return stub
+
+
+def synthetic_corpus(base_texts, size, seed=42):
+    # Ghép ngẫu nhiên các câu thật để có kho dữ liệu lớn với phân bố độ dài tương tự
+    rng = random.Random(seed)
+    sentences = [s.strip() for t in base_texts for s in str(t).replace("\n", ". ").split(".") if s.strip()]
+    corpus = []
+    for _ in range(size):
+        k = rng.choice((1, 1, 2, 3))
+        corpus.append(". ".join(rng.choice(sentences) for _ in range(k)))
+    return corpus
+
+
+def percentiles(durations):
+    ms = np.asarray(durations) * 1000
+    return {
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+
+def peak_rss_mb():
+    # ru_maxrss tính bằng KB trên Linux, byte trên macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class Profiler:
+    # Bọc mỗi bước bằng cProfile (.prof, xem bằng snakeviz / flameprof) hoặc pyinstrument (.html)
+    def __init__(self, kind, output_dir):
+        self.kind = kind
+        self.output_dir = output_dir
+        if kind:
+            os.makedirs(output_dir, exist_ok=True)
+
+    def run(self, name, fn, *args):
+        if self.kind == "cprofile":
+            import cProfile
+            profiler = cProfile.Profile()
+            result = profiler.runcall(fn, *args)
+            profiler.dump_stats(os.path.join(self.output_dir, f"{name}.prof"))
+            return result
+        if self.kind == "pyinstrument":
+            from pyinstrument import Profiler as PyProfiler
+            profiler = PyProfiler()
+            profiler.start()
+            try:
+                return fn(*args)
+            finally:
+                profiler.stop()
+                with open(os.path.join(self.output_dir, f"{name}.html"), "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html())
+        return fn(*args)
+
+
+def measure_model_load():
+    # Lần đầu: tiến trình Python mới (tính cả import); lần sau: load lại trong cùng tiến trình
+    code = (
+        "import time; t = time.perf_counter(); import utils.artifact as a; a.load_artifact(); "
+        "print(time.perf_counter() - t)"
+    )
+    legacy = (
+        "import time; t = time.perf_counter(); import joblib; "
+        "joblib.load('lr_model_2label.pkl'); joblib.load('count_2label.pkl'); print(time.perf_counter() - t)"
+    )
+    result = {}
+    for name, snippet in [("artifact", code), ("joblib_pickle", legacy)]:
+        try:
+            out = subprocess.run([sys.executable, "-c", snippet], capture_output=True, text=True,
+                                 check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+            result[f"{name}_cold_ms"] = float(out.stdout.strip().splitlines()[-1]) * 1000
+        except (subprocess.CalledProcessError, ValueError, IndexError):
+            result[f"{name}_cold_ms"] = None
+    start = time.perf_counter()
+    utils.func.load_model()
+    result["artifact_warm_ms"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def bench_corpus(texts, translator, sample_size, tokenize_rows, profiler, label, model=None):
+    from utils.scorer import FastScorer
+    model, vectorizer = model or utils.func.load_model()
+    scorer = FastScorer.from_sklearn(model, vectorizer)
+    sample = texts[:sample_size]
+
+    # --- Độ trễ từng dòng (mô phỏng trang dự đoán một bình luận) ---
+    per_row = {name: [] for name in ("translate", "regex", "tokenize", "vectorize", "predict", "fast_scorer")}
+    for text in sample:
+        start = time.perf_counter()
+        utils.translate.translate_batch([text], translator=translator)
+        t1 = time.perf_counter()
+        normalized = utils.func.normalize_text(text)
+        t2 = time.perf_counter()
+        cleaned = utils.func.word_tokenize(normalized, format="text")
+        t3 = time.perf_counter()
+        features = vectorizer.transform([cleaned])
+        t4 = time.perf_counter()
+        model.predict(features)
+        t5 = time.perf_counter()
+        scorer.predict_one(cleaned)
+        t6 = time.perf_counter()
+        for name, value in zip(per_row, (t1 - start, t2 - t1, t3 - t2, t4 - t3, t5 - t4, t6 - t5)):
+            per_row[name].append(value)
+    latency = {name: percentiles(values) for name, values in per_row.items()}
+
+    # --- Thông lượng theo lô (mô phỏng trang gán nhãn file) ---
+    throughput = {}
+
+    def timed(name, rows, fn, *args):
+        start = time.perf_counter()
+        result = profiler.run(f"{label}_{name}", fn, *args)
+        seconds = time.perf_counter() - start
+        throughput[name] = {"rows": rows, "seconds": seconds, "rows_per_sec": rows / seconds if seconds else None}
+        return result
+
+    timed("translate", len(texts), utils.translate.translate_batch, texts, translator)
+    normalized = timed("regex", len(texts), utils.func.normalize_batch, texts)
+    # word_tokenize chậm (~vài trăm dòng/giây): tokenize_rows > 0 thì chỉ tách từ N dòng đầu
+    # và mọi bước sau chỉ chạy trên N dòng đó, để vectorizer / model luôn nhận đúng văn bản như thật
+    if tokenize_rows and tokenize_rows < len(texts):
+        normalized = normalized[:tokenize_rows]
+    cleaned = timed("tokenize", len(normalized), utils.func.tokenize_batch, normalized)
+    rows = len(cleaned)
+    features = timed("vectorize", rows, vectorizer.transform, cleaned)
+    predictions = timed("predict", rows, model.predict, features)
+    timed("fast_scorer", rows, scorer.predict, cleaned)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.csv")
+        df = pd.DataFrame({"content": texts[:rows], "clean_content": cleaned.values, "sentiment": predictions})
+        timed("csv_write", len(df), lambda: df.to_csv(path, index=False, encoding="utf-8-sig"))
+        timed("csv_read", len(df), pd.read_csv, path)
+
+    return {"rows": len(texts), "latency": latency, "throughput": throughput}
+
+
+def corpus_worker(conn, options, name, size):
+    # Chạy trong tiến trình mới (spawn): ru_maxrss chỉ tính kho dữ liệu này, không cộng dồn các kho trước.
+    # RSS gốc = sau khi import, load model và nạp tokenizer, trước khi dựng kho dữ liệu.
+    try:
+        base_texts = pd.read_csv(options["file"])[options["column"]].dropna().astype(str).tolist()
+        model = utils.func.load_model()
+        utils.func.clean_data("khởi động")
+        baseline = peak_rss_mb()
+        texts = synthetic_corpus(base_texts, size) if size else base_texts
+        translator = make_translator(options["translator"], options["translator_latency_ms"])
+        profiler = Profiler(options["profile"], options["profile_dir"])
+        result = bench_corpus(texts, translator, options["sample"], options["tokenize_rows"], profiler, name, model)
+        peak = peak_rss_mb()
+        result.update({"baseline_rss_mb": baseline, "peak_rss_mb": peak, "rss_delta_mb": peak - baseline})
+        conn.send(result)
+    except BaseException as e:
+        conn.send({"error": repr(e)})
+        raise
+    finally:
+        conn.close()
+
+
+def bench_corpus_isolated(options, name, size):
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    # Không dùng Pool: tiến trình daemon không được tạo tiến trình con (clean_parallel, profiler)
+    process = context.Process(target=corpus_worker, args=(sender, options, name, size))
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = {"error": f"tiến trình đo {name} dừng với mã {process.exitcode}"}
+    process.join()
+    if "error" in result:
+        raise RuntimeError(f"{name}: {result['error']}")
+    return result
+
+
+def compare(current, previous, threshold=0.10):
+    # In các bước chậm đi quá threshold so với lần đo trước
+    regressions = []
+    for corpus, result in current["corpora"].items():
+        old = previous.get("corpora", {}).get(corpus)
+        if not old:
+            continue
+        for stage, stats in result["throughput"].items():
+            before = old["throughput"].get(stage, {}).get("rows_per_sec")
+            after = stats["rows_per_sec"]
+            if before and after and after < before * (1 - threshold):
+                regressions.append(f"{corpus}/{stage}: {before:.0f} -> {after:.0f} dòng/giây")
+        for stage, stats in result["latency"].items():
+            before = old["latency"].get(stage, {}).get("p90_ms")
+            if before and stats["p90_ms"] > before * (1 + threshold):
+                regressions.append(f"{corpus}/{stage}: p90 {before:.3f} -> {stats['p90_ms']:.3f} ms")
+    return regressions
+
+
+def main_pipeline(args):
+    options = {name: getattr(args, name) for name in ("file", "column", "sample", "tokenize_rows", "translator",
+                                                       "translator_latency_ms", "profile", "profile_dir")}
+    # Kho dữ liệu được dựng trong tiến trình đo của nó; ở đây chỉ giữ kích thước
+    corpora = {"data_test_file": None}
+    for size in [int(s) for s in args.sizes.split(",") if s and int(s) > 0]:
+        corpora[f"synthetic_{size}"] = size
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "translator": args.translator,
+        "model_load": measure_model_load(),
+        "corpora": {},
+    }
+    for name, size in corpora.items():
+        print(f"⏱️ Đang đo {name}...")
+        report["corpora"][name] = bench_corpus_isolated(options, name, size)
+
+    for name, result in report["corpora"].items():
+        print(f"\n== {name}: {result['rows']} dòng, RSS đỉnh {result['peak_rss_mb']:.0f} MB "
+              f"(+{result['rss_delta_mb']:.0f} MB so với sau khi load model)")
+        for stage, stats in result["latency"].items():
+            print(f"  {stage:<12} p50 {stats['p50_ms']:8.3f} ms  p90 {stats['p90_ms']:8.3f} ms  "
+                  f"p99 {stats['p99_ms']:8.3f} ms")
+        for stage, stats in result["throughput"].items():
+            print(f"  {stage:<12} {stats['rows_per_sec'] or 0:12.0f} dòng/giây ({stats['rows']} dòng)")
+    print(f"\nLoad model: {report['model_load']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 Kết quả -> {args.output}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"⚠️ Chậm hơn: {line}")
+        if regressions:
+            raise SystemExit(1)
+
+
+# ====== memory: bộ nhớ của mỗi worker ======
+MEMORY_MODES = {
+    "pickle": "import joblib; model = joblib.load({model_file!r}); vectorizer = joblib.load({vectorizer_file!r})",
+    "artifact_dict": "model, vectorizer = utils.artifact.load_artifact({artifact_dir!r}, compact=False)",
+    "artifact_compact": "model, vectorizer = utils.artifact.load_artifact({artifact_dir!r}, compact=True)",
+    "fast_scorer": "from utils.scorer import FastScorer; "
+                   "scorer = FastScorer.from_sklearn(*utils.artifact.load_artifact({artifact_dir!r}, compact=True))",
+}
+
+# Worker: import giống nhau cho mọi chế độ, tự đo trước / sau khi load / sau khi dự đoán thử,
+# rồi chờ (giữ nguyên bộ nhớ) cho đến khi tiến trình cha đóng stdin
+MEMORY_WORKER = """
+import sys, json, csv
+import numpy, scipy.sparse, sklearn.linear_model, sklearn.feature_extraction.text
+import utils.artifact
+def rollup():
+    values = {{}}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1])
+    return values
+with open("data_test_file.csv", encoding="utf-8") as f:
+    texts = [row["content"].lower() for row in csv.DictReader(f)]
+before = rollup()
+{load}
+loaded = rollup()
+if "scorer" in dir():
+    scorer.predict(texts)
+else:
+    model.predict(vectorizer.transform(texts))
+print(json.dumps([before, loaded, rollup()]), flush=True)
+sys.stdin.read()
+"""
+
+
+def read_rollup(pid):
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1])
+    return values
+
+
+def _private(values):
+    return values.get("Private_Clean", 0) + values.get("Private_Dirty", 0)
+
+
+def measure_workers(mode, workers, paths):
+    # Các worker chạy đồng thời nên PSS chia đều trang dùng chung (mmap) cho số worker
+    code = MEMORY_WORKER.format(load=MEMORY_MODES[mode].format(**paths))
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    procs = [subprocess.Popen([sys.executable, "-c", code], cwd=cwd, text=True,
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+             for _ in range(workers)]
+    try:
+        reports = [json.loads(p.stdout.readline()) for p in procs]
+        finals = [read_rollup(p.pid) for p in procs]
+    finally:
+        for p in procs:
+            p.stdin.close()
+            p.wait()
+
+    def mean_mb(values):
+        return float(np.mean(values)) / 1024
+
+    return {
+        "workers": workers,
+        "rss_mb_load": mean_mb([loaded["Rss"] - before["Rss"] for before, loaded, _ in reports]),
+        "private_mb_load": mean_mb([_private(loaded) - _private(before) for before, loaded, _ in reports]),
+        "private_mb_predict": mean_mb([_private(after) - _private(before) for before, _, after in reports]),
+        "pss_mb_total": sum(final["Pss"] - before["Pss"] for (before, _, _), final in zip(reports, finals)) / 1024,
+    }
+
+
+def synthetic_model(vocab_size, output_dir):
+    # Model sklearn giả với vocab_size token (như CountVectorizer ngram_range=(1, 2) trên dữ liệu lớn),
+    # lưu cả dạng pickle joblib lẫn artifact để so sánh
+    import joblib
+    import utils.artifact
+    from sklearn.feature_extraction.text import CountVectorizer
+    from sklearn.linear_model import LogisticRegression
+    rng = np.random.RandomState(0)
+    base = list(utils.func.load_model()[1].vocabulary_)
+    first, second = rng.randint(0, len(base), size=(2, vocab_size))
+    tokens = (base + [f"{base[a]} {base[b]}_{i}" for i, (a, b) in enumerate(zip(first, second))])[:vocab_size]
+    vectorizer = CountVectorizer(ngram_range=(1, 2))
+    vectorizer.vocabulary_ = {token: i for i, token in enumerate(tokens)}
+    model = LogisticRegression()
+    model.classes_ = np.array(["cực kỳ hài lòng", "không hài lòng"], dtype=object)
+    model.coef_ = rng.randn(1, len(tokens))
+    model.intercept_ = np.zeros(1)
+    paths = {
+        "model_file": os.path.join(output_dir, "model.pkl"),
+        "vectorizer_file": os.path.join(output_dir, "vectorizer.pkl"),
+        "artifact_dir": os.path.join(output_dir, "artifact"),
+    }
+    joblib.dump(model, paths["model_file"])
+    joblib.dump(vectorizer, paths["vectorizer_file"])
+    utils.artifact.save_artifact(model, vectorizer, paths["artifact_dir"])
+    return paths
+
+
+def main_memory(args):
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        raise SystemExit("Cần Linux (/proc/<pid>/smaps_rollup) để đo bộ nhớ từng worker.")
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.vocab_size:
+            paths = synthetic_model(args.vocab_size, tmp)
+            label = f"model giả {args.vocab_size} token"
+        else:
+            paths = {"model_file": "lr_model_2label.pkl", "vectorizer_file": "count_2label.pkl",
+                     "artifact_dir": utils.func.ARTIFACT_DIR}
+            label = "model hiện tại"
+        report = {mode: measure_workers(mode, args.workers, paths) for mode in args.modes.split(",")}
+
+    print(f"Bộ nhớ tăng thêm mỗi worker ({label}, {args.workers} worker chạy cùng lúc):")
+    print(f"  {'chế độ':<18}{'RSS load':>11}{'Private load':>15}{'Private +predict':>19}{'PSS tổng':>12}")
+    for mode, r in report.items():
+        print(f"  {mode:<18}{r['rss_mb_load']:>8.1f} MB{r['private_mb_load']:>12.1f} MB"
+              f"{r['private_mb_predict']:>16.1f} MB{r['pss_mb_total']:>9.1f} MB")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark đường dự đoán cảm xúc")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_clean = sub.add_parser("clean", help="so sánh clean_data / clean_batch / clean_parallel")
+    p_clean.add_argument("--file", default="data_test_file.csv")
+    p_clean.add_argument("--column", default="content")
+    p_clean.add_argument("--repeat", type=int, default=3)
+    p_clean.add_argument("--workers", type=int, default=utils.parallel.DEFAULT_WORKERS)
+
+    p_pipe = sub.add_parser("pipeline", help="đo từng bước của toàn bộ đường dự đoán")
+    p_pipe.add_argument("--file", default="data_test_file.csv")
+    p_pipe.add_argument("--column", default="content")
+    p_pipe.add_argument("--sizes", default="1000", help="kích thước kho tổng hợp, vd: 1000,100000,1000000")
+    p_pipe.add_argument("--sample", type=int, default=500, help="số dòng đo độ trễ từng dòng")
+    p_pipe.add_argument("--tokenize-rows", type=int, default=0,
+                        help="chỉ tách từ N dòng đầu; các bước sau cũng chỉ đo trên N dòng này (0 = cả kho)")
+    p_pipe.add_argument("--translator", choices=["stub", "google"], default="stub")
+    p_pipe.add_argument("--translator-latency-ms", type=float, default=0.0)
+    p_pipe.add_argument("--profile", choices=["cprofile", "pyinstrument"], default=None)
+    p_pipe.add_argument("--profile-dir", default="profiles")
+    p_pipe.add_argument("--output", default=None, help="ghi kết quả JSON")
+    p_pipe.add_argument("--compare", default=None, help="so với file JSON của lần đo trước")
+    p_pipe.add_argument("--threshold", type=float, default=0.10)
+
+    p_mem = sub.add_parser("memory", help="đo bộ nhớ mỗi worker theo cách load model")
+    p_mem.add_argument("--workers", type=int, default=4)
+    p_mem.add_argument("--modes", default=",".join(MEMORY_MODES))
+    p_mem.add_argument("--vocab-size", type=int, default=None, help="đo trên model giả có N token")
+    p_mem.add_argument("--output", default=None, help="ghi kết quả JSON")
+
+    args = parser.parse_args()
+    if args.command == "clean":
+        main_clean(args)
+    elif args.command == "memory":
+        main_memory(args)
+    else:
+        main_pipeline(args)
+
+
+if __name__ == "__main__":
+    main()
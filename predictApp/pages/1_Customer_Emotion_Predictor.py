@@ -1,9 +1,10 @@
 # pages/1_Customer_Emotion_Predictor.py
-import pandas as pd
-
 import streamlit as st
 import utils.func
-import joblib
+import utils.cache
+import utils.client
+import utils.banned
+import utils.metrics
 import os
 
 # ===== Thiết lập giao diện =====
@@ -18,20 +19,17 @@ st.markdown("""
 - **Không hài lòng**
 """)
 
-# ===== Load model và vectorizer =====
-if os.path.exists("lr_model_2label.pkl") and os.path.exists("count_2label.pkl"):
-    model = joblib.load("lr_model_2label.pkl")
-    vectorizer = joblib.load("count_2label.pkl")
-else:
+# ===== Kiểm tra model (hoặc service dự đoán) =====
+if utils.client.SERVICE_URL:
+    st.caption(f"🔌 Đang dùng service dự đoán tại {utils.client.SERVICE_URL}")
+elif not utils.func.model_exists():
     st.error("❌ Model chưa được tạo. Vui lòng chạy trang Page 0 để huấn luyện trước.")
 
 # ===== Load danh sách từ cấm =====
 bad_words_file = "bad_words.txt"
-if os.path.exists(bad_words_file):
-    with open(bad_words_file, "r", encoding="utf-8") as f:
-        bad_words = [line.strip().lower() for line in f if line.strip()]
-else:
-    bad_words = []
+# Automaton được dựng một lần và dùng lại giữa các lần bấm nút
+bad_words_matcher = utils.banned.get_matcher(bad_words_file)
+if not os.path.exists(bad_words_file):
     st.warning("⚠️ Không tìm thấy file bad_words.txt. Kiểm tra từ cấm sẽ bị bỏ qua.")
 
 # ===== Nhập bình luận =====
@@ -40,19 +38,20 @@ user_input = st.text_area("Nhập bình luận của khách hàng:")
 if st.button("Dự đoán cảm xúc"):
     if user_input:
         # Dịch và tiền xử lý
-        clean_text = utils.func.clean_data(utils.func.translate_to_vietnamese(user_input))
+        _, clean_texts = utils.cache.translate_and_clean(
+            [user_input], utils.func.get_text_cache(), clean=lambda texts: map(utils.func.clean_data, texts)
+        )
+        clean_text = clean_texts[0]
 
         # Kiểm tra từ cấm
-        tokens = clean_text.lower().split()
-        bad_words_set = set(bad_words)
-        found_bad_words = [w for w in tokens if w in bad_words_set]
+        with utils.metrics.timer("banned_words"):
+            found_bad_words = bad_words_matcher.find_all(clean_text)
 
         if found_bad_words:
             st.error(f"🚫 Bình luận không hợp lệ. Phát hiện từ cấm: {', '.join(found_bad_words)}")
         else:
-            # Vector hóa và dự đoán
-            user_vector = vectorizer.transform([clean_text])
-            prediction = model.predict(user_vector)
+            # Vector hóa và dự đoán (model được cache, hoặc gọi service)
+            prediction = utils.func.predict_labels([clean_text])
 
             # Hiển thị kết quả
             if prediction[0] == "cực kỳ hài lòng":
@@ -60,18 +59,9 @@ if st.button("Dự đoán cảm xúc"):
             else:
                 st.error("👎 Khách hàng **không hài lòng** với sản phẩm.")
 
-            # ===== Lưu bình luận vào CSV =====
-            save_file = "user_comments.csv"
-            new_data = pd.DataFrame([[user_input, prediction[0]]], columns=["comment", "prediction"])
-
-            if os.path.exists(save_file):
-                old_data = pd.read_csv(save_file)
-                updated = pd.concat([old_data, new_data], ignore_index=True)
-            else:
-                updated = new_data
-
-            updated.to_csv(save_file, index=False, encoding="utf-8-sig")
-            st.info(f"💾 Bình luận đã được lưu vào `{save_file}`")
+            # ===== Lưu bình luận vào lịch sử (một INSERT, không ghi lại cả file) =====
+            utils.func.get_history_store().append(user_input, prediction[0])
+            st.info("💾 Bình luận đã được lưu vào lịch sử.")
 
     else:
         st.warning("⚠️ Vui lòng nhập bình luận để dự đoán cảm xúc.")
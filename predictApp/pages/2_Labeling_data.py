@@ -1,9 +1,9 @@
 import streamlit as st
-import pandas as pd
-import joblib
 import os
 from pathlib import Path
 import utils.func
+import utils.client
+import utils.stream
 import matplotlib.pyplot as plt
 import requests
 
@@ -69,11 +69,10 @@ else:
         use_container_width=True,
     )
 
-# ===== Load model & vectorizer =====
-if os.path.exists("lr_model_2label.pkl") and os.path.exists("count_2label.pkl"):
-    model = joblib.load("lr_model_2label.pkl")
-    vectorizer = joblib.load("count_2label.pkl")
-else:
+# ===== Kiểm tra model (hoặc service dự đoán) =====
+if utils.client.SERVICE_URL:
+    st.caption(f"🔌 Đang dùng service dự đoán tại {utils.client.SERVICE_URL}")
+elif not utils.func.model_exists():
     st.error("❌ Model chưa được tạo. Vui lòng chạy trang Page 1 để huấn luyện trước.")
     st.stop()
 
@@ -83,77 +82,107 @@ uploaded_file = st.file_uploader(
     type=["csv", "xlsx", "xls", "txt"]
 )
 
+near_duplicates = st.checkbox(
+    "♻️ Gộp cả bình luận gần giống nhau (MinHash)",
+    help="Bình luận trùng khớp sau khi chuẩn hóa luôn được gộp. Tùy chọn này gộp thêm các bình luận "
+         "gần giống (Jaccard ≥ 0.8) và dùng chung nhãn cảm xúc của bình luận xuất hiện đầu tiên; "
+         "nội dung làm sạch và kiểm tra từ cấm vẫn tính riêng cho từng bình luận.",
+)
+
 if uploaded_file is not None:
     try:
-        # Đọc file
-        if uploaded_file.name.endswith(".csv"):
-            df = pd.read_csv(uploaded_file)
-        elif uploaded_file.name.endswith((".xlsx", ".xls")):
-            # chú ý: cần 'openpyxl' trong requirements nếu đọc .xlsx
-            df = pd.read_excel(uploaded_file)
-        elif uploaded_file.name.endswith(".txt"):
-            df = pd.read_csv(uploaded_file, delimiter="\t")
-        else:
-            st.error("❌ Định dạng file không được hỗ trợ.")
-            st.stop()
+        text_cache = utils.func.get_text_cache()
+        # Kết quả được giữ theo file trong session, không xử lý lại khi bấm nút tải về
+        result_key = f"labeled::{uploaded_file.file_id}::{near_duplicates}"
+        result = st.session_state.get(result_key)
+        if result is None or not os.path.exists(result["output_path"]):
+            # Xóa file kết quả tạm của lần tải lên trước
+            for key in [k for k in st.session_state if str(k).startswith("labeled::")]:
+                old = st.session_state.pop(key)
+                if os.path.exists(old["output_path"]):
+                    os.remove(old["output_path"])
+
+            # Đọc, làm sạch, dự đoán và ghi kết quả theo từng khối (bộ nhớ không tăng theo kích thước file)
+            progress_bar = st.progress(0.0, text="🔄 Đang xử lý và dự đoán...")
+
+            def show_progress(fraction, rows, eta):
+                eta_text = f", còn khoảng {eta:.0f}s" if eta is not None else ""
+                progress_bar.progress(fraction, text=f"🔄 Đã xử lý {rows} dòng ({fraction:.0%}{eta_text})")
+
+            result = utils.stream.label_upload(uploaded_file, uploaded_file.name, text_cache, show_progress,
+                                               near_duplicates=near_duplicates)
+            progress_bar.empty()
+            st.session_state[result_key] = result
+
+        cache_stats = text_cache.stats()
+        st.caption(
+            f"⏱️ {result['rows']} dòng trong {result['seconds']:.1f}s "
+            f"({result['rows'] / max(result['seconds'], 1e-9):.0f} dòng/giây) · "
+            f"🗄️ Cache: {cache_stats['hits']} lần trúng / {cache_stats['misses']} lần trượt "
+            f"({cache_stats['hit_rate']:.0%}), {cache_stats['entries']} mục đã lưu"
+        )
+
+        if result["saved_rows"]:
+            st.info(
+                f"♻️ Gộp {result['saved_rows']} dòng trùng lặp: chỉ xử lý "
+                f"{result['rows'] - result['saved_rows']} bình luận khác nhau trên tổng {result['rows']} dòng "
+                f"(tiết kiệm {result['saved_rows'] / result['rows']:.0%})."
+            )
 
-        # Kiểm tra cột bắt buộc
-        if "content" not in df.columns:
-            st.error("❌ File cần có cột tên là `content`.")
-        else:
-            with st.spinner("🔄 Đang xử lý và dự đoán..."):
-                # Làm sạch dữ liệu
-                df["clean_content"] = df["content"].apply(
-                    lambda x: utils.func.clean_data(utils.func.translate_to_vietnamese(x))
-                )
-
-                # Dự đoán cảm xúc
-                features = vectorizer.transform(df["clean_content"])
-                df["sentiment"] = model.predict(features)
-
-            # Hiển thị nội dung sau khi làm sạch
-            st.subheader("💬 Nội dung sau khi làm sạch:")
-            st.dataframe(df[["content", "clean_content"]])
-
-            # Hiển thị kết quả dự đoán
-            st.subheader("📄 Kết quả dự đoán cảm xúc:")
-            st.dataframe(df[["content", "sentiment"]])
-
-            # Nút tải file kết quả
-            st.success("✅ Xử lý xong! Tải file kết quả bên dưới.")
+        if result["bad_rows"]:
+            st.warning(f"🚫 Có {result['bad_rows']} bình luận chứa từ cấm (cột `has_bad_words`).")
+
+        preview = result["preview"]
+        if len(preview) < result["rows"]:
+            st.caption(f"Chỉ hiển thị {len(preview)} dòng đầu tiên; file kết quả có đầy đủ {result['rows']} dòng.")
+
+        # Hiển thị nội dung sau khi làm sạch
+        st.subheader("💬 Nội dung sau khi làm sạch:")
+        st.dataframe(preview[["content", "clean_content"]])
+
+        # Hiển thị kết quả dự đoán
+        st.subheader("📄 Kết quả dự đoán cảm xúc:")
+        st.dataframe(preview[["content", "sentiment"]])
+
+        # Nút tải file kết quả (đọc thẳng từ file tạm trên đĩa)
+        st.success("✅ Xử lý xong! Tải file kết quả bên dưới.")
+        with open(result["output_path"], "rb") as f:
             st.download_button(
                 label="📥 Tải file kết quả",
-                data=df.to_csv(index=False).encode("utf-8-sig"),
+                data=f,
                 file_name="ket_qua_du_doan.csv",
                 mime="text/csv"
             )
 
-            # ===== Biểu đồ trực quan =====
-            st.subheader("📊 Phân tích cảm xúc khách hàng")
-            sentiment_counts = df["sentiment"].value_counts()
-
-            # Tạo figure
-            fig, ax = plt.subplots(figsize=(3.5, 3.5))
-
-            # Thêm số lượng vào nhãn
-            labels = [f"{label} ({count})" for label, count in zip(sentiment_counts.index, sentiment_counts.values)]
-
-            # Biểu đồ tròn
-            explode = [0.05] * len(sentiment_counts)
-            wedges, texts, autotexts = ax.pie(
-                sentiment_counts,
-                labels=labels,
-                autopct="%1.1f%%",
-                startangle=90,
-                explode=explode,
-                textprops={"fontsize": 10}
-            )
+        # ===== Biểu đồ trực quan =====
+        st.subheader("📊 Phân tích cảm xúc khách hàng")
+        # Số đếm được cộng dồn trong lúc xử lý, không cần đọc lại file kết quả
+        sentiment_counts = result["sentiment_counts"]
+
+        # Tạo figure
+        fig, ax = plt.subplots(figsize=(3.5, 3.5))
+
+        # Thêm số lượng vào nhãn
+        labels = [f"{label} ({count})" for label, count in zip(sentiment_counts.index, sentiment_counts.values)]
+
+        # Biểu đồ tròn
+        explode = [0.05] * len(sentiment_counts)
+        wedges, texts, autotexts = ax.pie(
+            sentiment_counts,
+            labels=labels,
+            autopct="%1.1f%%",
+            startangle=90,
+            explode=explode,
+            textprops={"fontsize": 10}
+        )
 
-            for autotext in autotexts:
-                autotext.set_color("black")
-                autotext.set_fontweight("bold")
+        for autotext in autotexts:
+            autotext.set_color("black")
+            autotext.set_fontweight("bold")
 
-            st.pyplot(fig)
+        st.pyplot(fig)
 
+    except ValueError as e:
+        st.error(f"❌ {e}")
     except Exception as e:
         st.error(f"❌ Lỗi khi xử lý file: {e}")
@@ -1,39 +1,61 @@
 # pages/3_Comments_History.py
 import streamlit as st
-import pandas as pd
 import os
+import tempfile
+import utils.func
 
 st.set_page_config(page_title="Lịch Sử Bình Luận", page_icon="📂", layout="wide")
 st.title("📂 Lịch Sử Bình Luận Đã Lưu")
 
-save_file = "user_comments.csv"
-
-# Kiểm tra file tồn tại
-if os.path.exists(save_file):
-    try:
-        df = pd.read_csv(save_file)
-
-        if not df.empty:
-            st.success(f"✅ Đã tìm thấy {len(df)} bình luận đã lưu.")
-            st.dataframe(df, use_container_width=True)
-
-            # Nút tải file CSV
-            st.download_button(
-                label="⬇️ Tải về file CSV",
-                data=df.to_csv(index=False).encode("utf-8"),
-                file_name="user_comments.csv",
-                mime="text/csv",
-            )
-
-            # Nút reset (xóa dữ liệu)
-            if st.button("🗑️ Reset toàn bộ bình luận"):
-                os.remove(save_file)
-                st.warning("⚠️ Tất cả bình luận đã được xóa.")
-                st.experimental_rerun()
-
-        else:
-            st.warning("⚠️ File tồn tại nhưng chưa có bình luận nào.")
-    except Exception as e:
-        st.error(f"❌ Lỗi khi đọc file: {e}")
-else:
-    st.info("ℹ️ Chưa có bình luận nào được lưu.")
+store = utils.func.get_history_store()
+
+try:
+    total = store.count()
+    if total:
+        st.success(f"✅ Đã tìm thấy {total} bình luận đã lưu.")
+
+        # ===== Bộ lọc: khoảng ngày, nhãn =====
+        col1, col2, col3 = st.columns([2, 2, 1])
+        with col1:
+            date_range = st.date_input("📅 Khoảng ngày", value=(), help="Bỏ trống để xem tất cả")
+        with col2:
+            label = st.selectbox("🏷️ Nhãn", ["Tất cả"] + store.labels())
+        with col3:
+            page_size = st.selectbox("Số dòng / trang", [25, 50, 100, 500], index=1)
+
+        start = date_range[0] if len(date_range) > 0 else None
+        end = date_range[1] if len(date_range) > 1 else start
+        filters = {"start": start, "end": end, "label": None if label == "Tất cả" else label}
+
+        matched = store.count(**filters)
+        pages = max(1, -(-matched // page_size))
+        page = st.number_input(f"Trang (1 – {pages})", min_value=1, max_value=pages, value=1, step=1)
+        st.caption(f"{matched} bình luận khớp bộ lọc")
+        st.dataframe(store.page(page, page_size, **filters), use_container_width=True, hide_index=True)
+
+        # Nút tải file CSV (xuất theo từng khối ra file tạm, không dựng cả bảng trong bộ nhớ)
+        if st.button("📦 Chuẩn bị file CSV"):
+            # Mỗi lần xuất một file tạm riêng: các phiên chạy đồng thời không ghi đè file của nhau
+            fd, export_path = tempfile.mkstemp(prefix="user_comments_", suffix=".csv")
+            os.close(fd)
+            try:
+                store.export_csv(export_path, **filters)
+                with open(export_path, "rb") as f:
+                    st.download_button(
+                        label="⬇️ Tải về file CSV",
+                        data=f,
+                        file_name="user_comments.csv",
+                        mime="text/csv",
+                    )
+            finally:
+                os.remove(export_path)  # download_button đã đọc xong nội dung file
+
+        # Nút reset (xóa dữ liệu)
+        if st.button("🗑️ Reset toàn bộ bình luận"):
+            store.clear()
+            st.warning("⚠️ Tất cả bình luận đã được xóa.")
+            st.rerun()
+    else:
+        st.info("ℹ️ Chưa có bình luận nào được lưu.")
+except Exception as e:
+    st.error(f"❌ Lỗi khi đọc lịch sử: {e}")
@@ -0,0 +1,104 @@
+# pages/4_Diagnostics.py
+import streamlit as st
+import pandas as pd
+import utils.func
+import utils.metrics
+
+st.set_page_config(page_title="Chẩn Đoán Hiệu Năng", page_icon="🩺", layout="wide")
+st.title("🩺 Chẩn Đoán Hiệu Năng")
+
+st.markdown("""
+Thời gian từng bước của đường dự đoán (dịch, làm sạch, kiểm tra từ cấm, vector hóa, dự đoán),
+tính trên tiến trình Streamlit hiện tại. Phân vị p50/p90/p99 lấy từ các lần đo gần nhất.
+""")
+
+metrics_server = utils.func.get_metrics_server()
+if metrics_server is not None:
+    host, port = metrics_server.server_address[:2]
+    st.caption(f"📡 Endpoint Prometheus: http://{host}:{port}/metrics")
+else:
+    st.caption("📡 Đặt biến môi trường METRICS_PORT để mở endpoint Prometheus /metrics.")
+
+# ===== Bật / tắt đo đạc =====
+# Số liệu và công tắc nằm trong tiến trình Streamlit: áp dụng cho mọi phiên đang mở, không riêng phiên này
+col1, col2 = st.columns([3, 1])
+with col1:
+    enabled = st.toggle("Bật đo thời gian (toàn server)", value=utils.metrics.ENABLED,
+                        help="Áp dụng cho mọi người dùng đang kết nối tới server này, không chỉ phiên của bạn.")
+    if enabled != utils.metrics.ENABLED:
+        utils.metrics.set_enabled(enabled)
+        st.toast("Đã " + ("bật" if enabled else "tắt") + " đo thời gian cho toàn server")
+with col2:
+    if st.button("🔄 Xóa số liệu", help="Xóa số liệu của toàn server (mọi phiên)"):
+        utils.metrics.REGISTRY.reset()
+        st.rerun()
+
+rows = utils.metrics.snapshot()
+stages = [r for r in rows if r["name"] == "stage_seconds"]
+values = {(r["name"], tuple(sorted(r["labels"].items()))): r.get("value", 0) for r in rows if r["kind"] != "histogram"}
+
+def value(name, **labels):
+    return values.get((name, tuple(sorted(labels.items()))), 0)
+
+# ===== Cache dịch + tiền xử lý, thông lượng trang gán nhãn =====
+st.subheader("🗄️ Cache và thông lượng")
+hits = value("text_cache_hits_total")
+misses = value("text_cache_misses_total")
+labeled_rows = value("labeling_rows_total")
+labeled_seconds = value("labeling_seconds_total")
+cache_stats = utils.func.get_text_cache().stats()
+
+c1, c2, c3, c4 = st.columns(4)
+c1.metric("Tỉ lệ trúng cache", f"{hits / (hits + misses):.0%}" if hits + misses else "–",
+          help=f"{hits:.0f} trúng / {misses:.0f} trượt")
+c2.metric("Số mục trong cache", f"{cache_stats['entries']:,}")
+c3.metric("Gán nhãn (trung bình)", f"{labeled_rows / labeled_seconds:,.0f} dòng/giây" if labeled_seconds else "–",
+          help=f"{labeled_rows:.0f} dòng trong {value('labeling_files_total'):.0f} file")
+c4.metric("Gán nhãn (file gần nhất)", f"{value('labeling_last_rows_per_second'):,.0f} dòng/giây"
+          if value("labeling_files_total") else "–")
+
+# ===== Thời gian từng bước =====
+st.subheader("⏱️ Thời gian từng bước")
+if not stages:
+    st.info("Chưa có số liệu. Hãy dự đoán vài bình luận hoặc gán nhãn một file rồi quay lại trang này.")
+else:
+    def ms(seconds):
+        return None if seconds is None else seconds * 1000
+
+    table = pd.DataFrame([
+        {
+            "Bước": r["labels"]["stage"],
+            "Số lần": r["count"],
+            "Trung bình (ms)": ms(r["mean"]),
+            "p50 (ms)": ms(r["p50"]),
+            "p90 (ms)": ms(r["p90"]),
+            "p99 (ms)": ms(r["p99"]),
+            "Tổng (s)": r["sum"],
+        }
+        for r in stages
+    ]).sort_values("Tổng (s)", ascending=False)
+    st.dataframe(table, use_container_width=True, hide_index=True,
+                 column_config={c: st.column_config.NumberColumn(format="%.3f") for c in table.columns[2:]})
+
+    # Histogram của một bước (số lần đo rơi vào từng khoảng thời gian)
+    stage = st.selectbox("Histogram của bước", table["Bước"].tolist())
+    selected = next(r for r in stages if r["labels"]["stage"] == stage)
+    histogram = pd.DataFrame(
+        [(f"≤ {bound * 1000:g} ms" if bound != float("inf") else "> 30 s", count)
+         for bound, count in selected["buckets"]],
+        columns=["Khoảng", "Số lần"],
+    ).set_index("Khoảng")
+    st.bar_chart(histogram)
+
+# ===== Bộ đếm và text Prometheus =====
+with st.expander("Các bộ đếm khác"):
+    counters = pd.DataFrame([
+        {"Tên": r["name"], "Nhãn": ", ".join(f"{k}={v}" for k, v in r["labels"].items()), "Giá trị": r["value"]}
+        for r in rows if r["kind"] != "histogram"
+    ])
+    st.dataframe(counters, use_container_width=True, hide_index=True)
+
+with st.expander("Định dạng Prometheus"):
+    text = utils.metrics.render_prometheus()
+    st.code(text, language="text")
+    st.download_button("📥 Tải metrics.txt", data=text, file_name="metrics.txt", mime="text/plain")
@@ -0,0 +1,113 @@
+# pages/5_Product_Dashboard.py
+import streamlit as st
+import pandas as pd
+import os
+import utils.func
+import utils.aggregate
+import utils.filelock
+
+st.set_page_config(page_title="Cảm Xúc Theo Sản Phẩm", page_icon="🏷️", layout="wide")
+st.title("🏷️ Cảm Xúc Khách Hàng Theo Sản Phẩm / Danh Mục")
+
+st.markdown("""
+Số liệu được tính sẵn bởi job tổng hợp (`python -m utils.aggregate --input tiki_reviews`) trên bình luận
+crawl từ Tiki, nên trang này chỉ đọc các bảng tổng hợp nhỏ thay vì quét lại toàn bộ bình luận.
+""")
+
+AGGREGATE_DIR = utils.aggregate.AGGREGATE_DIR
+REVIEWS_DIR = "tiki_reviews"
+products_path = os.path.join(AGGREGATE_DIR, utils.aggregate.PRODUCTS_FILE)
+
+# ===== Cập nhật tổng hợp (chỉ xử lý file crawl mới) =====
+if os.path.isdir(REVIEWS_DIR):
+    if st.button("🔄 Cập nhật tổng hợp từ dữ liệu crawl mới"):
+        progress_bar = st.progress(0.0, text="🔄 Đang chấm điểm bình luận mới...")
+
+        def show_progress(done, total, rows):
+            progress_bar.progress(done / total, text=f"🔄 {done}/{total} file, {rows} bình luận")
+
+        try:
+            stats = utils.aggregate.update_aggregates(REVIEWS_DIR, AGGREGATE_DIR, utils.func.get_text_cache(),
+                                                      progress=show_progress, blocking=False)
+        except utils.filelock.LockBusy:
+            progress_bar.empty()
+            st.warning("⏳ Đang có một lần cập nhật tổng hợp khác chạy (phiên khác hoặc dòng lệnh). "
+                       "Hãy đợi nó xong rồi tải lại trang.")
+        else:
+            progress_bar.empty()
+            st.cache_data.clear()
+            st.success(f"✅ Đã xử lý {stats['files']} file mới ({stats['rows']} bình luận) "
+                       f"trong {stats['seconds']:.1f}s.")
+
+if not os.path.exists(products_path):
+    st.info("Chưa có dữ liệu tổng hợp. Hãy crawl bình luận (`python -m utils.crawler`) rồi chạy "
+            "`python -m utils.aggregate` hoặc bấm nút cập nhật ở trên.")
+    st.stop()
+
+# Đọc lại khi file tổng hợp thay đổi (mtime là một phần của khóa cache)
+@st.cache_data
+def read_table(name, mtime):
+    return pd.read_parquet(os.path.join(AGGREGATE_DIR, name))
+
+def table(name):
+    return read_table(name, os.path.getmtime(os.path.join(AGGREGATE_DIR, name)))
+
+categories = table(utils.aggregate.CATEGORIES_FILE)
+products = table(utils.aggregate.PRODUCTS_FILE)
+category_week = table(utils.aggregate.CATEGORY_WEEK_FILE)
+
+# ===== Tổng quan các danh mục =====
+st.subheader("📊 Tổng quan theo danh mục")
+overview = categories[["category_name", "products", "reviews", "satisfaction_rate", "avg_rating"]].rename(columns={
+    "category_name": "Danh mục", "products": "Số sản phẩm", "reviews": "Số bình luận",
+    "satisfaction_rate": "Tỉ lệ hài lòng", "avg_rating": "Điểm TB",
+})
+st.dataframe(overview, use_container_width=True, hide_index=True, column_config={
+    "Tỉ lệ hài lòng": st.column_config.ProgressColumn(format="%.2f", min_value=0, max_value=1),
+    "Điểm TB": st.column_config.NumberColumn(format="%.2f ⭐"),
+})
+
+# ===== Sản phẩm tệ nhất trong một danh mục =====
+st.subheader("👎 Sản phẩm có tỉ lệ hài lòng thấp nhất")
+col1, col2, col3 = st.columns([3, 1, 1])
+with col1:
+    category = st.selectbox("Danh mục", sorted(categories["category_name"]))
+with col2:
+    top_n = st.number_input("Số sản phẩm", min_value=10, max_value=500, value=50, step=10)
+with col3:
+    min_reviews = st.number_input("Tối thiểu bình luận", min_value=1, max_value=1000, value=5)
+
+# products đã được sắp theo (danh mục, tỉ lệ hài lòng) khi tổng hợp: chỉ lọc rồi lấy n dòng đầu
+worst = products[(products["category_name"] == category) & (products["reviews"] >= min_reviews)].head(top_n)
+c1, c2, c3 = st.columns(3)
+summary = categories[categories["category_name"] == category].iloc[0]
+c1.metric("Tỉ lệ hài lòng của danh mục", f"{summary['satisfaction_rate']:.0%}")
+c2.metric("Số bình luận", f"{int(summary['reviews']):,}")
+c3.metric("Số sản phẩm", f"{int(summary['products']):,}")
+
+if worst.empty:
+    st.info("Không có sản phẩm nào đủ số bình luận tối thiểu trong danh mục này.")
+else:
+    worst = worst.assign(link=worst["url_key"].map(lambda k: f"https://tiki.vn/{k}.html" if isinstance(k, str) else None))
+    st.dataframe(
+        worst[["product_id", "link", "reviews", "satisfaction_rate", "recent_rate", "avg_rating", "last_week"]],
+        use_container_width=True, hide_index=True,
+        column_config={
+            "product_id": st.column_config.TextColumn("Mã sản phẩm"),
+            "link": st.column_config.LinkColumn("Sản phẩm", display_text=r"https://tiki\.vn/(.*?)\.html"),
+            "reviews": "Số bình luận",
+            "satisfaction_rate": st.column_config.ProgressColumn("Tỉ lệ hài lòng", format="%.2f", min_value=0, max_value=1),
+            "recent_rate": st.column_config.NumberColumn(f"Hài lòng {utils.aggregate.RECENT_WEEKS} tuần gần nhất", format="%.2f"),
+            "avg_rating": st.column_config.NumberColumn("Điểm TB", format="%.2f ⭐"),
+            "last_week": st.column_config.DateColumn("Bình luận gần nhất (tuần)"),
+        },
+    )
+
+# ===== Xu hướng theo tuần =====
+st.subheader("📈 Tỉ lệ hài lòng theo tuần")
+trend = category_week[category_week["category_name"] == category].set_index("week")
+if trend.empty:
+    st.info("Chưa có dữ liệu theo tuần cho danh mục này.")
+else:
+    st.line_chart(trend[["satisfaction_rate"]].rename(columns={"satisfaction_rate": "Tỉ lệ hài lòng"}))
+    st.bar_chart(trend[["reviews"]].rename(columns={"reviews": "Số bình luận"}))
@@ -0,0 +1,241 @@
+# service.py
+# Service dự đoán độc lập (HTTP/JSON), load model + vectorizer đúng một lần.
+# Snapshot học tăng dần đang được promote (utils/online.py) được dùng thay model artifact,
+# và được load lại ngay khi có bản mới được promote (kiểm tra registry tối đa mỗi giây một lần).
+# Chạy: python service.py [--host 127.0.0.1] [--port 8000]
+#
+#   POST /predict        {"text": "...", "cleaned": false}
+#   POST /predict_batch  {"texts": ["...", "..."], "cleaned": false}
+#   GET  /health
+#   GET  /metrics        số liệu dạng text Prometheus (thời gian từng bước, kích thước lô, cache)
+#
+# "cleaned": true nghĩa là văn bản đã qua clean_data (bỏ qua bước dịch + tách từ).
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import utils.func
+import utils.cache
+import utils.metrics
+import utils.dedup
+import utils.online
+
+RELOAD_INTERVAL = 1.0  # giây giữa hai lần kiểm tra snapshot được promote
+
+
+# ====== Gộp các request đồng thời thành một lô ======
+class MicroBatcher:
+    def __init__(self, model, vectorizer, max_batch=256, max_wait=0.005, version=None):
+        self.set_model(model, vectorizer, version)
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def set_model(self, model, vectorizer, version=None):
+        # Gán cả cặp trong một lần để lô đang chạy không lấy model mới với vectorizer cũ
+        self.current = (model, vectorizer, version)
+
+    @property
+    def version(self):
+        return self.current[2]
+
+    def submit(self, clean_texts):
+        future = Future()
+        self._queue.put((list(clean_texts), future))
+        return future
+
+    def _loop(self):
+        while True:
+            items = [self._queue.get()]
+            total = len(items[0][0])
+            deadline = time.monotonic() + self.max_wait
+            # Chờ thêm tối đa max_wait giây để gom các request đến cùng lúc
+            while total < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                items.append(item)
+                total += len(item[0])
+            self._run(items)
+
+    def _run(self, items):
+        texts = [text for item_texts, _ in items for text in item_texts]
+        model, vectorizer, _ = self.current
+        try:
+            # Một lần transform + predict_proba cho cả lô
+            utils.metrics.observe("service_batch_rows", len(texts), buckets=utils.metrics.SIZE_BUCKETS)
+            probabilities = []
+            if texts:
+                with utils.metrics.timer("vectorize"):
+                    features = vectorizer.transform(texts)
+                with utils.metrics.timer("predict"):
+                    probabilities = model.predict_proba(features)
+            classes = [str(c) for c in model.classes_]
+            results = [
+                {
+                    "label": classes[int(row.argmax())],
+                    "probabilities": {c: float(p) for c, p in zip(classes, row)},
+                }
+                for row in probabilities
+            ]
+        except Exception as e:
+            for _, future in items:
+                future.set_exception(e)
+            return
+        start = 0
+        for item_texts, future in items:
+            future.set_result(results[start:start + len(item_texts)])
+            start += len(item_texts)
+
+
+# ====== HTTP handler ======
+class PredictHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # cho phép keep-alive
+    batcher = None
+    text_cache = None
+    artifact_dir = utils.func.ARTIFACT_DIR
+    online_dir = utils.online.ONLINE_DIR
+    _checked_at = 0.0
+    _reload_lock = threading.Lock()
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+                   "application/json; charset=utf-8")
+
+    def _send(self, status, body, content_type):
+        # Đường dẫn lạ gộp vào "other" để số nhãn không tăng vô hạn
+        path = self.path if self.path in ("/predict", "/predict_batch", "/health", "/metrics") else "other"
+        utils.metrics.inc("service_requests_total", path=path, status=status)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    @classmethod
+    def _refresh_model(cls):
+        # Đổi sang snapshot vừa được promote (hoặc quay lại artifact sau khi demote)
+        now = time.monotonic()
+        if now - cls._checked_at < RELOAD_INTERVAL:
+            return
+        with cls._reload_lock:
+            if now - cls._checked_at < RELOAD_INTERVAL:
+                return
+            cls._checked_at = now
+            version = utils.online.promoted_version(cls.online_dir)
+            if version != cls.batcher.version:
+                cls.batcher.set_model(*load_serving_model(cls.artifact_dir, cls.online_dir, version))
+
+    def _predict(self, texts, cleaned):
+        self._refresh_model()
+        # Mỗi nhóm văn bản trùng (sau chuẩn hóa) chỉ được xử lý một lần
+        groups = utils.dedup.collapse(texts, normalize=not cleaned)
+        texts = groups.unique
+        if not cleaned:
+            _, texts = utils.cache.translate_and_clean(texts, self.text_cache, clean=utils.func.clean_batch)
+        return list(groups.scatter(self.batcher.submit(texts).result()))
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok", "model": self.batcher.version or "artifact"})
+        elif self.path == "/metrics":
+            self._send(200, utils.metrics.render_prometheus().encode("utf-8"),
+                       "text/plain; version=0.0.4; charset=utf-8")
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        with utils.metrics.timer("request"):
+            self._handle_post()
+
+    def _handle_post(self):
+        try:
+            payload = self._read_json()
+            if not isinstance(payload, dict):
+                return self._send_json(400, {"error": "body phải là một object JSON"})
+            cleaned = bool(payload.get("cleaned", False))
+            if self.path == "/predict":
+                if "text" not in payload:
+                    return self._send_json(400, {"error": "thiếu trường 'text'"})
+                if not isinstance(payload["text"], str):
+                    return self._send_json(400, {"error": "trường 'text' phải là chuỗi"})
+                self._send_json(200, self._predict([payload["text"]], cleaned)[0])
+            elif self.path == "/predict_batch":
+                texts = payload.get("texts")
+                if not isinstance(texts, list):
+                    return self._send_json(400, {"error": "trường 'texts' phải là một danh sách"})
+                # null / số không phải bình luận: từ chối thay vì dự đoán trên chuỗi "None" / "5"
+                bad = [i for i, text in enumerate(texts) if not isinstance(text, str)]
+                if bad:
+                    return self._send_json(400, {"error": "mọi phần tử của 'texts' phải là chuỗi",
+                                                 "invalid_indices": bad[:20]})
+                self._send_json(200, {"results": self._predict(texts, cleaned)})
+            else:
+                self._send_json(404, {"error": "not found"})
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": "JSON không hợp lệ"})
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+
+    def log_message(self, format, *args):
+        pass  # tắt log mỗi request để không làm chậm service
+
+
+def load_serving_model(artifact_dir, online_dir, version):
+    # Trả về (model, vectorizer, version); version None -> model artifact
+    if version:
+        online = utils.online.SnapshotStore(online_dir).load(version)
+        return online.model, online.vectorizer, version
+    model, vectorizer = utils.func.load_model(artifact_dir)
+    return model, vectorizer, None
+
+
+def create_server(host="127.0.0.1", port=8000, artifact_dir=utils.func.ARTIFACT_DIR,
+                  max_batch=256, max_wait=0.005, online_dir=utils.online.ONLINE_DIR):
+    model, vectorizer, version = load_serving_model(artifact_dir, online_dir,
+                                                    utils.online.promoted_version(online_dir))
+    PredictHandler.batcher = MicroBatcher(model, vectorizer, max_batch, max_wait, version)
+    PredictHandler.artifact_dir = artifact_dir
+    PredictHandler.online_dir = online_dir
+    PredictHandler.text_cache = utils.cache.TextCache()
+    server = ThreadingHTTPServer((host, port), PredictHandler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Service dự đoán cảm xúc bình luận")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--artifact-dir", default=utils.func.ARTIFACT_DIR)
+    parser.add_argument("--online-dir", default=utils.online.ONLINE_DIR)
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.artifact_dir, args.max_batch, args.max_wait_ms / 1000,
+                           args.online_dir)
+    print(f"🚀 Service đang chạy tại http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+# tests/conftest.py
+# Chạy từ thư mục predictApp: python -m pytest -q tests
+
+import os
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+# model_2label/, bad_words.txt... được đọc theo đường dẫn tương đối như khi chạy app
+os.chdir(APP_DIR)
+
+import warnings
+import joblib
+import pandas as pd
+import pytest
+
+
+@pytest.fixture(scope="session")
+def sklearn_model():
+    # Cặp model + vectorizer pickle gốc, dùng làm chuẩn để so các scorer nhanh
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # pickle được tạo bằng phiên bản sklearn khác
+        return joblib.load("lr_model_2label.pkl"), joblib.load("count_2label.pkl")
+
+
+@pytest.fixture(scope="session")
+def test_texts():
+    return pd.read_csv("data_test_file.csv")["clean_content"].fillna("").tolist()
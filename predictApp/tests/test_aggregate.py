@@ -0,0 +1,183 @@
+# tests/test_aggregate.py
+# Job tổng hợp bị dừng ở bất kỳ bước nào thì lần chạy lại vẫn cho đúng số đếm, không cộng / trừ hai lần.
+import os
+import threading
+import pandas as pd
+import pytest
+import utils.aggregate as aggregate
+import utils.cache
+from utils.filelock import LockBusy
+
+
+def predict(clean_texts):
+    return ["cực kỳ hài lòng" if "tốt" in text else "không hài lòng" for text in clean_texts]
+
+
+def reviews(product_ids, contents, day=0):
+    return pd.DataFrame({
+        "product_id": product_ids,
+        "content": contents,
+        "rating": [5 if "tốt" in c else 1 for c in contents],
+        "created_at": [1700000000 + day * 86400 + i for i in range(len(contents))],
+    })
+
+
+class Crash(Exception):
+    pass
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    input_dir = tmp_path / "reviews"
+    input_dir.mkdir()
+    reviews([1, 1, 2], ["hàng tốt lắm", "giao chậm quá", "chất lượng tốt"]).to_parquet(input_dir / "part-a.parquet")
+    reviews([2, 3], ["đóng gói tệ", "sản phẩm tốt"], day=9).to_parquet(input_dir / "part-b.parquet")
+    products_file = tmp_path / "products.csv"
+    pd.DataFrame({"product_id": [1, 2, 3], "category_id": [10, 10, 20],
+                  "category_name": ["Nhà cửa", "Nhà cửa", "Sách"], "url_key": ["a", "b", "c"]}).to_csv(products_file, index=False)
+    return tmp_path, str(input_dir), str(products_file)
+
+
+def run(workspace, output, **kwargs):
+    tmp_path, input_dir, products_file = workspace
+    kwargs.setdefault("predict", predict)
+    return aggregate.update_aggregates(input_dir, str(tmp_path / output), utils.cache.TextCache(":memory:"),
+                                       products_file=products_file, categories_file=str(tmp_path / "none.csv"),
+                                       **kwargs)
+
+
+def product_week(workspace, output):
+    output_dir = str(workspace[0] / output)
+    state = aggregate.read_state(output_dir)
+    df = pd.read_parquet(os.path.join(output_dir, state["product_week"]))
+    return df.sort_values(["product_id", "week"], ignore_index=True)
+
+
+def crash_on(monkeypatch, name, calls=1):
+    original = getattr(aggregate, name)
+    counter = {"n": 0}
+
+    def failing(*args, **kwargs):
+        counter["n"] += 1
+        if counter["n"] == calls:
+            raise Crash(name)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(aggregate, name, failing)
+
+
+def modify_part_a(workspace):
+    path = os.path.join(workspace[1], "part-a.parquet")
+    reviews([1, 3], ["hàng tốt lắm", "tệ quá"], day=2).to_parquet(path)
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+
+def test_counts(workspace):
+    stats = run(workspace, "out")
+    assert stats["files"] == 2 and stats["rows"] == 5
+    totals = product_week(workspace, "out").groupby("product_id")[["reviews", "satisfied"]].sum()
+    assert totals.to_dict("index") == {1: {"reviews": 2, "satisfied": 1}, 2: {"reviews": 2, "satisfied": 1},
+                                       3: {"reviews": 1, "satisfied": 1}}
+    assert run(workspace, "out")["files"] == 0
+
+
+def test_crash_before_state_new_file(workspace, monkeypatch):
+    run(workspace, "expected")
+    expected = product_week(workspace, "expected")
+    # Dừng sau khi ghi part + bảng gốc của file thứ hai, trước khi chốt state
+    crash_on(monkeypatch, "write_state", calls=2)
+    with pytest.raises(Crash):
+        run(workspace, "out")
+    monkeypatch.undo()
+    assert run(workspace, "out")["files"] == 1
+    pd.testing.assert_frame_equal(product_week(workspace, "out"), expected)
+
+
+def test_crash_before_state_changed_file(workspace, monkeypatch):
+    run(workspace, "out")
+    modify_part_a(workspace)
+    run(workspace, "expected")
+    expected = product_week(workspace, "expected")
+
+    crash_on(monkeypatch, "write_state")
+    with pytest.raises(Crash):
+        run(workspace, "out")
+    monkeypatch.undo()
+    # Part cũ vẫn còn nên lần chạy lại trừ đúng số đếm cũ
+    assert run(workspace, "out")["files"] == 1
+    pd.testing.assert_frame_equal(product_week(workspace, "out"), expected)
+    # Chỉ còn đúng một bảng gốc và một part cho mỗi file
+    output_dir = workspace[0] / "out"
+    assert len([n for n in os.listdir(output_dir) if n.startswith(aggregate.PRODUCT_WEEK_PREFIX)]) == 1
+    assert len(os.listdir(output_dir / aggregate.PARTS_DIR)) == 2
+
+
+def test_crash_before_views_rebuilds_them(workspace, monkeypatch):
+    crash_on(monkeypatch, "build_views")
+    with pytest.raises(Crash):
+        run(workspace, "out")
+    monkeypatch.undo()
+    assert run(workspace, "out")["files"] == 0
+    products = pd.read_parquet(workspace[0] / "out" / aggregate.PRODUCTS_FILE)
+    assert products["reviews"].sum() == 5
+
+
+def test_legacy_state_is_migrated(workspace):
+    run(workspace, "out")
+    output_dir = workspace[0] / "out"
+    state = aggregate.read_state(str(output_dir))
+    # Đưa về bố cục cũ: bảng gốc / part tên cố định, files chỉ lưu chữ ký
+    os.replace(output_dir / state["product_week"], output_dir / aggregate.PRODUCT_WEEK_FILE)
+    legacy = {"files": {}}
+    for path, entry in state["files"].items():
+        os.replace(output_dir / aggregate.PARTS_DIR / entry["part"],
+                   output_dir / aggregate.PARTS_DIR / aggregate._legacy_part_name(path))
+        legacy["files"][path] = entry["signature"]
+    aggregate.write_state(str(output_dir), legacy)
+
+    modify_part_a(workspace)
+    run(workspace, "out")
+    run(workspace, "expected")
+    pd.testing.assert_frame_equal(product_week(workspace, "out"), product_week(workspace, "expected"))
+
+
+def test_concurrent_runs_are_serialized(workspace):
+    started, release = threading.Event(), threading.Event()
+
+    def slow_predict(clean_texts):
+        started.set()
+        release.wait(10)
+        return predict(clean_texts)
+
+    results = {}
+
+    def first():
+        results["first"] = run(workspace, "out", predict=slow_predict)
+
+    def second():
+        results["second"] = run(workspace, "out")
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    assert started.wait(10)
+    # Lần chạy thứ hai không chờ: báo bận ngay, không đụng tới file của lần đang chạy
+    with pytest.raises(LockBusy):
+        run(workspace, "out", blocking=False)
+    waiting = threading.Thread(target=second)
+    waiting.start()
+    waiting.join(0.3)
+    assert waiting.is_alive()   # lần chạy chờ khóa chưa làm gì
+    release.set()
+    thread.join(10)
+    waiting.join(10)
+
+    assert results["first"]["files"] == 2
+    assert results["second"]["files"] == 0
+    state = aggregate.read_state(str(workspace[0] / "out"))
+    assert state["generation"] == 2
+    for entry in state["files"].values():
+        assert os.path.exists(os.path.join(workspace[0], "out", aggregate.PARTS_DIR, entry["part"]))
+    totals = product_week(workspace, "out").groupby("product_id")[["reviews", "satisfied"]].sum()
+    assert totals.to_dict("index") == {1: {"reviews": 2, "satisfied": 1}, 2: {"reviews": 2, "satisfied": 1},
+                                       3: {"reviews": 1, "satisfied": 1}}
@@ -0,0 +1,64 @@
+# tests/test_artifact.py
+import os
+import json
+import numpy as np
+import pytest
+from utils.artifact import (MANIFEST_FILE, DATA_FILES, ArtifactScorer, save_artifact, load_artifact,
+                            read_manifest, verify_artifact)
+
+
+@pytest.fixture
+def artifact_dir(sklearn_model, tmp_path):
+    path = str(tmp_path / "model")
+    save_artifact(*sklearn_model, path, metadata={"source": "test"})
+    return path
+
+
+def test_round_trip(sklearn_model, artifact_dir, test_texts):
+    model, vectorizer = sklearn_model
+    manifest = read_manifest(artifact_dir)
+    assert manifest["classes"] == model.classes_.tolist()
+    assert manifest["n_features"] == len(vectorizer.vocabulary_)
+    assert manifest["metadata"]["source"] == "test"
+    assert sorted(manifest["checksums"]) == sorted(DATA_FILES)
+    # Không để lại thư mục tạm
+    assert os.listdir(os.path.dirname(artifact_dir)) == ["model"]
+
+    for compact in (False, True):
+        loaded_model, loaded_vectorizer = load_artifact(artifact_dir, compact=compact)
+        assert dict(loaded_vectorizer.vocabulary_.items()) == vectorizer.vocabulary_
+        np.testing.assert_array_equal(loaded_model.coef_, model.coef_)
+        np.testing.assert_array_equal(loaded_model.intercept_, model.intercept_)
+        X = vectorizer.transform(test_texts)
+        assert (loaded_vectorizer.transform(test_texts) != X).nnz == 0
+        scorer = ArtifactScorer(loaded_model, loaded_vectorizer)
+        assert scorer.predict(test_texts) == model.predict(X).tolist()
+
+
+def test_overwrite_replaces_artifact(sklearn_model, artifact_dir):
+    save_artifact(*sklearn_model, artifact_dir, metadata={"source": "again"})
+    assert read_manifest(artifact_dir)["metadata"]["source"] == "again"
+    assert os.listdir(os.path.dirname(artifact_dir)) == ["model"]
+
+
+def test_checksum_mismatch_is_rejected(artifact_dir):
+    coef_file = os.path.join(artifact_dir, "coef.npy")
+    coef = np.load(coef_file)
+    np.save(coef_file, coef + 1.0)
+    with pytest.raises(ValueError, match="Checksum"):
+        verify_artifact(artifact_dir)
+    with pytest.raises(ValueError, match="Checksum"):
+        load_artifact(artifact_dir)
+    # verify=False bỏ qua kiểm tra (dùng khi đã kiểm tra ở tiến trình cha)
+    load_artifact(artifact_dir, verify=False)
+
+
+def test_unsupported_format_version(artifact_dir):
+    manifest_file = os.path.join(artifact_dir, MANIFEST_FILE)
+    with open(manifest_file, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    manifest["format_version"] = 99
+    with open(manifest_file, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    with pytest.raises(ValueError, match="Phiên bản"):
+        load_artifact(artifact_dir)
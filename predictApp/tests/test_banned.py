@@ -0,0 +1,48 @@
+# tests/test_banned.py
+import pandas as pd
+from utils.banned import BannedWordMatcher, get_matcher, normalize
+from utils.func import contains_bad_words
+
+WORDS = ["đm", "đầu bùi", "đồ_ngu", "ngu", "hàng   giả", "ĐẮT"]
+
+
+def test_normalize():
+    assert normalize("  Đầu_Bùi \t quá__ĐẮT ") == "đầu bùi quá đắt"
+
+
+def test_multi_word_phrases():
+    matcher = BannedWordMatcher(WORDS)
+    assert matcher.words == sorted(["đm", "đầu bùi", "đồ ngu", "ngu", "hàng giả", "đắt"])
+    # Cụm nhiều từ khớp dù cách nhau bằng khoảng trắng, '_' (sau word_tokenize) hay xuống dòng
+    assert matcher.find_all("shop bán hàng giả") == ["hàng giả"]
+    assert matcher.find_all("shop bán hàng_giả") == ["hàng giả"]
+    assert matcher.find_all("đúng là đầu\nbùi") == ["đầu bùi"]
+    assert matcher.find_all("Hàng Giả, Đồ_Ngu") == ["hàng giả", "đồ ngu", "ngu"]
+    assert matcher.contains("giá ĐẮT quá")
+
+
+def test_word_boundaries():
+    matcher = BannedWordMatcher(WORDS)
+    # Không khớp khi từ cấm chỉ là một phần của từ khác
+    assert not matcher.contains("nguyên liệu tốt")
+    assert not matcher.contains("nguồn_gốc rõ ràng")
+    assert not matcher.contains("hàng giảm giá")
+    assert not matcher.contains("đầu bùinhùi")
+    assert matcher.contains("quá ngu.")
+    assert matcher.contains("ngu")
+    assert not matcher.contains("")
+
+
+def test_mask_keeps_index():
+    matcher = BannedWordMatcher(WORDS)
+    texts = pd.Series(["hàng tốt", "hàng_giả", None, "đm shop"], index=[10, 11, 12, 13])
+    mask = matcher.mask(texts)
+    assert mask.index.tolist() == [10, 11, 12, 13]
+    assert mask.tolist() == [False, True, False, True]
+
+
+def test_contains_bad_words_accepts_list_or_matcher():
+    assert contains_bad_words("đầu_bùi thật", ["đầu bùi"])
+    assert not contains_bad_words("đầu tiên", ["đầu bùi"])
+    assert contains_bad_words("shop dm", get_matcher("bad_words.txt"))
+    assert not get_matcher("khong_co_file.txt").contains("đm")
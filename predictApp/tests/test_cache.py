@@ -0,0 +1,61 @@
+# tests/test_cache.py
+import utils.cache
+from utils.cache import TextCache, text_key, translate_and_clean
+
+
+def put(cache, *keys):
+    cache.put_many((key, key + "-vi", key + "-clean") for key in keys)
+
+
+def keys_in(cache, keys):
+    # Đọc thẳng bảng để không làm thay đổi last_access / bộ đếm
+    rows = cache._conn.execute("SELECT key FROM text_cache").fetchall()
+    return sorted(key for (key,) in rows if key in keys)
+
+
+def test_hit_miss_counters():
+    cache = TextCache(":memory:")
+    put(cache, "a", "b")
+    assert cache.get_many(["a", "b", "c"]) == {"a": ("a-vi", "a-clean"), "b": ("b-vi", "b-clean")}
+    # Khóa trùng trong một lần gọi chỉ được đếm một lần
+    cache.get_many(["c", "c", "a"])
+    assert cache.stats() == {"entries": 2, "max_entries": cache.max_entries,
+                             "hits": 3, "misses": 2, "hit_rate": 0.6}
+    cache.clear()
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["hits"] == cache.stats()["misses"] == 0
+    assert cache.stats()["hit_rate"] == 0.0
+
+
+def test_lru_eviction(monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr(utils.cache.time, "time", lambda: next(clock))
+    cache = TextCache(":memory:", max_entries=3)
+    put(cache, "a")
+    put(cache, "b")
+    put(cache, "c")
+    cache.get_many(["a"])  # "a" vừa được dùng, "b" là mục cũ nhất
+    put(cache, "d")
+    assert cache.stats()["entries"] == 3
+    assert keys_in(cache, "abcd") == ["a", "c", "d"]
+    put(cache, "e", "f")
+    assert keys_in(cache, "abcdef") == ["d", "e", "f"]
+
+
+def test_translate_and_clean_uses_cache():
+    cache = TextCache(":memory:")
+    calls = []
+
+    def translate(texts):
+        calls.append(list(texts))
+        return [text.upper() for text in texts]
+
+    def clean(texts):
+        return [text.lower() + "!" for text in texts]
+
+    first = translate_and_clean(["x", "y", "x"], cache, translate=translate, clean=clean)
+    second = translate_and_clean(["y", "z"], cache, translate=translate, clean=clean)
+    assert calls == [["x", "y"], ["z"]]
+    assert list(first[0]) == ["X", "Y", "X"] and list(first[1]) == ["x!", "y!", "x!"]
+    assert list(second[1]) == ["y!", "z!"]
+    assert cache.get_many([text_key("z")]) == {text_key("z"): ("Z", "z!")}
@@ -0,0 +1,29 @@
+# tests/test_clean.py
+import pandas as pd
+from utils.func import clean_batch, clean_data
+
+EDGE_CASES = [
+    "Sản phẩm tốttttt quá!!! 😍😍",
+    "ko thích, sp kg giống hình, đc cái giao nhanh",
+    "k có j để chê vs shop",
+    "OK ok Ok",
+    "   ",
+    "",
+    "hàng___lỗi -- giao   chậm\n\tnhân viên thái độ",
+    "👍👍👍",
+    "aaa bbb ccc 1111",
+    12345,
+    None,
+]
+
+
+def test_clean_batch_matches_clean_data_on_edge_cases():
+    assert clean_batch(EDGE_CASES).tolist() == [clean_data(text) for text in EDGE_CASES]
+
+
+def test_clean_batch_matches_clean_data_on_test_file():
+    contents = pd.read_csv("data_test_file.csv")["content"]
+    batch = clean_batch(contents)
+    # Giữ nguyên index để gán lại vào DataFrame
+    assert batch.index.equals(contents.index)
+    assert batch.tolist() == [clean_data(text) for text in contents]
@@ -0,0 +1,104 @@
+# tests/test_compact_vocab.py
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import CountVectorizer
+import utils.artifact
+from utils.artifact import ArtifactScorer, CompactVocabulary, load_artifact, save_artifact
+from utils.scorer import FastScorer
+
+TOKENS = ["hàng", "tốt", "giao", "chậm", "đóng_gói", "cẩn_thận", "a", "ổn", "không", "hài_lòng"]
+MISSING = ["", "hàn", "hàngg", "tốt_", "xyz", "ỗn", "đóng", "hài_lòng_quá"]
+
+
+class Vectorizer:
+    # Đủ cho save_artifact: vocabulary_ + get_params()
+    def __init__(self, tokens):
+        self.vocabulary_ = {token: column for column, token in enumerate(reversed(tokens))}
+
+    def get_params(self):
+        return {"token_pattern": r"(?u)\b\w+\b", "lowercase": True, "ngram_range": (1, 1), "binary": False}
+
+
+class Model:
+    classes_ = np.asarray(["a", "b"])
+
+    def __init__(self, n):
+        self.coef_ = np.zeros((1, n))
+        self.intercept_ = np.zeros(1)
+
+
+def build(tmp_path, tokens):
+    vectorizer = Vectorizer(tokens)
+    path = str(tmp_path / "model")
+    save_artifact(Model(len(tokens)), vectorizer, path)
+    return CompactVocabulary(path), vectorizer.vocabulary_
+
+
+def check(vocabulary, expected):
+    assert len(vocabulary) == len(expected)
+    assert dict(vocabulary.items()) == expected
+    for token, column in expected.items():
+        assert vocabulary[token] == column
+        assert token in vocabulary
+    for token in MISSING:
+        assert vocabulary.get(token) is None
+        assert token not in vocabulary
+        with pytest.raises(KeyError):
+            vocabulary[token]
+    # Tra cả lô, có token lặp lại và token không có
+    queries = TOKENS + MISSING + TOKENS[::2]
+    expected_columns = [expected.get(token, -1) for token in queries]
+    assert vocabulary.lookup(queries).tolist() == expected_columns
+    unique = list(dict.fromkeys(queries))
+    assert vocabulary.lookup(unique).tolist() == [expected.get(token, -1) for token in unique]
+
+
+def test_lookup(tmp_path):
+    check(*build(tmp_path, TOKENS))
+
+
+def test_lookup_with_hash_collisions(tmp_path, monkeypatch):
+    # Hash yếu: rất nhiều token (trong và ngoài từ điển) trùng hash, buộc đi qua nhánh so từng vị trí
+    monkeypatch.setattr(utils.artifact, "token_hash", lambda data: len(data) % 3)
+    vocabulary, expected = build(tmp_path, TOKENS)
+    assert len(set(vocabulary._hashes.tolist())) < len(TOKENS)
+    check(vocabulary, expected)
+
+
+def test_empty_vocabulary(tmp_path):
+    vocabulary, _ = build(tmp_path, [])
+    assert len(vocabulary) == 0
+    assert vocabulary.lookup(["hàng", "hàng"]).tolist() == [-1, -1]
+    assert vocabulary.get("hàng") is None
+
+
+def test_artifact_scorer_matches_sklearn_and_fast_scorer(sklearn_model, test_texts, tmp_path):
+    model, vectorizer = sklearn_model
+    path = str(tmp_path / "model")
+    save_artifact(model, vectorizer, path)
+    X = vectorizer.transform(test_texts)
+    expected_labels = [str(label) for label in model.predict(X)]
+    expected_proba = model.predict_proba(X)
+    fast = FastScorer.from_sklearn(model, vectorizer)
+    for compact in (True, False):
+        scorer = ArtifactScorer(*load_artifact(path, compact=compact))
+        assert isinstance(scorer.vectorizer.vocabulary_, CompactVocabulary) == compact
+        assert scorer.predict(test_texts) == expected_labels == fast.predict(test_texts)
+        np.testing.assert_allclose(scorer.predict_proba(test_texts), expected_proba, rtol=0, atol=1e-9)
+        np.testing.assert_allclose(scorer.predict_proba(test_texts), fast.predict_proba(test_texts),
+                                   rtol=0, atol=1e-9)
+
+
+def test_multiclass_bigrams_binary(test_texts, tmp_path):
+    from sklearn.linear_model import LogisticRegression
+    labels = [("tốt", "tệ", "vừa")[i % 3] for i in range(len(test_texts))]
+    vectorizer = CountVectorizer(ngram_range=(1, 2), binary=True)
+    model = LogisticRegression(max_iter=200).fit(vectorizer.fit_transform(test_texts), labels)
+    path = str(tmp_path / "model")
+    save_artifact(model, vectorizer, path)
+    texts = test_texts + ["", "từ không có trong từ điển"]
+    scorer = ArtifactScorer(*load_artifact(path))
+    assert (scorer.vectorizer.transform(texts) != vectorizer.transform(texts)).nnz == 0
+    assert scorer.predict(texts) == model.predict(vectorizer.transform(texts)).tolist()
+    np.testing.assert_allclose(scorer.predict_proba(texts), model.predict_proba(vectorizer.transform(texts)),
+                               rtol=0, atol=1e-9)
@@ -0,0 +1,139 @@
+# tests/test_crawler.py
+# Crawler chạy với server giả lập (utils.fake_tiki), không cần mạng.
+import json
+import pandas as pd
+import pytest
+from utils.crawler import crawl
+from utils.fake_tiki import start_fake_server
+
+PRODUCTS = {101: 45, 102: 20, 103: 7}   # product_id -> số bình luận (20 bình luận / trang)
+
+
+def review(product_id, i):
+    return {"id": product_id * 1000 + i, "title": "Hài lòng", "content": f"sản phẩm {product_id} bình luận {i}",
+            "thank_count": i % 3, "customer_id": product_id * 100 + i, "rating": 1 + i % 5,
+            "created_by": {"name": f"khách {i}"}, "created_at": 1700000000 + i}
+
+
+@pytest.fixture
+def record_dir(tmp_path):
+    pages = tmp_path / "pages"
+    pages.mkdir()
+    for product_id, count in PRODUCTS.items():
+        items = [review(product_id, i) for i in range(count)]
+        for page, start in enumerate(range(0, count, 20), start=1):
+            (pages / f"{product_id}_{page}.json").write_text(
+                json.dumps({"data": items[start:start + 20]}, ensure_ascii=False), encoding="utf-8")
+    return str(pages)
+
+
+@pytest.fixture
+def server(record_dir):
+    servers = []
+
+    def start(**kwargs):
+        server, url = start_fake_server(record_dir, **kwargs)
+        servers.append(server)
+        return server, url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def run(url, output_dir, **kwargs):
+    kwargs = dict(dict(rate=1000, retries=3, backoff=0.001, timeout=5), **kwargs)
+    return crawl(list(PRODUCTS), str(output_dir), base_url=url, **kwargs)
+
+
+def checkpointed(output_dir):
+    with open(output_dir / "_checkpoint.jsonl", encoding="utf-8") as f:
+        return {json.loads(line)["product_id"] for line in f}
+
+
+def test_pagination_and_parquet_output(server, tmp_path):
+    _, url = server()
+    output = tmp_path / "out"
+    stats = run(url, output)
+    assert stats["rows_written"] == sum(PRODUCTS.values())
+    assert stats["failed_products"] == []
+    # 3 + 1 + 1 trang có dữ liệu, mỗi sản phẩm thêm một trang rỗng để biết đã hết
+    assert stats["requests"] == 8
+
+    df = pd.read_parquet(output)
+    assert list(df.columns) == ["product_id", "id", "title", "content", "thank_count", "customer_id",
+                                "rating", "customer_name", "created_at"]
+    assert str(df["rating"].dtype) == "Int64"
+    assert df.groupby("product_id").size().to_dict() == PRODUCTS
+    assert df["id"].is_unique
+    assert checkpointed(output) == set(PRODUCTS)
+
+
+def test_max_pages(server, tmp_path):
+    _, url = server()
+    stats = run(url, tmp_path / "out", max_pages=1)
+    assert stats["rows_written"] == 20 + 20 + 7
+
+
+def test_429_backoff(server, tmp_path):
+    # Mỗi trang bị 429 một lần rồi mới thành công (đếm theo trang nên không phụ thuộc thứ tự request)
+    fake, url = server(fail_first=1, fail_status=429)
+    stats = run(url, tmp_path / "out")
+    assert stats["errors"] == 8
+    assert stats["requests"] == 16
+    assert stats["failed_products"] == []
+    assert stats["rows_written"] == sum(PRODUCTS.values())
+    assert fake.RequestHandlerClass._count == stats["requests"]
+
+
+def test_failed_product_is_retried_on_resume(server, tmp_path):
+    output = tmp_path / "out"
+    _, failing_url = server(fail_products=[103])
+    stats = run(failing_url, output, retries=2)
+    assert stats["failed_products"] == [103]
+    assert checkpointed(output) == {101, 102}   # sản phẩm lỗi không được đánh dấu là xong
+    assert stats["rows_written"] == PRODUCTS[101] + PRODUCTS[102]
+
+    fake, url = server()
+    stats = run(url, output)
+    # Chỉ crawl lại sản phẩm lỗi: 1 trang dữ liệu + 1 trang rỗng
+    assert stats["products"] == 1
+    assert fake.RequestHandlerClass._count == 2
+    assert stats["rows_written"] == PRODUCTS[103]
+    assert checkpointed(output) == set(PRODUCTS)
+    assert len(pd.read_parquet(output)) == sum(PRODUCTS.values())
+
+
+def test_resume_skips_done_products_and_duplicates(server, tmp_path):
+    _, url = server()
+    output = tmp_path / "out"
+    run(url, output)
+    (output / "_checkpoint.jsonl").write_text(json.dumps({"product_id": 101}) + "\n", encoding="utf-8")
+    stats = run(url, output)
+    # 102, 103 được crawl lại nhưng mọi bình luận đã có trong dataset nên không ghi trùng
+    assert stats["products"] == 2
+    assert stats["rows_written"] == 0
+    assert stats["duplicates"] == PRODUCTS[102] + PRODUCTS[103]
+    assert len(pd.read_parquet(output)) == sum(PRODUCTS.values())
+
+
+@pytest.mark.parametrize("mode", ["drop_first", "truncate_first"])
+def test_dropped_connection_is_retried(server, tmp_path, mode):
+    # Server ngắt kết nối (ServerDisconnectedError) hoặc cắt ngang body (ClientPayloadError):
+    # lỗi của aiohttp phải được thử lại như lỗi mạng, không làm dừng cả lần crawl
+    # Hai request đầu của mỗi trang bị ngắt: aiohttp tự gửi lại một lần trên kết nối keep-alive cũ,
+    # lần thứ hai mới thành lỗi cho crawler
+    _, url = server(**{mode: 2})
+    stats = run(url, tmp_path / "out")
+    assert stats["errors"] > 0
+    assert stats["failed_products"] == []
+    assert stats["rows_written"] == sum(PRODUCTS.values())
+
+
+def test_connection_dropped_on_every_request_fails_product(server, tmp_path):
+    _, url = server(drop_first=100)
+    output = tmp_path / "out"
+    stats = run(url, output, retries=1)
+    assert sorted(stats["failed_products"]) == sorted(PRODUCTS)
+    assert stats["rows_written"] == 0
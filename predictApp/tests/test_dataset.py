@@ -0,0 +1,119 @@
+# tests/test_dataset.py
+import os
+import json
+import time
+import pytest
+import requests
+import utils.dataset
+from utils.dataset import download_snapshot, is_stale, load_dataset
+
+CSV = "title,content\ncực kỳ hài lòng,tốt\nkhông hài lòng,tệ\n".encode("utf-8")
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b"", etag=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = {"ETag": etag} if etag else {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}")
+
+
+class FakeSheet:
+    # Các phản hồi được trả lần lượt; phần tử là Exception thì raise
+    def __init__(self):
+        self.queue = []
+        self.headers = []
+
+    def extend(self, items):
+        self.queue.extend(items)
+
+    def append(self, item):
+        self.queue.append(item)
+
+    def get(self, url, headers=None, timeout=None):
+        self.headers.append(headers)
+        item = self.queue.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+
+@pytest.fixture
+def responses(monkeypatch):
+    sheet = FakeSheet()
+    monkeypatch.setattr(requests, "get", sheet.get)
+    return sheet
+
+
+def read_meta(snapshot):
+    with open(snapshot + ".meta.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_download_then_not_modified(responses, tmp_path):
+    snapshot = str(tmp_path / "data" / "train.parquet")
+    responses.extend([FakeResponse(200, CSV, etag="v1"), FakeResponse(304)])
+    assert download_snapshot(snapshot)
+    first = read_meta(snapshot)
+    assert first["etag"] == "v1" and "error" not in first
+    assert first["checked_at"] >= first["attempted_at"]
+    assert not download_snapshot(snapshot)
+    assert responses.headers[1] == {"If-None-Match": "v1"}
+    assert read_meta(snapshot)["attempted_at"] >= first["checked_at"]
+    assert sorted(os.listdir(tmp_path / "data")) == ["train.parquet", "train.parquet.meta.json"]
+
+
+def test_failed_attempt_is_recorded(responses, tmp_path, monkeypatch):
+    snapshot = str(tmp_path / "train.parquet")
+    responses.append(FakeResponse(200, CSV, etag="v1"))
+    download_snapshot(snapshot)
+    checked_at = read_meta(snapshot)["checked_at"]
+
+    # Snapshot đã cũ, lần làm mới bị lỗi mạng
+    monkeypatch.setattr(utils.dataset.time, "time", lambda: checked_at + utils.dataset.MAX_AGE + 10)
+    assert is_stale(snapshot)
+    responses.append(requests.ConnectionError("mất mạng"))
+    with pytest.raises(requests.ConnectionError):
+        download_snapshot(snapshot)
+    meta = read_meta(snapshot)
+    assert meta["checked_at"] == checked_at
+    assert meta["attempted_at"] == checked_at + utils.dataset.MAX_AGE + 10
+    assert "mất mạng" in meta["error"]
+    # Không thử lại ngay ở lần rerun sau, chỉ thử lại sau RETRY_INTERVAL
+    assert not is_stale(snapshot)
+    monkeypatch.setattr(utils.dataset.time, "time",
+                        lambda: checked_at + utils.dataset.MAX_AGE + utils.dataset.RETRY_INTERVAL + 20)
+    assert is_stale(snapshot)
+
+    responses.append(FakeResponse(304))
+    download_snapshot(snapshot)
+    assert "error" not in read_meta(snapshot)
+    assert not is_stale(snapshot)
+
+
+def test_http_error_on_first_load(responses, tmp_path):
+    snapshot = str(tmp_path / "train.parquet")
+    responses.append(FakeResponse(500))
+    with pytest.raises(requests.HTTPError):
+        load_dataset(snapshot)
+    assert not os.path.exists(snapshot)
+    assert "HTTP 500" in read_meta(snapshot)["error"]
+
+
+def test_load_dataset_refreshes_stale_snapshot_in_background(responses, tmp_path):
+    snapshot = str(tmp_path / "train.parquet")
+    responses.append(FakeResponse(200, CSV, etag="v1"))
+    assert load_dataset(snapshot)["content"].tolist() == ["tốt", "tệ"]
+    # Ghi lùi thời điểm kiểm tra cho snapshot thành cũ
+    meta = read_meta(snapshot)
+    meta["checked_at"] = meta["attempted_at"] = time.time() - utils.dataset.MAX_AGE - 3600
+    with open(snapshot + ".meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    responses.append(requests.Timeout("chậm"))
+    assert len(load_dataset(snapshot)) == 2   # vẫn trả snapshot cũ ngay
+    utils.dataset._refresh_thread.join(5)
+    assert "chậm" in read_meta(snapshot)["error"]
+    assert not is_stale(snapshot)
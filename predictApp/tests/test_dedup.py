@@ -0,0 +1,42 @@
+# tests/test_dedup.py
+import pandas as pd
+import utils.banned
+import utils.cache
+import utils.stream
+from utils.dedup import collapse
+
+CLEAN = "Giao hàng nhanh, đóng gói rất cẩn thận, sản phẩm đúng như mô tả, shop tư vấn nhiệt tình"
+OFFENSIVE = CLEAN + " đm"
+
+
+def test_exact_duplicates_after_normalization():
+    groups = collapse(["Sản phẩm tốt!!!", "sản phẩm tốt", "Hàng lỗi", "sản phẩm   TỐT 😀"])
+    assert list(groups.unique) == ["Sản phẩm tốt!!!", "Hàng lỗi"]
+    assert list(groups.inverse) == [0, 0, 1, 0]
+    assert groups.saved == 2
+    assert groups.exact is groups
+
+
+def test_near_duplicates_keep_exact_groups():
+    groups = collapse([CLEAN, "Hàng lỗi", OFFENSIVE, CLEAN + "!!"], near=True)
+    assert list(groups.inverse) == [0, 1, 0, 0]
+    # Bên dưới nhóm gần trùng, văn bản khác chữ vẫn là các nhóm trùng khớp riêng
+    assert list(groups.exact.unique) == [CLEAN, "Hàng lỗi", OFFENSIVE]
+    assert list(groups.exact.inverse) == [0, 1, 2, 0]
+    assert list(groups.parent) == [0, 1, 0]
+    assert list(groups.representatives) == [0, 1]
+
+
+def test_offensive_near_duplicate_is_still_flagged():
+    matcher = utils.banned.get_matcher("bad_words.txt")
+    df = pd.DataFrame({"content": [CLEAN, OFFENSIVE, "Hàng lỗi, không dùng được", CLEAN]})
+    for near in (False, True):
+        labeled, saved = utils.stream.label_chunk(df, utils.cache.TextCache(":memory:"), matcher, near)
+        assert labeled["has_bad_words"].tolist() == [False, True, False, False]
+        assert labeled["clean_content"][1].endswith("đm")
+        assert not labeled["clean_content"][0].endswith("đm")
+        assert labeled["clean_content"][3] == labeled["clean_content"][0]
+        assert saved == 1   # chỉ dòng trùng khớp được bỏ qua bước dịch / làm sạch
+        if near:
+            # Nhãn cảm xúc dùng chung trong nhóm gần trùng
+            assert labeled["sentiment"][1] == labeled["sentiment"][0]
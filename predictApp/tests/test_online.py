@@ -0,0 +1,106 @@
+# tests/test_online.py
+import threading
+import pandas as pd
+import pytest
+import utils.online
+from utils.online import OnlineModel, SnapshotStore, promoted_version, update
+
+
+@pytest.fixture(scope="module")
+def data():
+    df = pd.read_csv("data_test_file.csv").dropna(subset=["clean_content", "title"])
+    texts, labels = df["clean_content"].tolist(), df["title"].tolist()
+    # 300 dòng đầu để cập nhật (3 lô), phần còn lại làm tập held-out
+    batches = [(texts[i:i + 100], labels[i:i + 100]) for i in range(0, 300, 100)]
+    return batches, (texts[300:], labels[300:])
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SnapshotStore(str(tmp_path / "online"))
+
+
+def artifact(monkeypatch, accuracy):
+    monkeypatch.setattr(utils.online, "artifact_accuracy", lambda texts, labels: accuracy)
+
+
+def test_first_update_replaces_artifact(store, data, monkeypatch):
+    artifact(monkeypatch, 0.0)
+    batches, holdout = data
+    report = update(*batches[0], store, holdout)
+    assert report["version"] == "v0001" and report["parent"] is None
+    assert report["baseline"] == "artifact" and report["promoted"]
+    assert promoted_version(store.root) == "v0001"
+    model = store.load()
+    assert model.samples_seen == 100
+    assert model.score(*holdout) == report["holdout_accuracy"]
+    assert set(model.predict(holdout[0][:5])) <= set(utils.online.LABELS)
+
+
+def test_rejected_batches_still_build_up(store, data, monkeypatch):
+    artifact(monkeypatch, 1.0)   # model artifact không thể vượt qua -> không snapshot nào được promote
+    batches, holdout = data
+    reports = [update(texts, labels, store, holdout) for texts, labels in batches]
+    assert [r["promoted"] for r in reports] == [False, False, False]
+    assert [r["parent"] for r in reports] == [None, "v0001", "v0002"]
+    assert store.load("v0003").samples_seen == 300
+    assert [s["samples_seen"] for s in store.registry()["snapshots"]] == [100, 200, 300]
+    assert promoted_version(store.root) is None
+
+    # Khi được promote thủ công, bản mới nhất đã học cả ba lô
+    store.promote("v0003")
+    assert store.load().samples_seen == 300
+
+
+def test_worse_snapshot_is_not_promoted(store, data, monkeypatch):
+    artifact(monkeypatch, 0.0)
+    batches, holdout = data
+    good = update(*batches[0], store, holdout)
+    flipped = [utils.online.LABELS[1 - utils.online.LABELS.index(label)] for label in batches[1][1]]
+    bad = update(batches[1][0] * 3, flipped * 3, store, holdout)
+    assert bad["holdout_accuracy"] < good["holdout_accuracy"] - utils.online.PROMOTE_TOLERANCE
+    assert bad["baseline"] == "v0001" and not bad["promoted"]
+    assert promoted_version(store.root) == "v0001"
+
+
+def test_promote_and_demote(store, data, monkeypatch):
+    artifact(monkeypatch, 0.0)
+    batches, holdout = data
+    update(*batches[0], store, holdout)
+    store.save(OnlineModel(), None, "chưa đánh giá")
+    with pytest.raises(ValueError, match="held-out"):
+        store.promote("v0002")
+    with pytest.raises(ValueError, match="v0009"):
+        store.promote("v0009")
+    assert promoted_version(store.root) == "v0001"
+
+    store.demote()
+    assert promoted_version(store.root) is None
+    assert store.load() is None
+    store.promote("v0001")
+    assert promoted_version(store.root) == "v0001"
+
+
+def test_unknown_labels_are_rejected(store, data):
+    batches, holdout = data
+    with pytest.raises(ValueError, match="tập nhãn"):
+        update(batches[0][0], ["bình thường"] * 100, store, holdout)
+    assert store.registry()["snapshots"] == []
+
+
+def test_concurrent_saves_get_distinct_versions(tmp_path):
+    root = str(tmp_path / "online")
+    model = OnlineModel()
+    versions = []
+
+    def save():
+        # Mỗi luồng một SnapshotStore riêng: chỉ khóa file giữ cho việc cấp phiên bản không bị trùng
+        versions.append(SnapshotStore(root).save(model, 0.5))
+
+    threads = [threading.Thread(target=save) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(versions) == [f"v{i:04d}" for i in range(1, 9)]
+    assert sorted(s["version"] for s in SnapshotStore(root).registry()["snapshots"]) == sorted(versions)
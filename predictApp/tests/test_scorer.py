@@ -0,0 +1,42 @@
+# tests/test_scorer.py
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.linear_model import LogisticRegression
+from utils.scorer import FastScorer
+
+
+def assert_same_as_sklearn(scorer, model, vectorizer, texts):
+    X = vectorizer.transform(texts)
+    assert scorer.predict(texts) == [str(label) for label in model.predict(X)]
+    np.testing.assert_allclose(scorer.predict_proba(texts), model.predict_proba(X), rtol=0, atol=1e-9)
+
+
+def test_fast_scorer_matches_sklearn(sklearn_model, test_texts):
+    model, vectorizer = sklearn_model
+    scorer = FastScorer.from_sklearn(model, vectorizer)
+    assert_same_as_sklearn(scorer, model, vectorizer, test_texts)
+    assert scorer.predict_one(test_texts[0]) == scorer.predict(test_texts[:1])[0]
+
+
+def test_fast_scorer_save_load(sklearn_model, test_texts, tmp_path):
+    model, vectorizer = sklearn_model
+    path = str(tmp_path / "scorer.json")
+    FastScorer.from_sklearn(model, vectorizer).save(path)
+    assert_same_as_sklearn(FastScorer.load(path), model, vectorizer, test_texts)
+
+
+def test_fast_scorer_multiclass_ngrams(test_texts):
+    # Nhiều lớp + bigram + binary: các nhánh không dùng bởi model 2 nhãn
+    labels = [("tốt", "tệ", "vừa")[i % 3] for i in range(len(test_texts))]
+    vectorizer = CountVectorizer(ngram_range=(1, 2), binary=True)
+    model = LogisticRegression(max_iter=200).fit(vectorizer.fit_transform(test_texts), labels)
+    scorer = FastScorer.from_sklearn(model, vectorizer)
+    assert_same_as_sklearn(scorer, model, vectorizer, test_texts + ["", "từ không có trong từ điển"])
+
+
+def test_fast_scorer_rejects_custom_analyzer(sklearn_model):
+    model, _ = sklearn_model
+    vectorizer = CountVectorizer(stop_words=["là"]).fit(["đây là câu"])
+    with pytest.raises(ValueError):
+        FastScorer.from_sklearn(model, vectorizer)
@@ -0,0 +1,88 @@
+# tests/test_translate.py
+import threading
+import time
+import pytest
+import utils.translate
+from utils.translate import is_vietnamese, translate_batch
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    # Bỏ thời gian chờ giữa các lần thử để test chạy nhanh
+    monkeypatch.setattr(utils.translate.time, "sleep", lambda seconds: None)
+
+
+class StubTranslator:
+    def __init__(self, fail_times=0, delay=0.0):
+        self.fail_times = fail_times
+        self.delay = delay
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self.lock:
+            self.calls.append(list(texts))
+            attempt = len(self.calls)
+        if self.delay:
+            threading.Event().wait(self.delay)   # time.sleep đã bị thay bởi no_backoff
+        if attempt <= self.fail_times:
+            raise RuntimeError("translator unavailable")
+        return [f"vi:{text}" for text in texts]
+
+
+def test_is_vietnamese():
+    assert is_vietnamese("Sản phẩm rất tốt, giao hàng nhanh")
+    assert is_vietnamese("ko dc j")          # từ viết tắt không dấu
+    assert is_vietnamese("12345 !!!")        # không có chữ cái: không cần dịch
+    assert not is_vietnamese("The product arrived broken")
+
+
+def test_vietnamese_rows_are_not_sent():
+    stub = StubTranslator()
+    texts = ["Rất hài lòng", "Terrible quality", "đóng gói cẩn thận", "Great price"]
+    result = translate_batch(texts, translator=stub)
+    assert result == ["Rất hài lòng", "vi:Terrible quality", "đóng gói cẩn thận", "vi:Great price"]
+    sent = [text for call in stub.calls for text in call]
+    assert sorted(sent) == ["Great price", "Terrible quality"]
+
+
+def test_order_is_preserved_across_batches():
+    stub = StubTranslator()
+    texts = [f"review number {i}" if i % 3 else f"bình luận số {i}" for i in range(100)]
+    result = translate_batch(texts, translator=stub, workers=4, batch_size=7)
+    expected = [text if i % 3 == 0 else f"vi:{text}" for i, text in enumerate(texts)]
+    assert result == expected
+    assert len(stub.calls) == 10   # 66 dòng tiếng Anh / lô 7
+
+
+def test_retry_then_success():
+    stub = StubTranslator(fail_times=2)
+    result = translate_batch(["Bad product"], translator=stub, retries=2)
+    assert result == ["vi:Bad product"]
+    assert len(stub.calls) == 3
+
+
+def test_retries_exhausted_keeps_original():
+    stub = StubTranslator(fail_times=10)
+    result = translate_batch(["Bad product", "Rất tệ"], translator=stub, retries=1)
+    assert result == ["Bad product", "Rất tệ"]
+    assert len(stub.calls) == 2
+
+
+def test_empty_translation_falls_back_to_original():
+    result = translate_batch(["Bad product"], translator=lambda texts: [""] * len(texts))
+    assert result == ["Bad product"]
+
+
+def test_timeout_keeps_original():
+    fast = "quick review"
+    slow = StubTranslator(delay=1.0)
+
+    def translator(texts):
+        return slow(texts) if texts == ["slow review"] else [f"vi:{text}" for text in texts]
+
+    started = time.monotonic()
+    result = translate_batch(["slow review", fast], translator=translator, workers=2,
+                             batch_size=1, timeout=0.2, retries=0)
+    assert time.monotonic() - started < 0.9
+    assert result == ["slow review", f"vi:{fast}"]
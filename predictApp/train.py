@@ -0,0 +1,215 @@
+# train.py
+# Pipeline huấn luyện offline có cache từng bước + tìm siêu tham số song song.
+# Chạy: python train.py --data Tiki_Comments_2label.csv [--n-jobs -1] [--save]
+#
+#   1) Làm sạch  : clean_parallel(content) -> .cache/clean_<hash>.parquet
+#   2) Đặc trưng : CountVectorizer theo (ngram_range, min_df) -> .cache/features_<hash>_{train,val,test}.npz
+#   3) Grid      : LogisticRegression theo (C, solver), chạy song song với n_jobs, chấm điểm trên tập val
+#   4) Test      : chỉ cấu hình được chọn mới được đánh giá trên tập test
+# Bước nào có đầu vào không đổi thì dùng lại kết quả đã lưu.
+import os
+import json
+import time
+import pickle
+import hashlib
+import argparse
+import itertools
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+
+CACHE_DIR = ".cache"
+CLEAN_VERSION = "1"  # tăng khi clean_data thay đổi để làm mới cache bước 1
+GRID = {
+    "ngram_range": [(1, 1), (1, 2)],
+    "min_df": [1, 2],
+    "C": [0.5, 1.0, 2.0],
+    "solver": ["lbfgs", "liblinear"],
+}
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def key_of(*parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def write_atomic(path, write):
+    # Ghi vào file tạm rồi os.replace: file cache chỉ xuất hiện khi đã ghi đủ,
+    # lần chạy bị dừng giữa chừng không để lại file cụt được dùng lại ở lần sau
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# ====== Bước 1: làm sạch ======
+def stage_clean(data_path, text_column, label_column, cache_dir, workers):
+    key = key_of(file_hash(data_path), text_column, label_column, CLEAN_VERSION)
+    path = os.path.join(cache_dir, f"clean_{key}.parquet")
+    if os.path.exists(path):
+        print(f"♻️  Dùng lại dữ liệu đã làm sạch: {path}")
+        return pd.read_parquet(path), key
+
+    from utils.parallel import clean_parallel
+    df = pd.read_csv(data_path)
+    # Xoá trùng lặp theo customer_id + content như TrainData.ipynb
+    subset = [c for c in ["customer_id", text_column] if c in df.columns]
+    df = df.drop_duplicates(subset=subset).dropna(subset=[text_column, label_column])
+    started = time.perf_counter()
+    corpus = pd.DataFrame({
+        "clean_content": clean_parallel(df[text_column].astype(str), workers=workers).values,
+        "label": df[label_column].astype(str).values,
+    })
+    print(f"🧹 Làm sạch {len(corpus)} dòng trong {time.perf_counter() - started:.1f}s")
+    write_atomic(path, lambda f: corpus.to_parquet(f, index=False))
+    return corpus, key
+
+
+# ====== Bước 2: đặc trưng ======
+SPLITS = ("train", "val", "test")
+
+def stage_features(corpus, clean_key, ngram_range, min_df, test_size, val_size, seed, cache_dir):
+    key = key_of(clean_key, ngram_range, min_df, test_size, val_size, seed)
+    base = os.path.join(cache_dir, f"features_{key}")
+    files = [f"{base}_{split}.npz" for split in SPLITS] + [base + "_meta.joblib"]
+    # Chỉ dùng lại cache khi đủ mọi file (lần ghi trước có thể dừng giữa chừng)
+    if all(os.path.exists(path) for path in files):
+        matrices = [sparse.load_npz(path) for path in files[:3]]
+        y_train, y_val, y_test, vectorizer = joblib.load(files[3])
+        return matrices, (y_train, y_val, y_test), vectorizer
+
+    # Tách test trước, rồi tách val từ phần còn lại; val_size / test_size tính trên toàn bộ dữ liệu
+    rest_text, test_text, y_rest, y_test = train_test_split(
+        corpus["clean_content"], corpus["label"], test_size=test_size,
+        random_state=seed, stratify=corpus["label"],
+    )
+    train_text, val_text, y_train, y_val = train_test_split(
+        rest_text, y_rest, test_size=val_size / (1 - test_size),
+        random_state=seed, stratify=y_rest,
+    )
+    vectorizer = CountVectorizer(ngram_range=ngram_range, min_df=min_df)
+    matrices = [vectorizer.fit_transform(train_text), vectorizer.transform(val_text), vectorizer.transform(test_text)]
+    labels = (np.asarray(y_train), np.asarray(y_val), np.asarray(y_test))
+    for path, matrix in zip(files, matrices):
+        write_atomic(path, lambda f: sparse.save_npz(f, matrix))
+    write_atomic(files[3], lambda f: joblib.dump((*labels, vectorizer), f))  # ghi sau cùng
+    return matrices, labels, vectorizer
+
+
+# ====== Bước 3: huấn luyện + đánh giá một cấu hình ======
+def evaluate(model, X, y):
+    predictions = model.predict(X)
+    proba = model.predict_proba(X)
+    if len(model.classes_) == 2:
+        roc_auc = roc_auc_score(y == model.classes_[1], proba[:, 1])
+    else:
+        roc_auc = roc_auc_score(y, proba, multi_class="ovr", labels=model.classes_)
+    return {
+        "accuracy": float(accuracy_score(y, predictions)),
+        "f1_macro": float(f1_score(y, predictions, average="macro")),
+        "roc_auc": float(roc_auc),
+    }
+
+
+def fit_and_score(X_train, X_val, y_train, y_val, vectorizer, C, solver, max_iter):
+    # Chấm điểm trên tập val; tập test không được dùng để chọn cấu hình
+    started = time.perf_counter()
+    model = LogisticRegression(C=C, solver=solver, max_iter=max_iter)
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - started
+    return {
+        **{f"val_{name}": value for name, value in evaluate(model, X_val, y_val).items()},
+        "fit_seconds": round(fit_seconds, 3),
+        "n_features": len(vectorizer.vocabulary_),
+        "model_bytes": len(pickle.dumps(model)) + len(pickle.dumps(vectorizer.vocabulary_)),
+    }, model
+
+
+def run_pipeline(data_path, text_column="content", label_column="title", cache_dir=CACHE_DIR,
+                 grid=GRID, n_jobs=-1, workers=None, test_size=0.1, val_size=0.1, seed=42, max_iter=500):
+    # Trả về (kết quả grid trên val, (dòng tốt nhất, model, vectorizer), chỉ số test của cấu hình tốt nhất)
+    from joblib import Parallel, delayed
+    os.makedirs(cache_dir, exist_ok=True)
+    corpus, clean_key = stage_clean(data_path, text_column, label_column, cache_dir,
+                                    workers or os.cpu_count() or 1)
+
+    results, best = [], None
+    for ngram_range, min_df in itertools.product(grid["ngram_range"], grid["min_df"]):
+        started = time.perf_counter()
+        (X_train, X_val, X_test), (y_train, y_val, y_test), vectorizer = stage_features(
+            corpus, clean_key, ngram_range, min_df, test_size, val_size, seed, cache_dir)
+        feature_seconds = time.perf_counter() - started
+
+        configs = list(itertools.product(grid["C"], grid["solver"]))
+        outputs = Parallel(n_jobs=n_jobs)(
+            delayed(fit_and_score)(X_train, X_val, y_train, y_val, vectorizer, C, solver, max_iter)
+            for C, solver in configs
+        )
+        for (C, solver), (metrics, model) in zip(configs, outputs):
+            row = {"ngram_range": list(ngram_range), "min_df": min_df, "C": C, "solver": solver,
+                   "feature_seconds": round(feature_seconds, 3), **metrics}
+            results.append(row)
+            score = (row["val_f1_macro"], row["val_accuracy"])
+            if best is None or score > (best[0]["val_f1_macro"], best[0]["val_accuracy"]):
+                best = (row, model, vectorizer, X_test, y_test)
+
+    best_row, best_model, best_vectorizer, X_test, y_test = best
+    test_metrics = evaluate(best_model, X_test, y_test)
+    return results, (best_row, best_model, best_vectorizer), test_metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Huấn luyện offline + tìm siêu tham số")
+    parser.add_argument("--data", required=True, help="CSV có cột văn bản và cột nhãn")
+    parser.add_argument("--text-column", default="content")
+    parser.add_argument("--label-column", default="title")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--workers", type=int, default=None, help="số tiến trình làm sạch dữ liệu")
+    parser.add_argument("--report", default="train_report.json")
+    parser.add_argument("--save", action="store_true", help="lưu cấu hình tốt nhất thành artifact model")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    results, (best_row, best_model, best_vectorizer), test_metrics = run_pipeline(
+        args.data, args.text_column, args.label_column, args.cache_dir,
+        n_jobs=args.n_jobs, workers=args.workers)
+
+    table = pd.DataFrame(results).sort_values(["val_f1_macro", "val_accuracy"], ascending=False)
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(table.to_string(index=False))
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump({"data": args.data, "best": best_row, "test": test_metrics, "results": results},
+                  f, ensure_ascii=False, indent=2)
+    print(f"\n🏆 Tốt nhất (theo val): {best_row}")
+    print(f"🧪 Trên tập test: {test_metrics}")
+    print(f"⏱️ Tổng thời gian: {time.perf_counter() - started:.1f}s, báo cáo -> {args.report}")
+
+    if args.save:
+        import utils.func
+        utils.func.save_model(best_model, best_vectorizer, metadata={
+            "trained_on": os.path.basename(args.data),
+            **{k: best_row[k] for k in ["ngram_range", "min_df", "C", "solver", "val_accuracy", "val_f1_macro"]},
+            **{f"test_{name}": value for name, value in test_metrics.items()},
+        })
+        print(f"💾 Đã lưu artifact model -> {utils.func.ARTIFACT_DIR}")
+
+
+if __name__ == "__main__":
+    main()
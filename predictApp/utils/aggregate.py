@@ -0,0 +1,306 @@
+# utils/aggregate.py
+# Job chấm điểm + tổng hợp cảm xúc theo sản phẩm / danh mục cho dữ liệu crawl (utils/crawler.py).
+# Chạy: python -m utils.aggregate --input tiki_reviews [--output aggregates]
+#
+#   1) Chỉ đọc các file part-*.parquet chưa xử lý (ghi nhận trong aggregates/_state.json)
+#   2) Dự đoán nhãn (gộp trùng + cache dịch/làm sạch), đếm theo (product_id, tuần)
+#   3) Cộng dồn vào product_week-<thế hệ>.parquet (phép cộng nên cập nhật tăng dần vẫn chính xác);
+#      số đếm riêng của từng file lưu trong parts/ để file bị thay đổi được trừ ra rồi cộng lại
+#   4) Dựng lại các bảng nhỏ cho dashboard: products / categories / category_week.parquet
+#      (đã join product_ids_by_category.csv + danh_muc_tiki.csv)
+#
+# Bảng gốc và số đếm từng file không bao giờ bị ghi đè tại chỗ: mỗi lần cập nhật ghi file mới theo
+# số thế hệ, rồi thay _state.json (os.replace, nguyên tử) trỏ sang các file mới. _state.json là điểm
+# chốt duy nhất: dừng ở bất kỳ bước nào trước đó thì state vẫn trỏ vào bảng gốc + part cũ khớp nhau,
+# lần chạy sau làm lại file đó; các file mồ côi được dọn ở lần chạy sau.
+# Cả job giữ khóa độc quyền aggregates/_lock: hai lần chạy đồng thời (CLI + nút trên trang 5, hai phiên...)
+# sẽ tính ra cùng một thế hệ và lần này xóa mất file chưa chốt của lần kia.
+import os
+import re
+import json
+import hashlib
+import time
+import argparse
+import pandas as pd
+from utils.filelock import file_lock
+
+# ====== Cấu hình ======
+AGGREGATE_DIR = "aggregates"
+STATE_FILE = "_state.json"
+LOCK_FILE = "_lock"
+PARTS_DIR = "parts"
+PRODUCT_WEEK_FILE = "product_week.parquet"   # tên cũ (trước khi ghi theo thế hệ)
+PRODUCT_WEEK_PREFIX = "product_week-"
+PRODUCTS_FILE = "products.parquet"
+CATEGORIES_FILE = "categories.parquet"
+CATEGORY_WEEK_FILE = "category_week.parquet"
+POSITIVE_LABEL = "cực kỳ hài lòng"
+UNKNOWN_CATEGORY = "Không rõ danh mục"
+RECENT_WEEKS = 4  # số tuần gần nhất dùng để tính xu hướng
+CHUNK_ROWS = 20000
+
+COUNT_COLUMNS = ["reviews", "satisfied", "rating_sum", "rating_count"]
+
+def _find(path):
+    # File metadata nằm ở thư mục gốc repo, app chạy trong predictApp/
+    if os.path.exists(path) or os.path.isabs(path):
+        return path
+    parent = os.path.join("..", path)
+    return parent if os.path.exists(parent) else path
+
+# ====== Metadata sản phẩm / danh mục ======
+def load_product_metadata(products_file="product_ids_by_category.csv", categories_file="danh_muc_tiki.csv"):
+    products = pd.read_csv(_find(products_file), usecols=["product_id", "category_id", "category_name", "url_key"])
+    products = products.drop_duplicates("product_id")
+    categories_path = _find(categories_file)
+    if os.path.exists(categories_path):
+        categories = pd.read_csv(categories_path)
+        categories.columns = ["category_name", "category_url"]
+        # Link dạng https://tiki.vn/nha-cua-doi-song/c1883 -> category_id 1883
+        categories["category_id"] = categories["category_url"].map(
+            lambda url: int(m.group(1)) if (m := re.search(r"/c(\d+)", str(url))) else None
+        ).astype("Int64")
+        products = products.merge(categories[["category_id", "category_url"]].dropna(subset=["category_id"]),
+                                  on="category_id", how="left")
+    else:
+        products["category_url"] = None
+    products["product_id"] = products["product_id"].astype("int64")
+    return products
+
+# ====== Trạng thái xử lý tăng dần ======
+def read_state(output_dir):
+    # files: đường dẫn -> {"signature", "part"}; product_week: tên bảng gốc hiện hành;
+    # generation: tăng sau mỗi lần chốt; views: bảng gốc mà các bảng dashboard được dựng từ đó
+    path = os.path.join(output_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {"files": {}, "generation": 0, "product_week": None, "views": None}
+    with open(path, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    # Định dạng cũ: files chỉ lưu chữ ký, part và bảng gốc có tên cố định
+    for file_path, entry in state["files"].items():
+        if isinstance(entry, str):
+            state["files"][file_path] = {"signature": entry, "part": _legacy_part_name(file_path)}
+    if "product_week" not in state:
+        legacy = os.path.exists(os.path.join(output_dir, PRODUCT_WEEK_FILE))
+        state["product_week"] = PRODUCT_WEEK_FILE if legacy else None
+        state["views"] = state["product_week"]
+    state.setdefault("generation", 0)
+    return state
+
+def write_state(output_dir, state):
+    path = os.path.join(output_dir, STATE_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+def _signature(path):
+    stat = os.stat(path)
+    return f"{stat.st_size}:{int(stat.st_mtime)}"
+
+def pending_files(input_path, state):
+    # Các file dữ liệu mới hoặc đã thay đổi kể từ lần chạy trước
+    if os.path.isdir(input_path):
+        files = sorted(os.path.join(input_path, f) for f in os.listdir(input_path)
+                       if f.endswith((".parquet", ".csv")) and not f.startswith("_"))
+    else:
+        files = [input_path]
+    return [f for f in files
+            if (state["files"].get(os.path.abspath(f)) or {}).get("signature") != _signature(f)]
+
+def _read_reviews(path):
+    columns = ["product_id", "content", "rating", "created_at"]
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path)
+    if "product_id" not in df.columns or "content" not in df.columns:
+        raise ValueError(f"{path}: cần có cột `product_id` và `content`.")
+    for column in columns:
+        if column not in df.columns:
+            df[column] = None
+    return df[columns].dropna(subset=["product_id", "content"])
+
+# ====== Chấm điểm một file ======
+def score_reviews(df, text_cache, predict=None):
+    # Trả về bảng đếm theo (product_id, week) cho các bình luận trong df
+    import utils.cache
+    import utils.dedup
+    import utils.func
+    predict = predict or utils.func.predict_labels
+
+    counts = []
+    for start in range(0, len(df), CHUNK_ROWS):
+        chunk = df.iloc[start:start + CHUNK_ROWS]
+        groups = utils.dedup.collapse(chunk["content"])
+        _, clean_content = utils.cache.translate_and_clean(groups.unique, text_cache)
+        labels = groups.scatter(predict(clean_content))
+
+        rating = pd.to_numeric(chunk["rating"], errors="coerce")
+        created = pd.to_datetime(pd.to_numeric(chunk["created_at"], errors="coerce"), unit="s")
+        # Bình luận không có ngày tạo được tính vào tuần chấm điểm
+        created = created.fillna(pd.Timestamp.now())
+        scored = pd.DataFrame({
+            "product_id": pd.to_numeric(chunk["product_id"], errors="coerce").astype("int64").values,
+            "week": created.dt.to_period("W-SUN").dt.start_time.values,
+            "reviews": 1,
+            "satisfied": (labels == POSITIVE_LABEL).astype("int64"),
+            "rating_sum": rating.fillna(0).values,
+            "rating_count": rating.notna().astype("int64").values,
+        })
+        counts.append(scored.groupby(["product_id", "week"], as_index=False)[COUNT_COLUMNS].sum())
+    if not counts:
+        return pd.DataFrame(columns=["product_id", "week"] + COUNT_COLUMNS)
+    return pd.concat(counts, ignore_index=True)
+
+def merge_counts(base, new, sign=1):
+    # Cộng dồn số đếm (sign=-1 để trừ); cùng (product_id, week) thì cộng lại
+    if sign < 0:
+        new = new.assign(**{c: -new[c] for c in COUNT_COLUMNS})
+    merged = pd.concat([base, new], ignore_index=True) if base is not None else new
+    merged = merged.groupby(["product_id", "week"], as_index=False)[COUNT_COLUMNS].sum()
+    return merged[merged["reviews"] > 0].reset_index(drop=True)
+
+def _path_hash(path):
+    return hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:16]
+
+def _legacy_part_name(path):
+    return f"{_path_hash(path)}.parquet"
+
+def _remove_unreferenced(output_dir, state):
+    # Dọn bảng gốc / part không còn được state trỏ tới (bản cũ, hoặc của lần chạy bị dừng trước khi chốt)
+    keep = {entry["part"] for entry in state["files"].values()}
+    parts_dir = os.path.join(output_dir, PARTS_DIR)
+    for name in os.listdir(parts_dir):
+        if name not in keep:
+            os.remove(os.path.join(parts_dir, name))
+    for name in os.listdir(output_dir):
+        is_base = name == PRODUCT_WEEK_FILE or name.startswith(PRODUCT_WEEK_PREFIX)
+        if (is_base and name != state["product_week"]) or name.endswith(".tmp"):
+            os.remove(os.path.join(output_dir, name))
+
+# ====== Bảng cho dashboard ======
+def _rates(df):
+    df["satisfaction_rate"] = df["satisfied"] / df["reviews"]
+    df["avg_rating"] = (df["rating_sum"] / df["rating_count"]).where(df["rating_count"] > 0)
+    return df
+
+def build_views(product_week, metadata):
+    product_week = product_week.merge(metadata[["product_id", "category_id", "category_name"]],
+                                      on="product_id", how="left")
+    product_week["category_name"] = product_week["category_name"].fillna(UNKNOWN_CATEGORY)
+    product_week["category_id"] = product_week["category_id"].fillna(-1).astype("int64")
+
+    # Theo sản phẩm: tổng + tỉ lệ hài lòng của RECENT_WEEKS tuần gần nhất
+    recent_from = product_week["week"].max() - pd.Timedelta(weeks=RECENT_WEEKS)
+    recent = (product_week[product_week["week"] > recent_from]
+              .groupby("product_id")[["reviews", "satisfied"]].sum())
+    products = product_week.groupby("product_id", as_index=False).agg(
+        **{c: (c, "sum") for c in COUNT_COLUMNS},
+        first_week=("week", "min"), last_week=("week", "max"),
+    )
+    products = _rates(products)
+    products["recent_reviews"] = products["product_id"].map(recent["reviews"]).fillna(0).astype("int64")
+    products["recent_rate"] = products["product_id"].map(recent["satisfied"] / recent["reviews"])
+    products = products.merge(metadata, on="product_id", how="left")
+    products["category_name"] = products["category_name"].fillna(UNKNOWN_CATEGORY)
+    products["category_id"] = products["category_id"].fillna(-1).astype("int64")
+    # Sắp theo danh mục rồi tỉ lệ hài lòng tăng dần: câu "N sản phẩm tệ nhất" chỉ cần lọc + head
+    products = products.sort_values(["category_name", "satisfaction_rate", "reviews"],
+                                    ascending=[True, True, False], ignore_index=True)
+
+    categories = _rates(product_week.groupby(["category_id", "category_name"], as_index=False)[COUNT_COLUMNS].sum())
+    categories["products"] = categories["category_id"].map(products.groupby("category_id").size())
+    categories = categories.sort_values("satisfaction_rate", ignore_index=True)
+
+    category_week = _rates(product_week.groupby(["category_id", "category_name", "week"], as_index=False)
+                           [COUNT_COLUMNS].sum()).sort_values(["category_name", "week"], ignore_index=True)
+    return products, categories, category_week
+
+def _write(df, path):
+    df.to_parquet(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+
+# ====== Job ======
+def update_aggregates(input_path="tiki_reviews", output_dir=AGGREGATE_DIR, text_cache=None,
+                      products_file="product_ids_by_category.csv", categories_file="danh_muc_tiki.csv",
+                      predict=None, progress=None, blocking=True):
+    # blocking=False: raise utils.filelock.LockBusy ngay nếu đang có lần chạy khác, thay vì chờ
+    os.makedirs(os.path.join(output_dir, PARTS_DIR), exist_ok=True)
+    with file_lock(os.path.join(output_dir, LOCK_FILE), blocking):
+        return _update(input_path, output_dir, text_cache, products_file, categories_file, predict, progress)
+
+def _update(input_path, output_dir, text_cache, products_file, categories_file, predict, progress):
+    if text_cache is None:
+        from utils.cache import TextCache
+        text_cache = TextCache()
+    state = read_state(output_dir)
+    _remove_unreferenced(output_dir, state)
+    files = pending_files(input_path, state)
+    started = time.monotonic()
+
+    base_name = state["product_week"]
+    product_week = pd.read_parquet(os.path.join(output_dir, base_name)) if base_name else None
+    rows = 0
+    for i, path in enumerate(files, start=1):
+        key = os.path.abspath(path)
+        df = _read_reviews(path)
+        counts = score_reviews(df, text_cache, predict)
+        old = state["files"].get(key)
+        if old and os.path.exists(os.path.join(output_dir, PARTS_DIR, old["part"])):
+            # File đã xử lý trước đó nhưng bị thay đổi: trừ số đếm cũ (part mà state đang trỏ tới) ra
+            product_week = merge_counts(product_week, pd.read_parquet(os.path.join(output_dir, PARTS_DIR, old["part"])),
+                                        sign=-1)
+        product_week = merge_counts(product_week, counts)
+        rows += len(df)
+
+        # Ghi part + bảng gốc dưới tên mới, rồi chốt cả hai cùng lúc bằng một lần thay _state.json
+        generation = state["generation"] + 1
+        part_name = f"{_path_hash(path)}-{generation:06d}.parquet"
+        base_name = f"{PRODUCT_WEEK_PREFIX}{generation:06d}.parquet"
+        _write(counts, os.path.join(output_dir, PARTS_DIR, part_name))
+        _write(product_week, os.path.join(output_dir, base_name))
+        state["files"][key] = {"signature": _signature(path), "part": part_name}
+        state["product_week"] = base_name
+        state["generation"] = generation
+        write_state(output_dir, state)
+        _remove_unreferenced(output_dir, state)
+        if progress:
+            progress(i, len(files), rows)
+
+    if product_week is None:
+        return {"files": 0, "rows": 0, "products": 0, "seconds": time.monotonic() - started}
+    # Dựng lại bảng dashboard khi bảng gốc đổi (kể cả khi lần trước dừng sau khi chốt nhưng trước bước này)
+    if state.get("views") != state["product_week"] or not os.path.exists(os.path.join(output_dir, PRODUCTS_FILE)):
+        metadata = load_product_metadata(products_file, categories_file)
+        products, categories, category_week = build_views(product_week, metadata)
+        _write(products, os.path.join(output_dir, PRODUCTS_FILE))
+        _write(categories, os.path.join(output_dir, CATEGORIES_FILE))
+        _write(category_week, os.path.join(output_dir, CATEGORY_WEEK_FILE))
+        state["views"] = state["product_week"]
+    state["updated_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    write_state(output_dir, state)
+    return {
+        "files": len(files),
+        "rows": rows,
+        "products": int(product_week["product_id"].nunique()),
+        "seconds": time.monotonic() - started,
+    }
+
+# ====== Dòng lệnh ======
+def main():
+    parser = argparse.ArgumentParser(description="Tổng hợp cảm xúc theo sản phẩm / danh mục")
+    parser.add_argument("--input", default="tiki_reviews", help="thư mục dataset crawl hoặc một file csv/parquet")
+    parser.add_argument("--output", default=AGGREGATE_DIR)
+    parser.add_argument("--products", default="product_ids_by_category.csv")
+    parser.add_argument("--categories", default="danh_muc_tiki.csv")
+    args = parser.parse_args()
+
+    def progress(done, total, rows):
+        print(f"📦 {done}/{total} file ({rows} bình luận)")
+
+    stats = update_aggregates(args.input, args.output, products_file=args.products,
+                              categories_file=args.categories, progress=progress)
+    print(f"🎉 Xong: {stats}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+# utils/artifact.py
+
+import os
+import json
+import mmap
+import zlib
+import time
+import shutil
+import hashlib
+import argparse
+import numpy as np
+from utils.scorer import build_analyzer
+
+# ====== Định dạng artifact model ======
+# Một thư mục gồm:
+#   manifest.json      phiên bản định dạng, lớp, tham số vectorizer, metadata huấn luyện, checksum
+#   vocab.bin          các token (UTF-8) đã sắp xếp, nối liền nhau
+#   vocab_offsets.npy  int64[n + 1], token thứ i nằm ở vocab.bin[offsets[i]:offsets[i + 1]]
+#   vocab_columns.npy  int32[n], cột đặc trưng của token thứ i
+#   vocab_hashes.npy   uint64[n], hash 64-bit của các token, đã sắp xếp          (từ phiên bản 2)
+#   vocab_hash_order.npy int32[n], vị trí trong vocab.bin của token có hash thứ i (từ phiên bản 2)
+#   coef.npy           float64[n_classes_or_1, n_features]
+#   intercept.npy      float64[n_classes_or_1]
+# Các mảng .npy được np.load(..., mmap_mode="r") nên load chỉ mất vài mili giây
+# và nhiều tiến trình dùng chung các trang bộ nhớ chỉ đọc.
+# vocabulary_ mặc định là CompactVocabulary: tra token bằng tìm kiếm nhị phân trên vocab_hashes.npy
+# rồi so byte với vocab.bin, cả hai đều mmap -> không dựng dict str -> int riêng trong mỗi worker.
+ARTIFACT_DIR = "model_2label"
+FORMAT_VERSION = 2
+SUPPORTED_VERSIONS = (1, 2)
+MANIFEST_FILE = "manifest.json"
+DATA_FILES = ["vocab.bin", "vocab_offsets.npy", "vocab_columns.npy", "vocab_hashes.npy", "vocab_hash_order.npy",
+              "coef.npy", "intercept.npy"]
+# PREDICT_COMPACT_VOCAB=0 để dựng lại dict như cũ (tra nhanh hơn, tốn bộ nhớ riêng mỗi tiến trình)
+COMPACT_VOCAB = os.environ.get("PREDICT_COMPACT_VOCAB", "1") != "0"
+VECTORIZER_PARAMS = ["token_pattern", "lowercase", "ngram_range", "binary"]
+
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def token_hash(data):
+    # Hash 64-bit ổn định giữa các tiến trình (hash() của Python thì không); crc32 + adler32 đều chạy bằng C.
+    # Chỉ dùng để thu hẹp tìm kiếm, kết quả luôn được so lại byte với vocab.bin nên không bao giờ sai.
+    return (zlib.crc32(data) << 32) | zlib.adler32(data)
+
+
+def hash_vocabulary(encoded):
+    # encoded: danh sách token UTF-8 theo thứ tự trong vocab.bin -> (hashes đã sắp xếp, vị trí tương ứng)
+    hashes = np.fromiter((token_hash(b) for b in encoded), dtype=np.uint64, count=len(encoded))
+    order = np.argsort(hashes, kind="stable").astype(np.int32)
+    return hashes[order], order
+
+
+# ====== Từ điển gọn (mmap, dùng chung giữa các tiến trình) ======
+class CompactVocabulary:
+    # Giao diện giống dict token -> cột (get, [], in, len, items) nhưng không nạp token nào vào bộ nhớ Python
+    def __init__(self, path):
+        with open(os.path.join(path, "vocab.bin"), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self._offsets = np.load(os.path.join(path, "vocab_offsets.npy"), mmap_mode="r")
+        self._columns = np.load(os.path.join(path, "vocab_columns.npy"), mmap_mode="r")
+        hashes_file = os.path.join(path, "vocab_hashes.npy")
+        if os.path.exists(hashes_file):
+            self._hashes = np.load(hashes_file, mmap_mode="r")
+            self._order = np.load(os.path.join(path, "vocab_hash_order.npy"), mmap_mode="r")
+        else:
+            # Artifact phiên bản 1: tính hash khi load (riêng cho tiến trình này)
+            self._hashes, self._order = hash_vocabulary([self._token_bytes(i) for i in range(len(self._columns))])
+
+    def _token_bytes(self, i):
+        return self._buffer[int(self._offsets[i]):int(self._offsets[i + 1])]
+
+    def lookup(self, tokens):
+        # Tra cả lô token một lần: trả về mảng int64 các cột, -1 nếu token không có trong từ điển
+        tokens = list(tokens)
+        unique = list(dict.fromkeys(tokens))
+        if len(unique) < len(tokens):
+            # Token lặp lại rất nhiều (phân bố Zipf): chỉ tra mỗi token một lần
+            columns = dict(zip(unique, self._lookup_unique(unique).tolist()))
+            return np.fromiter((columns[token] for token in tokens), dtype=np.int64, count=len(tokens))
+        return self._lookup_unique(tokens)
+
+    def _lookup_unique(self, tokens):
+        encoded = [token.encode("utf-8") for token in tokens]
+        result = np.full(len(encoded), -1, dtype=np.int64)
+        n = len(self._hashes)
+        if not encoded or not n:
+            return result
+        hashes = np.fromiter((token_hash(b) for b in encoded), dtype=np.uint64, count=len(encoded))
+        positions = np.searchsorted(self._hashes, hashes)
+        positions[positions == n] = 0
+        candidates = np.flatnonzero(self._hashes[positions] == hashes)
+        if not len(candidates):
+            return result
+
+        # So byte của ứng viên với vocab.bin, vector hóa: cùng độ dài rồi cùng từng byte
+        index = np.asarray(self._order[positions[candidates]], dtype=np.int64)
+        starts = np.asarray(self._offsets[index])
+        lengths = np.asarray(self._offsets[index + 1]) - starts
+        query_lengths = np.fromiter((len(encoded[k]) for k in candidates.tolist()), dtype=np.int64,
+                                    count=len(candidates))
+        matched = (lengths == query_lengths) & (lengths > 0)
+        if matched.any():
+            lengths_m = lengths[matched]
+            query = np.frombuffer(b"".join(encoded[k] for k in candidates[matched].tolist()), dtype=np.uint8)
+            query_starts = np.concatenate(([0], np.cumsum(lengths_m)[:-1]))
+            source = np.repeat(starts[matched] - query_starts, lengths_m) + np.arange(len(query))
+            equal = np.frombuffer(self._buffer, dtype=np.uint8)[source] == query
+            matched[matched] = np.minimum.reduceat(equal, query_starts).astype(bool)
+        result[candidates[matched]] = self._columns[index[matched]]
+
+        # Hai token của từ điển trùng hash (rất hiếm) nằm liền nhau: kiểm tra tiếp từng vị trí
+        for k in candidates[~matched].tolist():
+            position = int(positions[k]) + 1
+            while position < n and self._hashes[position] == hashes[k]:
+                i = int(self._order[position])
+                if self._token_bytes(i) == encoded[k]:
+                    result[k] = self._columns[i]
+                    break
+                position += 1
+        return result
+
+    def get(self, token, default=None):
+        column = int(self.lookup([token])[0])
+        return default if column < 0 else column
+
+    def __getitem__(self, token):
+        column = self.get(token)
+        if column is None:
+            raise KeyError(token)
+        return column
+
+    def __contains__(self, token):
+        return self.get(token) is not None
+
+    def __len__(self):
+        return len(self._columns)
+
+    def __iter__(self):
+        for i in range(len(self._columns)):
+            yield self._token_bytes(i).decode("utf-8")
+
+    def keys(self):
+        return iter(self)
+
+    def items(self):
+        columns = self._columns.tolist()
+        for i, token in enumerate(self):
+            yield token, columns[i]
+
+
+# ====== Vectorizer / model nhẹ đọc từ artifact (không cần sklearn) ======
+class ArtifactVectorizer:
+    # Giao diện tương thích CountVectorizer: vocabulary_, get_params(), transform()
+    def __init__(self, vocabulary, params):
+        self.vocabulary_ = vocabulary
+        self.params = params
+        self._tokens = build_analyzer(params["token_pattern"], params["lowercase"], params["ngram_range"])
+
+    def get_params(self, deep=True):
+        return dict(self.params, analyzer="word", tokenizer=None, preprocessor=None,
+                    stop_words=None, strip_accents=None)
+
+    def transform(self, texts):
+        from scipy.sparse import csr_matrix
+        if isinstance(self.vocabulary_, CompactVocabulary):
+            return self._transform_compact(texts)
+        indptr, indices, data = [0], [], []
+        vocabulary = self.vocabulary_
+        for text in texts:
+            counts = {}
+            for token in self._tokens(str(text)):
+                column = vocabulary.get(token)
+                if column is not None:
+                    counts[column] = counts.get(column, 0) + 1
+            for column in sorted(counts):
+                indices.append(column)
+                data.append(1 if self.params["binary"] else counts[column])
+            indptr.append(len(indices))
+        return csr_matrix(
+            (np.asarray(data, dtype=np.int64), np.asarray(indices, dtype=np.int32), indptr),
+            shape=(len(indptr) - 1, len(vocabulary)),
+        )
+
+
+    def _transform_compact(self, texts):
+        # Tách token cả lô rồi tra từ điển một lần (tìm kiếm nhị phân vector hóa)
+        from scipy.sparse import csr_matrix
+        token_lists = [self._tokens(str(text)) for text in texts]
+        lengths = np.fromiter((len(tokens) for tokens in token_lists), dtype=np.int64, count=len(token_lists))
+        columns = self.vocabulary_.lookup([token for tokens in token_lists for token in tokens])
+        rows = np.repeat(np.arange(len(token_lists)), lengths)
+        found = columns >= 0
+        X = csr_matrix(
+            (np.ones(int(found.sum()), dtype=np.int64), (rows[found], columns[found])),
+            shape=(len(token_lists), len(self.vocabulary_)),
+        )
+        X.sum_duplicates()  # cộng số lần xuất hiện + sắp xếp chỉ số cột như CountVectorizer
+        if self.params["binary"]:
+            X.data[:] = 1
+        return X
+
+
+class ArtifactModel:
+    # Giao diện tương thích LogisticRegression: classes_, coef_, intercept_, predict(), predict_proba()
+    def __init__(self, classes, coef, intercept):
+        self.classes_ = np.asarray(classes, dtype=object)
+        self.coef_ = coef
+        self.intercept_ = intercept
+
+    def decision_function(self, X):
+        scores = np.asarray(X @ self.coef_.T) + self.intercept_
+        return scores.ravel() if scores.shape[1] == 1 else scores
+
+    def predict_proba(self, X):
+        d = self.decision_function(X)
+        if d.ndim == 1:
+            p = 1.0 / (1.0 + np.exp(-d))
+            return np.vstack([1 - p, p]).T
+        e = np.exp(d - d.max(axis=1, keepdims=True))
+        return e / e.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        d = self.decision_function(X)
+        indices = (d > 0).astype(int) if d.ndim == 1 else d.argmax(axis=1)
+        return self.classes_[indices]
+
+
+class ArtifactScorer:
+    # Cùng giao diện predict() với FastScorer nhưng dự đoán thẳng từ artifact (từ điển gọn + coef mmap),
+    # nên các worker dùng chung trang bộ nhớ thay vì mỗi worker giữ một dict token -> trọng số
+    def __init__(self, model, vectorizer):
+        self.model = model
+        self.vectorizer = vectorizer
+
+    def predict(self, texts):
+        return [str(label) for label in self.model.predict(self.vectorizer.transform(texts))]
+
+    def predict_proba(self, texts):
+        return self.model.predict_proba(self.vectorizer.transform(texts)).tolist()
+
+
+# ====== Ghi artifact ======
+def save_artifact(model, vectorizer, path=ARTIFACT_DIR, metadata=None):
+    params = vectorizer.get_params()
+    tokens = sorted(vectorizer.vocabulary_)
+    encoded = [token.encode("utf-8") for token in tokens]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    columns = np.asarray([vectorizer.vocabulary_[token] for token in tokens], dtype=np.int32)
+    hashes, hash_order = hash_vocabulary(encoded)
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    with open(os.path.join(tmp_path, "vocab.bin"), "wb") as f:
+        f.write(b"".join(encoded))
+    np.save(os.path.join(tmp_path, "vocab_offsets.npy"), offsets)
+    np.save(os.path.join(tmp_path, "vocab_columns.npy"), columns)
+    np.save(os.path.join(tmp_path, "vocab_hashes.npy"), hashes)
+    np.save(os.path.join(tmp_path, "vocab_hash_order.npy"), hash_order)
+    np.save(os.path.join(tmp_path, "coef.npy"), np.ascontiguousarray(model.coef_, dtype=np.float64))
+    np.save(os.path.join(tmp_path, "intercept.npy"), np.asarray(model.intercept_, dtype=np.float64))
+
+    try:
+        import sklearn
+        sklearn_version = sklearn.__version__
+    except ImportError:
+        sklearn_version = None
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "classes": [c.item() if hasattr(c, "item") else c for c in model.classes_],
+        "n_features": len(tokens),
+        "vectorizer": {name: params[name] for name in VECTORIZER_PARAMS},
+        "metadata": dict(metadata or {}, sklearn_version=sklearn_version),
+        "checksums": {name: _sha256(os.path.join(tmp_path, name)) for name in DATA_FILES},
+    }
+    with open(os.path.join(tmp_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    # Thay thế thư mục cũ gần như nguyên tử để tiến trình khác không đọc phải artifact dở dang
+    old_path = f"{path}.old-{os.getpid()}"
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return manifest
+
+
+# ====== Đọc artifact ======
+def read_manifest(path=ARTIFACT_DIR):
+    with open(os.path.join(path, MANIFEST_FILE), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") not in SUPPORTED_VERSIONS:
+        raise ValueError(f"Phiên bản artifact không hỗ trợ: {manifest.get('format_version')}")
+    return manifest
+
+
+def verify_artifact(path=ARTIFACT_DIR, manifest=None):
+    manifest = manifest or read_manifest(path)
+    for name, expected in manifest["checksums"].items():
+        if _sha256(os.path.join(path, name)) != expected:
+            raise ValueError(f"Checksum không khớp: {os.path.join(path, name)}")
+
+
+def load_vocabulary_dict(path):
+    with open(os.path.join(path, "vocab.bin"), "rb") as f:
+        buffer = f.read()
+    offsets = np.load(os.path.join(path, "vocab_offsets.npy"), mmap_mode="r").tolist()
+    columns = np.load(os.path.join(path, "vocab_columns.npy"), mmap_mode="r").tolist()
+    return {buffer[offsets[i]:offsets[i + 1]].decode("utf-8"): columns[i] for i in range(len(columns))}
+
+
+def load_artifact(path=ARTIFACT_DIR, verify=True, compact=None):
+    manifest = read_manifest(path)
+    if verify:
+        verify_artifact(path, manifest)
+    compact = COMPACT_VOCAB if compact is None else compact
+    vocabulary = CompactVocabulary(path) if compact else load_vocabulary_dict(path)
+    params = dict(manifest["vectorizer"], ngram_range=tuple(manifest["vectorizer"]["ngram_range"]))
+    model = ArtifactModel(
+        manifest["classes"],
+        np.load(os.path.join(path, "coef.npy"), mmap_mode="r"),
+        np.load(os.path.join(path, "intercept.npy"), mmap_mode="r"),
+    )
+    return model, ArtifactVectorizer(vocabulary, params)
+
+
+# ====== Dòng lệnh ======
+# python -m utils.artifact convert     (chuyển lr_model_2label.pkl + count_2label.pkl sang artifact)
+# python -m utils.artifact verify
+def main():
+    parser = argparse.ArgumentParser(description="Quản lý artifact model")
+    parser.add_argument("command", choices=["convert", "verify"])
+    parser.add_argument("--path", default=ARTIFACT_DIR)
+    parser.add_argument("--model-file", default="lr_model_2label.pkl")
+    parser.add_argument("--vectorizer-file", default="count_2label.pkl")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        import joblib
+        manifest = save_artifact(
+            joblib.load(args.model_file), joblib.load(args.vectorizer_file), args.path,
+            metadata={"converted_from": [args.model_file, args.vectorizer_file]},
+        )
+        print(f"Đã ghi artifact ({manifest['n_features']} token) -> {args.path}")
+    else:
+        start = time.perf_counter()
+        load_artifact(args.path, verify=True)
+        print(f"Artifact hợp lệ, load mất {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
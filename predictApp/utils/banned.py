@@ -0,0 +1,106 @@
+# utils/banned.py
+
+import os
+import re
+from functools import lru_cache
+import pandas as pd
+
+# ====== Chuẩn hóa ======
+# Sau word_tokenize các cụm từ có thể bị nối bằng '_' (vd: "đầu_bùi"),
+# nên cả từ cấm lẫn văn bản đều được đưa về chữ thường, '_' -> ' ', gộp khoảng trắng.
+_space_pattern = re.compile(r"[\s_]+")
+
+def normalize(text):
+    return _space_pattern.sub(" ", str(text).lower()).strip()
+
+# ====== Automaton Aho-Corasick ======
+class BannedWordMatcher:
+    # Tìm tất cả từ / cụm từ cấm trong một lượt quét tuyến tính qua văn bản,
+    # không phụ thuộc số lượng từ trong danh sách.
+    def __init__(self, words):
+        self.words = sorted({normalize(w) for w in words if normalize(w)})
+        self._goto = [{}]     # node -> {ký tự: node kế tiếp}
+        self._fail = [0]
+        self._output = [[]]   # node -> các từ kết thúc tại node (kể cả qua liên kết fail)
+        for word in self.words:
+            self._add(word)
+        self._build()
+
+    def _add(self, word):
+        node = 0
+        for ch in word:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = nxt
+        self._output[node].append(word)
+
+    def _build(self):
+        # Duyệt theo chiều rộng để dựng liên kết fail
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._output[nxt] = self._output[nxt] + self._output[self._fail[nxt]]
+
+    def _iter_matches(self, text):
+        # Chỉ nhận các khớp nằm trọn trong ranh giới từ (không khớp giữa một từ khác)
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for end, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if output[node]:
+                after_ok = end + 1 == len(text) or not text[end + 1].isalnum()
+                if not after_ok:
+                    continue
+                for word in output[node]:
+                    start = end - len(word) + 1
+                    if start == 0 or not text[start - 1].isalnum():
+                        yield word
+
+    def find_all(self, text):
+        # Danh sách từ cấm tìm thấy (không trùng, theo thứ tự xuất hiện)
+        return list(dict.fromkeys(self._iter_matches(normalize(text))))
+
+    def contains(self, text):
+        return next(self._iter_matches(normalize(text)), None) is not None
+
+    def mask(self, texts):
+        # Mặt nạ True/False cho từng dòng, dùng để lọc cả file
+        index = texts.index if isinstance(texts, pd.Series) else None
+        return pd.Series([self.contains(text) for text in texts], index=index, dtype=bool)
+
+# ====== Load danh sách từ cấm ======
+def read_bad_words(file_path="bad_words.txt"):
+    # Bỏ dòng trống và dòng chú thích bắt đầu bằng '#'
+    with open(file_path, "r", encoding="utf-8") as f:
+        return [line.strip().lower() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+@lru_cache(maxsize=8)
+def _matcher_for(file_path, mtime):
+    return BannedWordMatcher(read_bad_words(file_path))
+
+def get_matcher(file_path="bad_words.txt"):
+    # Automaton được dựng một lần và dùng lại cho tới khi file bad_words.txt thay đổi
+    try:
+        mtime = os.path.getmtime(file_path)
+    except OSError:
+        return BannedWordMatcher([])
+    return _matcher_for(os.path.abspath(file_path), mtime)
+
+@lru_cache(maxsize=8)
+def matcher_from_words(words):
+    return BannedWordMatcher(words)
@@ -0,0 +1,150 @@
+# utils/cache.py
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import pandas as pd
+import utils.metrics
+
+# ====== Cấu hình ======
+CACHE_FILE = os.environ.get("TEXT_CACHE_PATH", "text_cache.sqlite")
+MAX_ENTRIES = int(os.environ.get("TEXT_CACHE_MAX_ENTRIES", 500_000))
+# Tăng phiên bản khi thay đổi translate_to_vietnamese / clean_data để bỏ qua cache cũ
+CACHE_VERSION = "2"
+_QUERY_CHUNK = 500  # giới hạn số tham số trong một câu IN (...)
+
+def text_key(text):
+    # Khóa theo nội dung: băm văn bản gốc
+    data = (CACHE_VERSION + "\0" + str(text)).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+# ====== Cache lưu trên đĩa (SQLite) ======
+class TextCache:
+    def __init__(self, path=CACHE_FILE, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Streamlit chạy mỗi phiên trên một luồng riêng nên cho phép dùng chung kết nối
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS text_cache (
+                key TEXT PRIMARY KEY,
+                translation TEXT NOT NULL,
+                clean_content TEXT NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_text_cache_access ON text_cache(last_access)")
+        self._conn.commit()
+
+    def get_many(self, keys):
+        # Trả về dict key -> (translation, clean_content) cho các khóa có trong cache
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), _QUERY_CHUNK):
+                chunk = keys[i:i + _QUERY_CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT key, translation, clean_content FROM text_cache "
+                    f"WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for key, translation, clean_content in rows:
+                    found[key] = (translation, clean_content)
+            # Cập nhật thời điểm truy cập cho LRU
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE text_cache SET last_access = ? WHERE key = ?",
+                [(now, key) for key in found],
+            )
+            self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        utils.metrics.inc("text_cache_hits_total", len(found))
+        utils.metrics.inc("text_cache_misses_total", len(keys) - len(found))
+        return found
+
+    def put_many(self, items):
+        # items: iterable các bộ (key, translation, clean_content)
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO text_cache (key, translation, clean_content, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                [(key, translation, clean_content, now) for key, translation, clean_content in items],
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Xóa các mục ít được dùng gần đây nhất khi vượt quá giới hạn
+        count = self._conn.execute("SELECT COUNT(*) FROM text_cache").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM text_cache WHERE key IN "
+                "(SELECT key FROM text_cache ORDER BY last_access LIMIT ?)",
+                (excess,),
+            )
+
+    def stats(self):
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM text_cache").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "entries": size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM text_cache")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def close(self):
+        self._conn.close()
+
+# ====== Dịch + tiền xử lý có cache ======
+def translate_and_clean(texts, cache, translate=None, clean=None):
+    # Dòng đã có trong cache bỏ qua cả bước dịch lẫn tách từ;
+    # chỉ các văn bản chưa gặp (mỗi văn bản một lần) mới được xử lý rồi ghi vào cache.
+    # Trả về (translations, clean_contents) dạng Series cùng index với texts.
+    if translate is None:
+        from utils.translate import translate_batch
+        translate = translate_batch
+    if clean is None:
+        from utils.parallel import clean_parallel
+        clean = clean_parallel
+
+    index = texts.index if isinstance(texts, pd.Series) else None
+    texts = list(texts)
+    keys = [text_key(text) for text in texts]
+    found = cache.get_many(keys)
+
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in found and key not in missing:
+            missing[key] = text
+    if missing:
+        translated = list(translate(list(missing.values())))  # translate_batch tự đo bước "translate"
+        with utils.metrics.timer("clean_batch"):
+            cleaned = list(clean(translated))
+        new_items = list(zip(missing.keys(), translated, cleaned))
+        cache.put_many(new_items)
+        for key, translation, clean_content in new_items:
+            found[key] = (translation, clean_content)
+
+    translations = pd.Series([found[key][0] for key in keys], index=index, dtype=object)
+    clean_contents = pd.Series([found[key][1] for key in keys], index=index, dtype=object)
+    return translations, clean_contents
@@ -0,0 +1,23 @@
+# utils/client.py
+
+import os
+import requests
+
+# ====== Cấu hình ======
+# Ví dụ: PREDICT_SERVICE_URL=http://127.0.0.1:8000 -> các trang Streamlit gọi service thay vì tự load pickle
+SERVICE_URL = os.environ.get("PREDICT_SERVICE_URL")
+REQUEST_TIMEOUT = 30
+
+_session = requests.Session()  # giữ kết nối keep-alive giữa các lần gọi
+
+def predict_remote(texts, url=None, cleaned=True, timeout=REQUEST_TIMEOUT):
+    # Gửi một lô bình luận tới /predict_batch, trả về (labels, probabilities)
+    url = (url or SERVICE_URL).rstrip("/")
+    response = _session.post(
+        f"{url}/predict_batch",
+        json={"texts": [str(text) for text in texts], "cleaned": cleaned},
+        timeout=timeout,
+    )
+    response.raise_for_status()
+    results = response.json()["results"]
+    return [r["label"] for r in results], [r["probabilities"] for r in results]
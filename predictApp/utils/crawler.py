@@ -0,0 +1,266 @@
+# utils/crawler.py
+
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+from urllib.parse import urlsplit
+import pandas as pd
+
+# ====== Cấu hình ======
+TIKI_API_URL = "https://tiki.vn"
+REVIEWS_PATH = "/api/v2/reviews"
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36",
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "en-US,en;q=0.9,vi;q=0.8",
+}
+BASE_PARAMS = {"sort": "score|desc,id|desc,stars|all", "limit": 20, "include": "comments"}
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+COLUMNS = ["product_id", "id", "title", "content", "thank_count", "customer_id",
+           "rating", "customer_name", "created_at"]
+
+# ====== Parse bình luận (giống NLP.ipynb) ======
+def comment_parser(json_data, product_id):
+    return {
+        "product_id": product_id,
+        "id": json_data.get("id"),
+        "title": json_data.get("title"),
+        "content": json_data.get("content"),
+        "thank_count": json_data.get("thank_count"),
+        "customer_id": json_data.get("customer_id"),
+        "rating": json_data.get("rating"),
+        "customer_name": (json_data.get("created_by") or {}).get("name"),
+        "created_at": json_data.get("created_at"),
+    }
+
+def dedup_key(customer_id, content):
+    return hashlib.blake2b(f"{customer_id}\0{content}".encode("utf-8"), digest_size=12).digest()
+
+class CrawlError(Exception):
+    # Không lấy được một trang (hết số lần thử hoặc mã lỗi không thử lại được):
+    # sản phẩm không được ghi vào checkpoint để lần chạy sau crawl lại
+    pass
+
+# ====== Giới hạn tốc độ (token bucket) ======
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = rate                      # số request mỗi giây
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+# ====== Ghi kết quả: dataset Parquet (append) + checkpoint ======
+class ParquetSink:
+    # Mỗi lần flush ghi một file part-*.parquet mới vào thư mục dataset,
+    # sau đó mới ghi các product_id đã xong vào checkpoint -> dừng giữa chừng không mất / trùng dữ liệu.
+    def __init__(self, dataset_dir, checkpoint_file, flush_rows=5000):
+        self.dataset_dir = dataset_dir
+        self.checkpoint_file = checkpoint_file
+        self.flush_rows = flush_rows
+        os.makedirs(dataset_dir, exist_ok=True)
+        self.done_products = self._read_checkpoint()
+        self.seen = self._read_seen()
+        self.rows = []
+        self.pending_products = []
+        self.written = 0
+        self.duplicates = 0
+
+    def _read_checkpoint(self):
+        if not os.path.exists(self.checkpoint_file):
+            return set()
+        with open(self.checkpoint_file, "r", encoding="utf-8") as f:
+            return {json.loads(line)["product_id"] for line in f if line.strip()}
+
+    def _read_seen(self):
+        # Nạp lại khóa (customer_id, content) của dữ liệu đã crawl để khử trùng khi chạy tiếp
+        files = [f for f in os.listdir(self.dataset_dir) if f.endswith(".parquet")]
+        if not files:
+            return set()
+        df = pd.read_parquet(self.dataset_dir, columns=["customer_id", "content"])
+        return {dedup_key(c, t) for c, t in zip(df["customer_id"], df["content"])}
+
+    def add_product(self, product_id, comments):
+        for row in comments:
+            key = dedup_key(row["customer_id"], row["content"])
+            if key in self.seen:
+                self.duplicates += 1
+                continue
+            self.seen.add(key)
+            self.rows.append(row)
+        self.pending_products.append(product_id)
+        if len(self.rows) >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            df = pd.DataFrame(self.rows, columns=COLUMNS)
+            for column in ["product_id", "id", "thank_count", "customer_id", "rating"]:
+                df[column] = pd.to_numeric(df[column], errors="coerce").astype("Int64")
+            name = f"part-{int(time.time() * 1000)}-{random.randrange(1 << 16):04x}.parquet"
+            df.to_parquet(os.path.join(self.dataset_dir, name), index=False)
+            self.written += len(df)
+            self.rows = []
+        if self.pending_products:
+            with open(self.checkpoint_file, "a", encoding="utf-8") as f:
+                for product_id in self.pending_products:
+                    f.write(json.dumps({"product_id": product_id}) + "\n")
+            self.done_products.update(self.pending_products)
+            self.pending_products = []
+
+# ====== Crawler bất đồng bộ ======
+class ReviewCrawler:
+    def __init__(self, sink, base_url=TIKI_API_URL, max_pages=20, concurrency=8,
+                 rate=4.0, retries=3, timeout=15, record_dir=None, backoff=1.0):
+        self.sink = sink
+        self.base_url = base_url.rstrip("/")
+        self.max_pages = max_pages
+        self.retries = retries
+        self.backoff = backoff  # giây chờ trước lần thử lại đầu tiên, nhân đôi sau mỗi lần
+        self.timeout = timeout
+        self.record_dir = record_dir
+        # Giới hạn số request đồng thời và tốc độ theo từng host
+        host = urlsplit(self.base_url).netloc
+        self._semaphores = {host: asyncio.Semaphore(concurrency)}
+        self._buckets = {host: TokenBucket(rate)}
+        self.requests = 0
+        self.errors = 0
+        self.failed_products = []
+
+    async def _get_json(self, session, params):
+        # Trả về JSON của trang; hết số lần thử thì raise CrawlError (không trả None như trang rỗng)
+        import aiohttp
+        host = urlsplit(self.base_url).netloc
+        error = None
+        for attempt in range(self.retries + 1):
+            retry_after = 0.0
+            await self._buckets[host].acquire()
+            async with self._semaphores[host]:
+                self.requests += 1
+                try:
+                    async with session.get(self.base_url + REVIEWS_PATH, params=params) as response:
+                        if response.status == 200:
+                            return await response.json(content_type=None)
+                        error = f"HTTP {response.status}"
+                        if response.status not in RETRY_STATUSES:
+                            self.errors += 1
+                            raise CrawlError(error)
+                        if response.status == 429:
+                            try:
+                                retry_after = float(response.headers.get("Retry-After", 0))
+                            except ValueError:
+                                pass
+                # ClientError: server ngắt kết nối, body bị cắt ngang... (không phải OSError)
+                except (asyncio.TimeoutError, OSError, ValueError, aiohttp.ClientError) as e:
+                    error = repr(e)
+            self.errors += 1
+            if attempt < self.retries:
+                delay = self.backoff * (2 ** attempt + random.random())
+                await asyncio.sleep(min(30, max(retry_after, delay)))
+        raise CrawlError(f"hết {self.retries + 1} lần thử: {error}")
+
+    async def crawl_product(self, session, product_id):
+        comments = []
+        for page in range(1, self.max_pages + 1):
+            params = dict(BASE_PARAMS, product_id=product_id, page=page)
+            data = await self._get_json(session, params)
+            if self.record_dir:
+                path = os.path.join(self.record_dir, f"{product_id}_{page}.json")
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+            items = data.get("data") or []
+            if not items:
+                break  # hết review thì dừng
+            comments.extend(comment_parser(item, product_id) for item in items)
+        return comments
+
+    async def run(self, product_ids, progress=None):
+        import aiohttp
+        if self.record_dir:
+            os.makedirs(self.record_dir, exist_ok=True)
+        todo = [pid for pid in dict.fromkeys(product_ids) if pid not in self.sink.done_products]
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        # Một ClientSession dùng chung = pool kết nối keep-alive
+        async with aiohttp.ClientSession(headers=HEADERS, timeout=timeout) as session:
+            async def crawl(product_id):
+                try:
+                    return product_id, await self.crawl_product(session, product_id)
+                except CrawlError:
+                    return product_id, None
+
+            tasks = [asyncio.ensure_future(crawl(pid)) for pid in todo]
+            try:
+                for done, task in enumerate(asyncio.as_completed(tasks), start=1):
+                    product_id, comments = await task
+                    if comments is None:
+                        # Bỏ cả các trang đã lấy được; sản phẩm được crawl lại từ đầu khi chạy tiếp
+                        self.failed_products.append(product_id)
+                    else:
+                        self.sink.add_product(product_id, comments)
+                    if progress:
+                        progress(done, len(todo))
+            finally:
+                for task in tasks:
+                    task.cancel()
+                self.sink.flush()
+        return {
+            "products": len(todo),
+            "rows_written": self.sink.written,
+            "duplicates": self.sink.duplicates,
+            "requests": self.requests,
+            "errors": self.errors,
+            "failed_products": self.failed_products,
+        }
+
+# ====== Dòng lệnh ======
+# python -m utils.crawler --products ../product_ids_by_category.csv --output tiki_reviews
+# Chạy lại cùng lệnh sau khi bị dừng sẽ tiếp tục từ checkpoint (kể cả các sản phẩm bị lỗi lần trước).
+def crawl(product_ids, output_dir="tiki_reviews", checkpoint_file=None, flush_rows=5000,
+          progress=None, **kwargs):
+    checkpoint_file = checkpoint_file or os.path.join(output_dir, "_checkpoint.jsonl")
+    sink = ParquetSink(output_dir, checkpoint_file, flush_rows)
+    crawler = ReviewCrawler(sink, **kwargs)
+    return asyncio.run(crawler.run(product_ids, progress))
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl bình luận Tiki (bất đồng bộ, chạy tiếp được)")
+    parser.add_argument("--products", default="product_ids_by_category.csv")
+    parser.add_argument("--output", default="tiki_reviews")
+    parser.add_argument("--base-url", default=TIKI_API_URL)
+    parser.add_argument("--max-pages", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=4.0, help="số request mỗi giây cho mỗi host")
+    parser.add_argument("--limit", type=int, default=None, help="chỉ crawl N sản phẩm đầu tiên")
+    parser.add_argument("--record-dir", default=None, help="lưu lại JSON thô để phát lại bằng utils.fake_tiki")
+    args = parser.parse_args()
+
+    product_ids = pd.read_csv(args.products)["product_id"].dropna().astype(int).tolist()[:args.limit]
+
+    def progress(done, total):
+        if done % 50 == 0 or done == total:
+            print(f"📦 {done}/{total} sản phẩm")
+
+    stats = crawl(product_ids, args.output, base_url=args.base_url, max_pages=args.max_pages,
+                  concurrency=args.concurrency, rate=args.rate, record_dir=args.record_dir,
+                  progress=progress)
+    if stats["failed_products"]:
+        print(f"⚠️ {len(stats['failed_products'])} sản phẩm lỗi, chạy lại lệnh để crawl tiếp")
+    print(f"🎉 Xong: {stats}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# utils/dataset.py
+
+import os
+import json
+import time
+import hashlib
+import threading
+import pandas as pd
+
+# ====== Cấu hình ======
+SHEET_ID = "1EnVA5D0khzVuaD6fn6wtCFLWurUXimusiUuIl-qR7pM"
+GID = "1173905870"
+CSV_URL = f"https://docs.google.com/spreadsheets/d/{SHEET_ID}/gviz/tq?tqx=out:csv&gid={GID}"
+SNAPSHOT_FILE = os.environ.get("TRAIN_SNAPSHOT_PATH", os.path.join("data", "train_2label.parquet"))
+MAX_AGE = 7 * 24 * 3600   # snapshot cũ hơn 7 ngày sẽ được làm mới ở nền
+RETRY_INTERVAL = 15 * 60  # lần làm mới bị lỗi: chờ 15 phút mới thử lại, không thử lại mỗi lần rerun
+DOWNLOAD_TIMEOUT = 60
+
+_refresh_lock = threading.Lock()
+_refresh_thread = None
+
+def _meta_path(snapshot_file):
+    return snapshot_file + ".meta.json"
+
+def _read_meta(snapshot_file):
+    try:
+        with open(_meta_path(snapshot_file), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_meta(snapshot_file, meta):
+    # Ghi file tạm rồi os.replace: luồng khác / tiến trình khác không bao giờ đọc phải JSON dở dang
+    path = _meta_path(snapshot_file)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, path)
+
+# ====== Tải từ Google Sheets -> snapshot Parquet ======
+def download_snapshot(snapshot_file=SNAPSHOT_FILE, url=CSV_URL, timeout=DOWNLOAD_TIMEOUT):
+    # Gửi ETag cũ (If-None-Match); nếu server trả 304 hoặc nội dung không đổi
+    # thì chỉ cập nhật thời điểm kiểm tra, không ghi lại file Parquet.
+    # Mọi lần thử (kể cả lỗi) đều ghi attempted_at; checked_at chỉ đổi khi tải thành công.
+    meta = _read_meta(snapshot_file)
+    meta["attempted_at"] = time.time()
+    try:
+        changed = _download(snapshot_file, url, timeout, meta)
+    except Exception as e:
+        meta["error"] = repr(e)
+        _write_meta(snapshot_file, meta)
+        raise
+    meta.pop("error", None)
+    _write_meta(snapshot_file, meta)
+    return changed
+
+def _download(snapshot_file, url, timeout, meta):
+    import io
+    import requests
+    headers = {}
+    if meta.get("etag") and os.path.exists(snapshot_file):
+        headers["If-None-Match"] = meta["etag"]
+    response = requests.get(url, headers=headers, timeout=timeout)
+    if response.status_code not in (200, 304):
+        response.raise_for_status()
+        raise RuntimeError(f"HTTP {response.status_code}")
+
+    digest = hashlib.sha256(response.content).hexdigest() if response.status_code == 200 else meta.get("sha256")
+    changed = response.status_code == 200 and digest != meta.get("sha256")
+    if changed or not os.path.exists(snapshot_file):
+        df = pd.read_csv(io.BytesIO(response.content)).fillna('')
+        os.makedirs(os.path.dirname(snapshot_file) or ".", exist_ok=True)
+        tmp_path = f"{snapshot_file}.tmp-{os.getpid()}"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, snapshot_file)
+
+    meta.update({
+        "url": url,
+        "etag": response.headers.get("ETag", meta.get("etag")),
+        "sha256": digest,
+        "checked_at": time.time(),
+    })
+    return changed
+
+def is_stale(snapshot_file=SNAPSHOT_FILE, max_age=MAX_AGE, retry_interval=RETRY_INTERVAL):
+    meta = _read_meta(snapshot_file)
+    checked_at = meta.get("checked_at")
+    if checked_at is None:
+        checked_at = os.path.getmtime(snapshot_file)
+    now = time.time()
+    if now - meta.get("attempted_at", 0) < retry_interval:
+        return False  # vừa thử (và lỗi) gần đây
+    return now - checked_at > max_age
+
+def refresh_in_background(snapshot_file=SNAPSHOT_FILE):
+    # Tối đa một luồng làm mới tại một thời điểm; lỗi mạng được bỏ qua (vẫn dùng snapshot cũ)
+    global _refresh_thread
+    with _refresh_lock:
+        if _refresh_thread is not None and _refresh_thread.is_alive():
+            return _refresh_thread
+
+        def run():
+            try:
+                download_snapshot(snapshot_file)
+            except Exception:
+                pass
+
+        _refresh_thread = threading.Thread(target=run, name="dataset-refresh", daemon=True)
+        _refresh_thread.start()
+        return _refresh_thread
+
+# ====== Load dữ liệu huấn luyện ======
+def load_dataset(snapshot_file=SNAPSHOT_FILE, max_age=MAX_AGE):
+    # Chỉ gọi khi thật sự cần huấn luyện. Có snapshot -> đọc local ngay
+    # (cũ thì làm mới ở nền); chưa có -> tải đồng bộ một lần rồi lưu snapshot.
+    if not os.path.exists(snapshot_file):
+        download_snapshot(snapshot_file)
+    elif is_stale(snapshot_file, max_age):
+        refresh_in_background(snapshot_file)
+    return pd.read_parquet(snapshot_file)
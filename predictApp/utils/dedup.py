@@ -0,0 +1,113 @@
+# utils/dedup.py
+# Gộp các bình luận trùng lặp trước khi dịch / làm sạch / dự đoán.
+#
+#   groups = collapse(df["content"])                 # trùng khớp sau khi chuẩn hóa
+#   groups = collapse(df["content"], near=True)      # thêm gần trùng (MinHash + LSH)
+#   clean = process(groups.unique)                   # chỉ xử lý mỗi nhóm một lần
+#   df["clean_content"] = groups.scatter(clean)      # trả kết quả về mọi dòng gốc
+#
+# Nhóm gần trùng chỉ nên dùng chung nhãn cảm xúc: các bình luận trong nhóm vẫn khác nhau về chữ
+# ("... cẩn thận" / "... cẩn thận đm"), nên clean_content và kiểm tra từ cấm phải tính theo
+# groups.exact (nhóm trùng khớp) rồi lấy văn bản đại diện qua groups.representatives.
+#
+# Hai bình luận coi là trùng khi giống nhau sau bước regex của clean_data (chữ thường, bỏ ký tự
+# lặp / emoji / dấu câu, thay từ viết tắt): "Sản phẩm tốt!!!" và "sản phẩm tốt" chung một nhóm.
+
+import zlib
+import numpy as np
+import pandas as pd
+import utils.func
+
+# ====== Cấu hình gần trùng ======
+NEAR_THRESHOLD = 0.8   # Jaccard tối thiểu giữa hai tập shingle
+NUM_PERM = 64          # số hàm băm MinHash
+BANDS = 16             # số band LSH (NUM_PERM / BANDS hàng mỗi band)
+SHINGLE_SIZE = 3       # shingle theo ký tự
+_PRIME = (1 << 31) - 1
+
+# ====== MinHash + LSH ======
+def shingles(text, size=SHINGLE_SIZE):
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+class MinHasher:
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, _PRIME, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self.b = rng.randint(0, _PRIME, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+    def signature(self, shingle_set):
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingle_set),
+                             dtype=np.uint64, count=len(shingle_set))
+        # (a * h + b) mod p cho mọi hàm băm cùng lúc; a, h < 2^32 nên không tràn uint64
+        return ((np.outer(self.a, hashes) + self.b[:, None]) % _PRIME).min(axis=1)
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+def near_duplicate_groups(texts, threshold=NEAR_THRESHOLD, num_perm=NUM_PERM, bands=BANDS):
+    # Trả về mảng rep: rep[i] là vị trí bình luận đại diện (xuất hiện sớm nhất) của nhóm chứa texts[i].
+    # LSH chỉ đưa ra ứng viên; mỗi ứng viên được kiểm tra lại bằng Jaccard thật với đại diện,
+    # so với đại diện (không so bắc cầu) để các nhóm không bị trôi dần.
+    hasher = MinHasher(num_perm)
+    rows = num_perm // bands
+    buckets = [{} for _ in range(bands)]
+    sets = [shingles(str(text)) for text in texts]
+    rep = np.arange(len(sets))
+    for i, shingle_set in enumerate(sets):
+        signature = hasher.signature(shingle_set)
+        keys = [signature[band * rows:(band + 1) * rows].tobytes() for band in range(bands)]
+        candidates = set()
+        for band, key in enumerate(keys):
+            candidates.update(buckets[band].get(key, ()))
+        for candidate in sorted(candidates):
+            if jaccard(shingle_set, sets[candidate]) >= threshold:
+                rep[i] = candidate
+                break
+        if rep[i] == i:
+            # Chỉ đại diện mới được đưa vào bảng băm
+            for band, key in enumerate(keys):
+                buckets[band].setdefault(key, []).append(i)
+    return rep
+
+# ====== Gộp / trả kết quả ======
+class Collapsed:
+    def __init__(self, unique, inverse, exact=None, parent=None):
+        self.unique = unique      # Series các bình luận đại diện (giá trị gốc, chưa chuẩn hóa)
+        self.inverse = inverse    # inverse[i] = vị trí trong unique của dòng thứ i
+        self.rows = len(inverse)
+        # Gộp gần trùng: exact là cách gộp trùng khớp bên dưới, parent[j] = nhóm chứa nhóm trùng khớp j
+        self.exact = exact if exact is not None else self
+        self.parent = parent if parent is not None else np.arange(len(unique))
+
+    @property
+    def representatives(self):
+        # Vị trí trong exact.unique của nhóm trùng khớp đại diện cho từng nhóm
+        return np.unique(self.parent, return_index=True)[1]
+
+    @property
+    def saved(self):
+        # Số dòng không phải xử lý lại nhờ gộp
+        return self.rows - len(self.unique)
+
+    def scatter(self, values):
+        # Trả giá trị của từng nhóm về mọi dòng gốc
+        return np.asarray(list(values), dtype=object)[self.inverse]
+
+def collapse(texts, near=False, threshold=NEAR_THRESHOLD, normalize=True):
+    # normalize=False: chỉ gộp văn bản giống hệt (vd: văn bản đã qua clean_data)
+    texts = pd.Series(list(texts), dtype=object)
+    keys = utils.func.normalize_batch(texts) if normalize else texts.astype(str)
+    # factorize băm văn bản đã chuẩn hóa; mã nhóm đánh theo thứ tự xuất hiện đầu tiên
+    codes, uniques = pd.factorize(keys)
+    _, first = np.unique(codes, return_index=True)
+    exact = Collapsed(texts.iloc[first].reset_index(drop=True), codes)
+    if not near or len(uniques) <= 1:
+        return exact
+    rep = near_duplicate_groups(list(uniques), threshold)
+    rep_codes, _ = pd.factorize(rep)
+    # Đại diện của nhóm gần trùng là nhóm trùng khớp xuất hiện đầu tiên (rep[j] <= j)
+    _, rep_first = np.unique(rep_codes, return_index=True)
+    return Collapsed(exact.unique.iloc[rep_first].reset_index(drop=True), rep_codes[codes],
+                     exact=exact, parent=rep_codes)
@@ -0,0 +1,108 @@
+# utils/fake_tiki.py
+
+import os
+import json
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ====== Server giả lập API review của Tiki ======
+# Phát lại các trang JSON đã ghi (file <product_id>_<page>.json, xem --record-dir của utils.crawler)
+# để chạy crawler không cần mạng. Trang không có file -> {"data": []}.
+class FakeTikiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    record_dir = "."
+    fail_every = 0      # > 0: cứ mỗi N request trả về fail_status một lần, để thử cơ chế retry
+    fail_status = 503   # 429 để thử giới hạn tốc độ (kèm Retry-After: 0)
+    fail_first = 0      # > 0: N request đầu của mỗi trang trả về fail_status (không phụ thuộc thứ tự request)
+    fail_products = ()  # product_id luôn trả về 503, để thử sản phẩm lỗi hết số lần thử
+    drop_first = 0      # > 0: N request đầu của mỗi trang bị đóng kết nối không trả lời (server ngắt kết nối)
+    truncate_first = 0  # > 0: N request đầu của mỗi trang chỉ nhận nửa body rồi bị đóng kết nối
+    _count = 0
+    _attempts = {}      # (product_id, page) -> số request đã nhận
+    _lock = threading.Lock()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path != "/api/v2/reviews":
+            return self._send(404, {"error": "not found"})
+        cls = type(self)  # mỗi server có lớp handler riêng (start_fake_server) nên đếm riêng
+        with self._lock:
+            cls._count += 1
+            count = cls._count
+        query = parse_qs(url.query)
+        product_id = query.get("product_id", [""])[0]
+        page = query.get("page", ["1"])[0]
+        if product_id in {str(p) for p in self.fail_products}:
+            return self._send(503, {"error": "thử lại sau"})
+        with self._lock:
+            attempt = cls._attempts[product_id, page] = cls._attempts.get((product_id, page), 0) + 1
+        if attempt <= self.drop_first:
+            self.close_connection = True
+            return
+        if attempt <= self.truncate_first:
+            return self._send(200, {"data": [], "padding": "x" * 100}, truncate=True)
+        if attempt <= self.fail_first or (self.fail_every and count % self.fail_every == 0):
+            return self._send(self.fail_status, {"error": "thử lại sau"},
+                              {"Retry-After": "0"} if self.fail_status == 429 else None)
+
+        path = os.path.join(self.record_dir, f"{product_id}_{page}.json")
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return self._send(200, json.load(f))
+        self._send(200, {"data": []})
+
+    def _send(self, status, payload, headers=None, truncate=False):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if truncate:
+            self.wfile.write(body[:len(body) // 2])
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_fake_server(record_dir, host="127.0.0.1", port=0, fail_every=0, fail_status=503, fail_products=(),
+                      fail_first=0, drop_first=0, truncate_first=0):
+    # Chạy server trên một luồng nền; port=0 -> tự chọn cổng trống. Trả về (server, base_url).
+    # server.RequestHandlerClass._count: số request đã nhận.
+    handler = type("Handler", (FakeTikiHandler,), {
+        "record_dir": record_dir, "fail_every": fail_every, "fail_status": fail_status,
+        "fail_products": tuple(fail_products), "fail_first": fail_first, "drop_first": drop_first,
+        "truncate_first": truncate_first, "_count": 0, "_attempts": {},
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Server giả lập API review Tiki")
+    parser.add_argument("--dir", required=True, help="thư mục chứa các file <product_id>_<page>.json")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--fail-every", type=int, default=0)
+    parser.add_argument("--fail-status", type=int, default=503)
+    parser.add_argument("--fail-first", type=int, default=0)
+    parser.add_argument("--drop-first", type=int, default=0)
+    parser.add_argument("--truncate-first", type=int, default=0)
+    args = parser.parse_args()
+    server, url = start_fake_server(args.dir, args.host, args.port, args.fail_every, args.fail_status,
+                                    fail_first=args.fail_first, drop_first=args.drop_first,
+                                    truncate_first=args.truncate_first)
+    print(f"🧪 Fake Tiki API tại {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
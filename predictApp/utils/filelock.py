@@ -0,0 +1,55 @@
+# utils/filelock.py
+
+import os
+import time
+from contextlib import contextmanager
+
+# ====== Khóa độc quyền giữa các tiến trình ======
+# Dùng khóa của hệ điều hành (flock / msvcrt) trên một file khóa thay vì tạo file bằng O_EXCL:
+# tiến trình bị kill thì hệ điều hành tự nhả khóa, không để lại file khóa "mồ côi" phải xóa tay.
+# Mỗi lần gọi mở file riêng nên hai luồng trong cùng tiến trình cũng loại trừ nhau.
+class LockBusy(RuntimeError):
+    # blocking=False và khóa đang bị tiến trình / luồng khác giữ
+    pass
+
+if os.name == "nt":
+    import msvcrt
+
+    def _try_lock(f):
+        f.seek(0)
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def _unlock(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _try_lock(f):
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def _unlock(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+@contextmanager
+def file_lock(path, blocking=True, poll=0.05):
+    f = open(path, "a+")
+    try:
+        while not _try_lock(f):
+            if not blocking:
+                raise LockBusy(f"{path} đang bị khóa bởi một tiến trình khác")
+            time.sleep(poll)
+        try:
+            yield
+        finally:
+            _unlock(f)
+    finally:
+        f.close()
@@ -1,14 +1,22 @@
 # utils/func.py
 
+import os
 import re
 import joblib
 import pandas as pd
 from underthesea import word_tokenize
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
 import streamlit as st
 from deep_translator import GoogleTranslator
+from utils.cache import TextCache
+from utils.history import HistoryStore
+from utils.dataset import load_dataset
+from utils.translate import is_vietnamese
+import utils.client
+import utils.metrics
+import utils.online
+from utils.scorer import FastScorer
+from utils.banned import BannedWordMatcher, read_bad_words, matcher_from_words
+from utils.artifact import ARTIFACT_DIR, MANIFEST_FILE, ArtifactScorer, save_artifact, load_artifact
 
 # ====== Biểu thức emoji ======
 emoji_pattern = re.compile(
@@ -42,13 +50,18 @@ short_word_dict = {
 }
 
 # ====== Dịch sang Tiếng Việt ======
+# Dịch từng câu; các trang dùng translate_batch (utils/translate.py), nơi đo bước "translate"
 def translate_to_vietnamese(text):
+    # Bình luận đã là tiếng Việt thì không cần gọi Google Translate
+    if is_vietnamese(text):
+        return text
     try:
         return GoogleTranslator(source='auto', target='vi').translate(text)
     except Exception:
         return text
 
 # ====== Hàm tiền xử lý dữ liệu ======
+@utils.metrics.timed("clean")
 def clean_data(text):
     text = str(text).lower()
     text = re.sub(r'(.)\1{2,}', r'\1', text)  # xóa lặp ký tự
@@ -61,22 +74,80 @@ def clean_data(text):
     text = word_tokenize(text, format="text") # tách từ underthesea
     return text
 
-# ====== Load dữ liệu từ Google Sheets ======
+# ====== Tiền xử lý theo lô (vectorized) ======
+# Các regex được biên dịch sẵn một lần, thay vì re.sub(...) biên dịch/tra cache mỗi dòng
+repeat_pattern = re.compile(r'(.)\1{2,}')
+# Gộp xóa emoji (-> '') và xóa ký tự đặc biệt (-> ' ') vào một lượt quét
+symbol_pattern = re.compile("(" + emoji_pattern.pattern + ")|[^\\w\\s]", flags=re.UNICODE)
+space_pattern = re.compile(r'\s+')
+# Sau khi xóa ký tự đặc biệt, mỗi từ là một dãy \w liền nhau nên \b khớp đúng ranh giới từ
+short_word_pattern = re.compile(
+    r'\b(' + '|'.join(sorted(map(re.escape, short_word_dict), key=len, reverse=True)) + r')\b'
+)
+
+def _replace_symbol(match):
+    return '' if match.group(1) else ' '
+
+def _replace_short_word(match):
+    return short_word_dict[match.group(1)]
+
+def normalize_text(text):
+    # Phần regex của clean_data (trước bước tách từ) cho một bình luận
+    text = repeat_pattern.sub(r'\1', str(text).lower())
+    text = space_pattern.sub(' ', symbol_pattern.sub(_replace_symbol, text)).strip()
+    return short_word_pattern.sub(_replace_short_word, text)
+
+def normalize_batch(texts):
+    # Phần regex của clean_data cho cả cột, dùng các phép .str của pandas
+    index = texts.index if isinstance(texts, pd.Series) else None
+    s = pd.Series(list(texts), index=index, dtype=object).astype(str)
+    s = s.str.lower()
+    s = s.str.replace(repeat_pattern, r'\1', regex=True)         # xóa lặp ký tự
+    s = s.str.replace(symbol_pattern, _replace_symbol, regex=True)  # xóa emoji + ký tự đặc biệt
+    s = s.str.replace(space_pattern, ' ', regex=True).str.strip()
+    return s.str.replace(short_word_pattern, _replace_short_word, regex=True)  # từ viết tắt
+
+def tokenize_batch(texts):
+    return texts.map(lambda text: word_tokenize(text, format="text"))  # tách từ underthesea
+
+def clean_batch(texts):
+    # Cho kết quả giống hệt clean_data(text) trên từng phần tử, nhưng xử lý cả cột một lần
+    return tokenize_batch(normalize_batch(texts))
+
+# ====== Cache dịch + tiền xử lý (dùng chung cho mọi phiên) ======
+@st.cache_resource
+def get_text_cache():
+    return TextCache()
+
+# ====== Endpoint /metrics cho tiến trình Streamlit (khi đặt METRICS_PORT) ======
+@st.cache_resource
+def get_metrics_server():
+    return utils.metrics.serve_from_env()
+
+# ====== Lịch sử bình luận (SQLite) ======
 @st.cache_resource
+def get_history_store():
+    store = HistoryStore()
+    store.migrate_csv()  # chỉ chạy một lần: chép user_comments.csv cũ vào SQLite
+    return store
+
+# ====== Load dữ liệu huấn luyện ======
+# Đọc từ snapshot Parquet local (data/train_2label.parquet); chỉ tải từ Google Sheets
+# khi chưa có snapshot, và làm mới ở nền khi snapshot đã cũ (xem utils/dataset.py).
 def load_data():
-    sheet_id = "1EnVA5D0khzVuaD6fn6wtCFLWurUXimusiUuIl-qR7pM"
-    gid = "1173905870"
-    csv_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/gviz/tq?tqx=out:csv&gid={gid}"
     try:
-        df = pd.read_csv(csv_url)
-        df = df.fillna('')
-        return df
+        return load_dataset()
     except Exception as e:
         st.error(f"Lỗi khi tải dữ liệu từ Google Sheets: {e}")
         return pd.DataFrame()  # Trả về rỗng nếu lỗi
 
 # ====== Huấn luyện model ======
 def train_model(df):
+    # sklearn chỉ được import khi thật sự huấn luyện, không làm chậm lúc khởi động app
+    from sklearn.feature_extraction.text import CountVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import train_test_split
+
     vectorizer = CountVectorizer()
     model = LogisticRegression(max_iter=500)
 
@@ -98,25 +169,72 @@ def train_model(df):
 
 def load_bad_words(file_path="bad_words.txt"):
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            words = [line.strip().lower() for line in f if line.strip()]
-        return words
+        return read_bad_words(file_path)
     except:
         return []
 
 def contains_bad_words(text, bad_words):
-    words = text.split()
-    for w in words:
-        if w.lower() in bad_words:
-            return True
-    return False
+    # bad_words: BannedWordMatcher (vd: get_matcher()) hoặc danh sách từ;
+    # automaton tìm được cả cụm nhiều từ, kể cả khi bị nối bằng '_' sau word_tokenize
+    if not isinstance(bad_words, BannedWordMatcher):
+        bad_words = matcher_from_words(tuple(bad_words))
+    return bad_words.contains(text)
 
 # ====== Lưu / Load model ======
-def save_model(model, vectorizer, model_file='lr_model_2label.pkl', vectorizer_file='count_2label.pkl'):
-    joblib.dump(model, model_file)
-    joblib.dump(vectorizer, vectorizer_file)
+# Model được lưu ở định dạng artifact (manifest + mảng mmap, xem utils/artifact.py);
+# pickle joblib cũ vẫn đọc được khi chưa có artifact.
+def save_model(model, vectorizer, artifact_dir=ARTIFACT_DIR, metadata=None):
+    return save_artifact(model, vectorizer, artifact_dir, metadata)
 
-def load_model(model_file='lr_model_2label.pkl', vectorizer_file='count_2label.pkl'):
+def load_model(artifact_dir=ARTIFACT_DIR, model_file='lr_model_2label.pkl', vectorizer_file='count_2label.pkl'):
+    if os.path.exists(os.path.join(artifact_dir, MANIFEST_FILE)):
+        return load_artifact(artifact_dir)
     model = joblib.load(model_file)
     vectorizer = joblib.load(vectorizer_file)
     return model, vectorizer
+
+def model_exists(artifact_dir=ARTIFACT_DIR, model_file='lr_model_2label.pkl', vectorizer_file='count_2label.pkl'):
+    return (os.path.exists(os.path.join(artifact_dir, MANIFEST_FILE))
+            or (os.path.exists(model_file) and os.path.exists(vectorizer_file)))
+
+# Giữ model trong bộ nhớ giữa các lần rerun, không load lại mỗi lần bấm nút
+@st.cache_resource
+def get_artifact_model(artifact_dir=ARTIFACT_DIR):
+    return load_model(artifact_dir)
+
+# Snapshot học tăng dần (utils/online.py) đang được promote sẽ thay model artifact khi dự đoán.
+# Phiên bản là một phần của khóa cache: promote bản mới thì lần gọi sau tự load bản đó.
+@st.cache_resource
+def get_online_model(version, online_dir=utils.online.ONLINE_DIR):
+    return utils.online.SnapshotStore(online_dir).load(version)
+
+# PREDICT_SHARED_MODEL=1 (chạy nhiều worker): dự đoán thẳng từ artifact mmap, mọi worker dùng chung bộ nhớ.
+# Mặc định dùng FastScorer: nhanh hơn khi dự đoán từng câu nhưng giữ dict token -> trọng số riêng mỗi tiến trình.
+SHARED_MODEL = os.environ.get("PREDICT_SHARED_MODEL", "0") == "1"
+
+@st.cache_resource
+def get_artifact_scorer(artifact_dir=ARTIFACT_DIR):
+    model, vectorizer = get_artifact_model(artifact_dir)
+    if SHARED_MODEL:
+        return ArtifactScorer(model, vectorizer)
+    return FastScorer.from_sklearn(model, vectorizer)
+
+def get_scorer(artifact_dir=ARTIFACT_DIR):
+    # OnlineModel có sẵn predict(texts) (HashingVectorizer không có vocabulary cho FastScorer)
+    version = utils.online.promoted_version()
+    if version:
+        return get_online_model(version)
+    return get_artifact_scorer(artifact_dir)
+
+# ====== Dự đoán ======
+def predict_labels(clean_texts):
+    # Gọi service dự đoán nếu có PREDICT_SERVICE_URL, ngược lại dùng model local (get_scorer)
+    clean_texts = list(clean_texts)
+    utils.metrics.inc("predictions_total", len(clean_texts))
+    if utils.client.SERVICE_URL:
+        with utils.metrics.timer("predict_remote"):
+            labels, _ = utils.client.predict_remote(clean_texts)
+        return labels
+    # FastScorer vector hóa và tính điểm trong cùng một lượt nên chỉ đo chung một bước
+    with utils.metrics.timer("predict"):
+        return get_scorer().predict(clean_texts)
@@ -0,0 +1,148 @@
+# utils/history.py
+
+import os
+import csv
+import io
+import sqlite3
+import threading
+from datetime import datetime
+import pandas as pd
+
+# ====== Cấu hình ======
+HISTORY_FILE = os.environ.get("HISTORY_DB_PATH", "user_comments.sqlite")
+LEGACY_CSV_FILE = "user_comments.csv"
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+EXPORT_COLUMNS = ["created_at", "comment", "prediction"]
+
+# ====== Kho lịch sử bình luận (SQLite, WAL) ======
+class HistoryStore:
+    # Mỗi lần lưu là một INSERT (không ghi lại cả file), nhiều phiên ghi đồng thời an toàn;
+    # truy vấn theo khoảng ngày / nhãn dùng index và phân trang.
+    def __init__(self, path=HISTORY_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS comments (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at TEXT NOT NULL,
+                comment TEXT NOT NULL,
+                prediction TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_comments_created_at ON comments(created_at);
+            CREATE INDEX IF NOT EXISTS idx_comments_prediction ON comments(prediction, created_at);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        self._conn.commit()
+
+    def append(self, comment, prediction, created_at=None):
+        created_at = created_at or datetime.now().strftime(TIME_FORMAT)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO comments (created_at, comment, prediction) VALUES (?, ?, ?)",
+                (created_at, str(comment), str(prediction)),
+            )
+            self._conn.commit()
+
+    def _where(self, start=None, end=None, label=None):
+        # start / end: datetime.date hoặc chuỗi 'YYYY-MM-DD' (bao gồm cả ngày end)
+        clauses, params = [], []
+        if start:
+            clauses.append("created_at >= ?")
+            params.append(str(start))
+        if end:
+            clauses.append("created_at < date(?, '+1 day')")
+            params.append(str(end))
+        if label:
+            clauses.append("prediction = ?")
+            params.append(label)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def count(self, start=None, end=None, label=None):
+        where, params = self._where(start, end, label)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM comments{where}", params).fetchone()[0]
+
+    def page(self, page=1, page_size=50, start=None, end=None, label=None):
+        # Trang mới nhất trước
+        where, params = self._where(start, end, label)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, created_at, comment, prediction FROM comments{where} "
+                f"ORDER BY id DESC LIMIT ? OFFSET ?",
+                params + [page_size, (page - 1) * page_size],
+            ).fetchall()
+        return pd.DataFrame(rows, columns=["id"] + EXPORT_COLUMNS)
+
+    def labels(self):
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT DISTINCT prediction FROM comments ORDER BY 1")]
+
+    def iter_csv(self, start=None, end=None, label=None, batch_size=5000):
+        # Xuất CSV từng khối, không dựng cả bảng trong bộ nhớ
+        where, params = self._where(start, end, label)
+        conn = sqlite3.connect(self.path, timeout=30)  # kết nối riêng để không giữ khóa lâu
+        try:
+            cursor = conn.execute(f"SELECT {', '.join(EXPORT_COLUMNS)} FROM comments{where} ORDER BY id", params)
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            yield "\ufeff" + buffer.getvalue()  # BOM như utf-8-sig
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(rows)
+                yield buffer.getvalue()
+        finally:
+            conn.close()
+
+    def export_csv(self, file_path, **filters):
+        with open(file_path, "w", encoding="utf-8", newline="") as f:
+            for chunk in self.iter_csv(**filters):
+                f.write(chunk)
+        return file_path
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM comments")
+            self._conn.commit()
+
+    # ====== Chuyển dữ liệu từ user_comments.csv (một lần) ======
+    def migrate_csv(self, csv_path=LEGACY_CSV_FILE, chunksize=10000):
+        # Kiểm tra cờ, chép dữ liệu và đặt cờ trong cùng một transaction BEGIN IMMEDIATE:
+        # hai tiến trình khởi động cùng lúc không thể cùng chép file CSV hai lần.
+        if not os.path.exists(csv_path):
+            return 0
+        total = 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                done = self._conn.execute("SELECT value FROM meta WHERE key = 'migrated_csv'").fetchone()
+                if done:
+                    self._conn.rollback()
+                    return 0
+                created_at = datetime.fromtimestamp(os.path.getmtime(csv_path)).strftime(TIME_FORMAT)
+                for chunk in pd.read_csv(csv_path, chunksize=chunksize, encoding="utf-8-sig"):
+                    chunk = chunk.fillna("")
+                    self._conn.executemany(
+                        "INSERT INTO comments (created_at, comment, prediction) VALUES (?, ?, ?)",
+                        [(created_at, str(c), str(p)) for c, p in zip(chunk["comment"], chunk["prediction"])],
+                    )
+                    total += len(chunk)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_csv', ?)",
+                    (f"{os.path.abspath(csv_path)}: {total} dòng",),
+                )
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+        return total
+
+    def close(self):
+        self._conn.close()
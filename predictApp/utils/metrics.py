@@ -0,0 +1,253 @@
+# utils/metrics.py
+# Đo thời gian từng bước (dịch, làm sạch, từ cấm, vector hóa, dự đoán) và các bộ đếm.
+#
+#   with utils.metrics.timer("translate"):
+#       ...
+#   @utils.metrics.timed("clean")
+#   def clean_data(text): ...
+#   utils.metrics.inc("text_cache_hits_total", 3)
+#
+# Số liệu nằm trong bộ nhớ của tiến trình (dùng chung cho mọi phiên Streamlit), xem ở trang
+# Diagnostics hoặc dạng text Prometheus tại /metrics (service.py, hoặc METRICS_PORT cho app).
+# Tắt bằng PREDICT_METRICS=0: timer() trả về một context manager rỗng dùng chung, gần như không tốn gì.
+
+import os
+import time
+import bisect
+import threading
+from collections import deque
+from contextlib import nullcontext
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ====== Cấu hình ======
+ENABLED = os.environ.get("PREDICT_METRICS", "1") != "0"
+PREFIX = "predict_app_"
+WINDOW = 1024  # số lần đo gần nhất giữ lại để tính p50/p90/p99
+# Mốc histogram (giây) cho thời gian một bước
+TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Mốc histogram cho số dòng (kích thước lô)
+SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+# ====== Các loại số liệu ======
+class Counter:
+    kind = "counter"
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, value=1):
+        with self._lock:
+            self.value += value
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+
+class Histogram:
+    # Histogram cộng dồn (theo mốc, cho Prometheus) + cửa sổ trượt các lần đo gần nhất (cho phân vị)
+    kind = "histogram"
+
+    def __init__(self, buckets=TIME_BUCKETS, window=WINDOW):
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * (len(self.buckets) + 1)  # phần tử cuối là +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.bucket_counts[i] += 1
+            self.count += 1
+            self.sum += value
+            self.recent.append(value)
+
+    def quantiles(self, qs=(0.5, 0.9, 0.99)):
+        with self._lock:
+            values = sorted(self.recent)
+        if not values:
+            return [None] * len(qs)
+        return [values[min(int(q * len(values)), len(values) - 1)] for q in qs]
+
+
+# ====== Registry ======
+class Registry:
+    def __init__(self):
+        self._metrics = {}  # (name, labels) -> metric
+        self._lock = threading.Lock()
+
+    def get(self, cls, name, labels=(), **kwargs):
+        key = (name, labels)
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = self._metrics[key] = cls(**kwargs)
+        return metric
+
+    def items(self):
+        with self._lock:
+            return sorted(self._metrics.items(), key=lambda item: item[0])
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+
+
+REGISTRY = Registry()
+
+# ====== Đo thời gian ======
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+_NOOP = nullcontext()
+
+def stage_histogram(stage):
+    return REGISTRY.get(Histogram, "stage_seconds", (("stage", stage),))
+
+def timer(stage):
+    # Context manager đo thời gian một bước; không làm gì khi metrics bị tắt
+    if not ENABLED:
+        return _NOOP
+    return _Timer(stage_histogram(stage))
+
+def timed(stage):
+    # Decorator tương đương timer(stage) bọc quanh cả hàm
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                stage_histogram(stage).observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+def inc(name, value=1, **labels):
+    if ENABLED:
+        REGISTRY.get(Counter, name, _labels(labels)).inc(value)
+
+def set_gauge(name, value, **labels):
+    if ENABLED:
+        REGISTRY.get(Gauge, name, _labels(labels)).set(value)
+
+def observe(name, value, buckets=TIME_BUCKETS, **labels):
+    if ENABLED:
+        REGISTRY.get(Histogram, name, _labels(labels), buckets=buckets).observe(value)
+
+def set_enabled(flag):
+    global ENABLED
+    ENABLED = bool(flag)
+
+# ====== Xuất số liệu ======
+def snapshot():
+    # Danh sách dict (một dòng mỗi số liệu) cho trang Diagnostics
+    rows = []
+    for (name, labels), metric in REGISTRY.items():
+        row = {"name": name, "labels": dict(labels), "kind": metric.kind}
+        if metric.kind == "histogram":
+            p50, p90, p99 = metric.quantiles()
+            row.update({
+                "count": metric.count,
+                "sum": metric.sum,
+                "mean": metric.sum / metric.count if metric.count else None,
+                "p50": p50, "p90": p90, "p99": p99,
+                "buckets": list(zip(metric.buckets + (float("inf"),), metric.bucket_counts)),
+            })
+        else:
+            row["value"] = metric.value
+        rows.append(row)
+    return rows
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in pairs) + "}"
+
+def render_prometheus():
+    # Định dạng text exposition của Prometheus (version 0.0.4)
+    lines = []
+    typed = set()
+    for (name, labels), metric in REGISTRY.items():
+        full_name = PREFIX + name
+        if full_name not in typed:
+            lines.append(f"# TYPE {full_name} {metric.kind}")
+            typed.add(full_name)
+        if metric.kind == "histogram":
+            cumulative = 0
+            for bound, count in zip(metric.buckets + (float("inf"),), metric.bucket_counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{full_name}_bucket{_format_labels(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{full_name}_sum{_format_labels(labels)} {metric.sum}")
+            lines.append(f"{full_name}_count{_format_labels(labels)} {metric.count}")
+        else:
+            lines.append(f"{full_name}{_format_labels(labels)} {metric.value}")
+    return "\n".join(lines) + "\n"
+
+# ====== Endpoint /metrics riêng (cho tiến trình Streamlit) ======
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+_server = None
+_server_lock = threading.Lock()
+
+def start_http_server(port, host="127.0.0.1"):
+    # Chạy server /metrics trên một luồng nền; gọi nhiều lần chỉ khởi động một server
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    return _server
+
+def serve_from_env():
+    # METRICS_PORT=9100 streamlit run app.py -> http://127.0.0.1:9100/metrics
+    port = os.environ.get("METRICS_PORT")
+    if not port:
+        return None
+    return start_http_server(int(port), os.environ.get("METRICS_HOST", "127.0.0.1"))
@@ -0,0 +1,278 @@
+# utils/online.py
+
+import os
+import json
+import time
+import argparse
+import threading
+from contextlib import contextmanager
+import joblib
+import numpy as np
+import pandas as pd
+from utils.filelock import file_lock
+
+# ====== Cấu hình ======
+ONLINE_DIR = os.environ.get("ONLINE_MODEL_DIR", "online_models")
+REGISTRY_FILE = "registry.json"
+LOCK_FILE = ".lock"
+HOLDOUT_FILE = "data_test_file.csv"
+N_FEATURES = 2 ** 20
+PROMOTE_TOLERANCE = 0.005  # snapshot mới được promote nếu độ chính xác không giảm quá mức này
+# Tập nhãn đầy đủ của model (khai báo trước: SGDClassifier.partial_fit không nhận nhãn chưa khai báo)
+LABELS = ("cực kỳ hài lòng", "không hài lòng")
+
+# ====== Model học tăng dần ======
+class OnlineModel:
+    # HashingVectorizer không cần fit (không có vocabulary) nên lô dữ liệu mới
+    # chỉ cần partial_fit, không phải huấn luyện lại từ đầu.
+    # sklearn chỉ được import khi tạo model, không làm chậm lúc khởi động app
+    def __init__(self, classes=LABELS, n_features=N_FEATURES):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        from sklearn.linear_model import SGDClassifier
+        self.classes = sorted(classes)
+        self.vectorizer = HashingVectorizer(n_features=n_features, alternate_sign=False, norm="l2")
+        self.model = SGDClassifier(loss="log_loss", alpha=1e-5, random_state=42)
+        self.samples_seen = 0
+
+    def check_labels(self, labels):
+        unknown = set(labels) - set(self.classes)
+        if unknown:
+            raise ValueError(f"Nhãn {sorted(unknown)} không thuộc tập nhãn của model {self.classes}. "
+                             f"Khai báo đủ nhãn (LABELS / --labels) rồi cập nhật vào một thư mục snapshot mới.")
+
+    def partial_fit(self, texts, labels, batch_size=10000):
+        texts = [str(t) for t in texts]
+        labels = list(labels)
+        self.check_labels(labels)
+        for start in range(0, len(texts), batch_size):
+            features = self.vectorizer.transform(texts[start:start + batch_size])
+            self.model.partial_fit(features, labels[start:start + batch_size], classes=self.classes)
+        self.samples_seen += len(texts)
+        return self
+
+    def predict(self, texts):
+        # Cùng kiểu kết quả với FastScorer / ArtifactScorer.predict (list nhãn) để dùng được trong get_scorer
+        return [str(label) for label in self.model.predict(self.vectorizer.transform([str(t) for t in texts]))]
+
+    def predict_proba(self, texts):
+        return self.model.predict_proba(self.vectorizer.transform([str(t) for t in texts]))
+
+    def score(self, texts, labels):
+        return float(np.mean(np.asarray(self.predict(texts)) == np.asarray(list(labels))))
+
+# ====== Lưu các phiên bản (snapshot) ======
+class SnapshotStore:
+    def __init__(self, root=ONLINE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.registry_path = os.path.join(root, REGISTRY_FILE)
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+
+    @contextmanager
+    def lock(self):
+        # Khóa độc quyền thư mục snapshot giữa các tiến trình; gọi lồng nhau được
+        # (update giữ khóa suốt lần cập nhật, save / promote bên trong không khóa lại)
+        with self._thread_lock:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._depth -= 1
+                return
+            with file_lock(os.path.join(self.root, LOCK_FILE)):
+                self._depth = 1
+                try:
+                    yield
+                finally:
+                    self._depth = 0
+
+    def registry(self):
+        if not os.path.exists(self.registry_path):
+            return {"promoted": None, "snapshots": []}
+        with open(self.registry_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_registry(self, registry):
+        tmp_path = f"{self.registry_path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(registry, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.registry_path)
+
+    def _next_version(self, registry):
+        # Số lớn nhất trong registry và trên đĩa + 1 (kể cả file .joblib của lần save bị dừng giữa chừng),
+        # gọi khi đang giữ khóa nên hai tiến trình không bao giờ nhận cùng một phiên bản
+        numbers = [int(s["version"][1:]) for s in registry["snapshots"]]
+        numbers += [int(name[1:5]) for name in os.listdir(self.root)
+                    if name.startswith("v") and name.endswith(".joblib") and name[1:5].isdigit()]
+        return f"v{max(numbers, default=0) + 1:04d}"
+
+    def save(self, model, holdout_accuracy, note=""):
+        with self.lock():
+            registry = self.registry()
+            version = self._next_version(registry)
+            path = os.path.join(self.root, f"{version}.joblib")
+            tmp_path = f"{path}.tmp-{os.getpid()}"
+            joblib.dump(model, tmp_path)
+            os.replace(tmp_path, path)
+            registry["snapshots"].append({
+                "version": version,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "samples_seen": model.samples_seen,
+                "holdout_accuracy": holdout_accuracy,
+                "note": note,
+            })
+            self._write_registry(registry)
+        return version
+
+    def promote(self, version):
+        # Chỉ promote snapshot đã được đánh giá trên tập held-out
+        with self.lock():
+            registry = self.registry()
+            info = next((s for s in registry["snapshots"] if s["version"] == version), None)
+            if info is None:
+                raise ValueError(f"Không có snapshot {version}")
+            if info.get("holdout_accuracy") is None:
+                raise ValueError(f"Snapshot {version} chưa được đánh giá trên tập held-out")
+            registry["promoted"] = version
+            self._write_registry(registry)
+
+    def demote(self):
+        # Quay lại phục vụ bằng model artifact (model_2label/)
+        with self.lock():
+            registry = self.registry()
+            registry["promoted"] = None
+            self._write_registry(registry)
+
+    def latest(self):
+        # Snapshot mới nhất (đã học mọi lô dữ liệu), dù có được promote hay không
+        snapshots = self.registry()["snapshots"]
+        return snapshots[-1]["version"] if snapshots else None
+
+    def info(self, version):
+        return next((s for s in self.registry()["snapshots"] if s["version"] == version), None)
+
+    def load(self, version=None):
+        # Mặc định: bản đang được promote
+        version = version or self.registry()["promoted"]
+        if version is None:
+            return None
+        return joblib.load(os.path.join(self.root, f"{version}.joblib"))
+
+def promoted_version(root=ONLINE_DIR):
+    # Đọc nhanh registry (không load model); None nếu chưa có snapshot nào được promote.
+    # get_scorer và service dùng hàm này để phục vụ bản đang promote.
+    path = os.path.join(root, REGISTRY_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("promoted")
+    except (OSError, ValueError):
+        return None
+
+# ====== Cập nhật từ một lô dữ liệu đã gán nhãn ======
+def load_holdout(file_path=HOLDOUT_FILE, text_column="clean_content", label_column="title"):
+    df = pd.read_csv(file_path).dropna(subset=[text_column, label_column])
+    return df[text_column].tolist(), df[label_column].tolist()
+
+def artifact_accuracy(holdout_texts, holdout_labels):
+    # Độ chính xác của model artifact đang phục vụ trên cùng tập held-out (None nếu chưa có model)
+    import utils.func
+    if not utils.func.model_exists():
+        return None
+    model, vectorizer = utils.func.load_model()
+    predicted = model.predict(vectorizer.transform([str(t) for t in holdout_texts]))
+    return float(np.mean(np.asarray(predicted) == np.asarray(list(holdout_labels))))
+
+def update(texts, labels, store=None, holdout=None, tolerance=PROMOTE_TOLERANCE, note="", classes=LABELS):
+    # partial_fit tiếp trên snapshot mới nhất -> lưu snapshot -> đánh giá trên tập held-out
+    # -> chỉ promote khi độ chính xác không thấp hơn bản đang phục vụ quá `tolerance`.
+    # Snapshot mới nhất chứa mọi lô đã cập nhật, kể cả các lô chưa đủ tốt để promote:
+    # nhiều lô nhỏ cộng dồn dần cho tới khi vượt được bản đang phục vụ.
+    # Chưa có bản nào được promote: so với model artifact, vì snapshot đầu tiên sẽ thay nó.
+    store = store or SnapshotStore()
+    holdout_texts, holdout_labels = holdout or load_holdout()
+    if not holdout_texts:
+        raise ValueError("Tập held-out rỗng: không thể đánh giá snapshot trước khi promote")
+    texts = list(texts)
+    labels = list(labels)
+    # Giữ khóa suốt lần cập nhật: hai lần update đồng thời chạy lần lượt, lần sau học tiếp lần trước
+    with store.lock():
+        latest = store.latest()
+        model = store.load(latest) if latest else OnlineModel(classes)
+        model.check_labels(labels)
+        model.check_labels(holdout_labels)
+
+        started = time.monotonic()
+        model.partial_fit(texts, labels)
+        accuracy = model.score(holdout_texts, holdout_labels)
+        version = store.save(model, accuracy, note)
+
+        promoted = store.registry()["promoted"]
+        if promoted:
+            baseline, baseline_name = store.info(promoted)["holdout_accuracy"], promoted
+        else:
+            baseline, baseline_name = artifact_accuracy(holdout_texts, holdout_labels), "artifact"
+        accepted = baseline is None or accuracy >= baseline - tolerance
+        if accepted:
+            store.promote(version)
+    return {
+        "version": version,
+        "parent": latest,
+        "rows": len(texts),
+        "seconds": round(time.monotonic() - started, 3),
+        "holdout_accuracy": accuracy,
+        "baseline": baseline_name,
+        "baseline_accuracy": baseline,
+        "promoted": accepted,
+    }
+
+# ====== Dòng lệnh ======
+# python -m utils.online update --file labeled.csv [--text-column clean_content] [--label-column title]
+# python -m utils.online update --file history.csv --text-column comment --label-column prediction --clean
+# python -m utils.online status
+# python -m utils.online promote v0003
+# python -m utils.online demote          # quay lại model artifact
+def main():
+    parser = argparse.ArgumentParser(description="Cập nhật model tăng dần từ bình luận đã gán nhãn")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_update = sub.add_parser("update")
+    p_update.add_argument("--file", required=True)
+    p_update.add_argument("--text-column", default="clean_content")
+    p_update.add_argument("--label-column", default="title")
+    p_update.add_argument("--holdout", default=HOLDOUT_FILE)
+    p_update.add_argument("--tolerance", type=float, default=PROMOTE_TOLERANCE)
+    p_update.add_argument("--labels", nargs="+", default=list(LABELS),
+                          help="tập nhãn đầy đủ, chỉ dùng khi tạo model mới (chưa có snapshot)")
+    p_update.add_argument("--clean", action="store_true",
+                          help="chạy clean_data trên cột văn bản trước (vd: lịch sử bình luận đã sửa nhãn)")
+    sub.add_parser("status")
+    p_promote = sub.add_parser("promote")
+    p_promote.add_argument("version")
+    sub.add_parser("demote")
+    parser.add_argument("--dir", default=ONLINE_DIR)
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.dir)
+    if args.command == "update":
+        df = pd.read_csv(args.file).dropna(subset=[args.text_column, args.label_column])
+        texts = df[args.text_column]
+        if args.clean:
+            from utils.parallel import clean_parallel
+            texts = clean_parallel(texts)
+        report = update(texts, df[args.label_column], store, load_holdout(args.holdout), args.tolerance,
+                        note=os.path.basename(args.file), classes=args.labels)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    elif args.command == "status":
+        print(json.dumps(store.registry(), ensure_ascii=False, indent=2))
+    elif args.command == "demote":
+        store.demote()
+        print("Đã quay lại model artifact")
+    else:
+        store.promote(args.version)
+        print(f"Đã promote {args.version} (held-out: {store.info(args.version)['holdout_accuracy']:.4f})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# utils/parallel.py
+
+import os
+import atexit
+import argparse
+from itertools import chain
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+
+# ====== Cấu hình ======
+# Số tiến trình mặc định, có thể đặt qua biến môi trường CLEAN_WORKERS
+DEFAULT_WORKERS = int(os.environ.get("CLEAN_WORKERS", os.cpu_count() or 1))
+DEFAULT_CHUNK_SIZE = 1000
+
+_pools = {}
+
+# ====== Hàm chạy trong tiến trình con ======
+def _init_worker():
+    # Mỗi tiến trình nạp underthesea (mô hình CRF) đúng một lần
+    from utils.func import clean_data
+    clean_data("khởi động")
+
+def _clean_chunk(texts):
+    from utils.func import clean_batch
+    return clean_batch(texts).tolist()
+
+# ====== Pool dùng chung ======
+def get_pool(workers=DEFAULT_WORKERS):
+    # Giữ pool sống giữa các lần gọi để không phải nạp lại tokenizer
+    pool = _pools.get(workers)
+    if pool is None:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        _pools[workers] = pool
+    return pool
+
+def shutdown_pools():
+    for pool in _pools.values():
+        pool.shutdown(wait=False, cancel_futures=True)
+    _pools.clear()
+
+atexit.register(shutdown_pools)
+
+# ====== Tiền xử lý song song ======
+def clean_parallel(texts, workers=DEFAULT_WORKERS, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Chia texts thành các khối, mỗi khối chạy clean_batch trên một tiến trình;
+    # pool.map trả kết quả theo đúng thứ tự khối nên thứ tự dòng được giữ nguyên
+    index = texts.index if isinstance(texts, pd.Series) else None
+    texts = list(texts)
+    if workers <= 1 or len(texts) <= chunk_size:
+        results = _clean_chunk(texts)
+    else:
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        results = list(chain.from_iterable(get_pool(workers).map(_clean_chunk, chunks)))
+    return pd.Series(results, index=index, dtype=object)
+
+# ====== Dòng lệnh (dùng khi huấn luyện lại offline) ======
+# python -m utils.parallel Tiki_Comments.csv Tiki_Comments_clean.csv --workers 8
+def main():
+    parser = argparse.ArgumentParser(description="Tiền xử lý song song cột bình luận")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--column", default="content")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.input)
+    df = df.dropna(subset=[args.column])
+    df["clean_content"] = clean_parallel(df[args.column], args.workers, args.chunk_size)
+    df.to_csv(args.output, index=False, encoding="utf-8-sig")
+    print(f"Đã xử lý {len(df)} dòng với {args.workers} tiến trình -> {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+# utils/scorer.py
+
+import re
+import json
+import math
+import argparse
+
+# ====== Bộ chấm điểm nhanh cho Logistic Regression ======
+# Thay cho vectorizer.transform(...) + model.predict(...): không tạo ma trận thưa scipy,
+# không qua bước kiểm tra đầu vào của sklearn, chỉ là tra dict token -> trọng số + intercept.
+# Hỗ trợ CountVectorizer(analyzer="word") với token_pattern, lowercase, ngram_range, binary.
+SCORER_FILE = "fast_scorer.json"
+FORMAT_VERSION = 1
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + math.exp(-x)) if x >= 0 else math.exp(x) / (1.0 + math.exp(x))
+
+
+def build_analyzer(token_pattern=r"(?u)\b\w\w+\b", lowercase=True, ngram_range=(1, 1)):
+    # Tách token giống CountVectorizer(analyzer="word")
+    token_re = re.compile(token_pattern)
+    min_n, max_n = ngram_range
+
+    def analyze(text):
+        if lowercase:
+            text = text.lower()
+        tokens = token_re.findall(text)
+        if max_n == 1:
+            return tokens
+        grams = tokens if min_n == 1 else []
+        for n in range(max(min_n, 2), max_n + 1):
+            grams = grams + [" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1)]
+        return grams
+
+    return analyze
+
+
+class FastScorer:
+    def __init__(self, classes, weights, intercept, token_pattern=r"(?u)\b\w\w+\b",
+                 lowercase=True, ngram_range=(1, 1), binary=False):
+        # Hai lớp: weights là dict token -> (cột, trọng số), intercept là số thực.
+        # Nhiều lớp: trọng số/intercept là list, mỗi phần tử ứng với một lớp.
+        self.classes = list(classes)
+        self.weights = weights
+        self.intercept = intercept
+        self.token_pattern = token_pattern
+        self.lowercase = lowercase
+        self.ngram_range = tuple(ngram_range)
+        self.binary = binary
+        self._tokens = build_analyzer(token_pattern, lowercase, self.ngram_range)
+
+    # ====== Xuất từ model sklearn ======
+    @classmethod
+    def from_sklearn(cls, model, vectorizer):
+        params = vectorizer.get_params()
+        unsupported = {
+            "analyzer": "word", "tokenizer": None, "preprocessor": None,
+            "stop_words": None, "strip_accents": None,
+        }
+        for name, expected in unsupported.items():
+            if params.get(name) != expected:
+                raise ValueError(f"FastScorer không hỗ trợ {name}={params.get(name)!r}")
+
+        coef = model.coef_
+        intercept = model.intercept_
+        weights = {}
+        for token, column in vectorizer.vocabulary_.items():
+            if coef.shape[0] == 1:
+                weights[token] = (int(column), float(coef[0, column]))
+            else:
+                weights[token] = (int(column), [float(w) for w in coef[:, column]])
+        return cls(
+            classes=[c.item() if hasattr(c, "item") else c for c in model.classes_],
+            weights=weights,
+            intercept=float(intercept[0]) if coef.shape[0] == 1 else [float(b) for b in intercept],
+            token_pattern=params["token_pattern"],
+            lowercase=params["lowercase"],
+            ngram_range=params["ngram_range"],
+            binary=params["binary"],
+        )
+
+    # ====== Lưu / Load ======
+    def save(self, path=SCORER_FILE):
+        data = {
+            "format_version": FORMAT_VERSION,
+            "classes": self.classes,
+            "intercept": self.intercept,
+            "token_pattern": self.token_pattern,
+            "lowercase": self.lowercase,
+            "ngram_range": list(self.ngram_range),
+            "binary": self.binary,
+            "weights": self.weights,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path=SCORER_FILE):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Phiên bản scorer không hỗ trợ: {data.get('format_version')}")
+        weights = {token: tuple(value) for token, value in data["weights"].items()}
+        return cls(data["classes"], weights, data["intercept"], data["token_pattern"],
+                   data["lowercase"], data["ngram_range"], data["binary"])
+
+    # ====== Tính điểm ======
+    def _counts(self, text):
+        # Đếm số lần xuất hiện theo cột, giống CountVectorizer
+        counts = {}
+        weights = self.weights
+        for token in self._tokens(str(text)):
+            entry = weights.get(token)
+            if entry is not None:
+                column = entry[0]
+                if column in counts:
+                    counts[column][0] += 1
+                else:
+                    counts[column] = [1, entry[1]]
+        return counts
+
+    def decision(self, text):
+        # Cộng theo thứ tự cột tăng dần như phép nhân ma trận thưa của sklearn
+        counts = self._counts(text)
+        if isinstance(self.intercept, list):
+            scores = [0.0] * len(self.intercept)
+            for column in sorted(counts):
+                count, w = counts[column]
+                count = 1 if self.binary else count
+                for k, wk in enumerate(w):
+                    scores[k] += count * wk
+            return [s + b for s, b in zip(scores, self.intercept)]
+        score = 0.0
+        for column in sorted(counts):
+            count, w = counts[column]
+            score += (1 if self.binary else count) * w
+        return score + self.intercept
+
+    def predict_proba_one(self, text):
+        d = self.decision(text)
+        if isinstance(d, list):
+            top = max(d)
+            exps = [math.exp(x - top) for x in d]
+            total = sum(exps)
+            return [e / total for e in exps]
+        p = _sigmoid(d)
+        return [1.0 - p, p]
+
+    def predict_one(self, text):
+        d = self.decision(text)
+        if isinstance(d, list):
+            return self.classes[max(range(len(d)), key=d.__getitem__)]
+        return self.classes[1] if d > 0 else self.classes[0]
+
+    def predict(self, texts):
+        return [self.predict_one(text) for text in texts]
+
+    def predict_proba(self, texts):
+        return [self.predict_proba_one(text) for text in texts]
+
+
+# ====== Kiểm tra khớp với sklearn ======
+def validate_scorer(scorer, model, vectorizer, texts, tolerance=1e-9):
+    texts = [str(text) for text in texts]
+    features = vectorizer.transform(texts)
+    expected_labels = list(model.predict(features))
+    expected_proba = model.predict_proba(features)
+    label_mismatches = sum(1 for a, b in zip(scorer.predict(texts), expected_labels) if a != b)
+    max_diff = 0.0
+    for row, expected in zip(scorer.predict_proba(texts), expected_proba):
+        max_diff = max(max_diff, max(abs(a - float(b)) for a, b in zip(row, expected)))
+    return {
+        "rows": len(texts),
+        "label_mismatches": label_mismatches,
+        "max_proba_diff": max_diff,
+        "ok": label_mismatches == 0 and max_diff <= tolerance,
+    }
+
+
+# ====== Dòng lệnh ======
+# python -m utils.scorer export
+# python -m utils.scorer validate --file data_test_file.csv
+def main():
+    parser = argparse.ArgumentParser(description="Xuất / kiểm tra FastScorer")
+    parser.add_argument("command", choices=["export", "validate"])
+    parser.add_argument("--model-file", default="lr_model_2label.pkl")
+    parser.add_argument("--vectorizer-file", default="count_2label.pkl")
+    parser.add_argument("--output", default=SCORER_FILE)
+    parser.add_argument("--file", default="data_test_file.csv")
+    parser.add_argument("--column", default="clean_content")
+    args = parser.parse_args()
+
+    import joblib
+    model = joblib.load(args.model_file)
+    vectorizer = joblib.load(args.vectorizer_file)
+    scorer = FastScorer.from_sklearn(model, vectorizer)
+
+    if args.command == "export":
+        scorer.save(args.output)
+        print(f"Đã xuất scorer ({len(scorer.weights)} token) -> {args.output}")
+    else:
+        import pandas as pd
+        texts = pd.read_csv(args.file)[args.column].fillna("").tolist()
+        report = validate_scorer(scorer, model, vectorizer, texts)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        if not report["ok"]:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# utils/stream.py
+
+import os
+import time
+import tempfile
+from collections import Counter
+import pandas as pd
+import utils.func
+import utils.cache
+import utils.banned
+import utils.metrics
+import utils.dedup
+
+# ====== Cấu hình ======
+CHUNK_SIZE = 5000       # số dòng mỗi khối
+PREVIEW_ROWS = 1000     # số dòng giữ lại để hiển thị trên giao diện
+
+# ====== Đọc file tải lên theo khối ======
+def _file_size(uploaded_file):
+    size = getattr(uploaded_file, "size", None)
+    if size is None:
+        pos = uploaded_file.tell()
+        uploaded_file.seek(0, os.SEEK_END)
+        size = uploaded_file.tell()
+        uploaded_file.seek(pos)
+    return size or 1
+
+def iter_upload_chunks(uploaded_file, file_name, chunksize=CHUNK_SIZE):
+    # Trả về các bộ (DataFrame của khối, tỉ lệ đã đọc 0..1)
+    if file_name.endswith((".csv", ".txt")):
+        size = _file_size(uploaded_file)
+        delimiter = "\t" if file_name.endswith(".txt") else ","
+        for chunk in pd.read_csv(uploaded_file, delimiter=delimiter, chunksize=chunksize):
+            yield chunk, min(uploaded_file.tell() / size, 1.0)
+    elif file_name.endswith(".xlsx"):
+        # openpyxl ở chế độ read_only đọc từng dòng, không nạp cả sheet
+        from openpyxl import load_workbook
+        workbook = load_workbook(uploaded_file, read_only=True, data_only=True)
+        try:
+            sheet = workbook.active
+            total = sheet.max_row or 0
+            rows = sheet.iter_rows(values_only=True)
+            header = [str(h) if h is not None else "" for h in next(rows, [])]
+            buffer, done = [], 1
+            for row in rows:
+                buffer.append(row)
+                if len(buffer) >= chunksize:
+                    done += len(buffer)
+                    yield pd.DataFrame(buffer, columns=header), done / total if total else 0.0
+                    buffer = []
+            if buffer:
+                yield pd.DataFrame(buffer, columns=header), 1.0
+        finally:
+            workbook.close()
+    elif file_name.endswith(".xls"):
+        # Định dạng .xls cũ không đọc được theo dòng, đành đọc cả file rồi chia khối
+        df = pd.read_excel(uploaded_file)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize], min((start + chunksize) / max(len(df), 1), 1.0)
+    else:
+        raise ValueError("Định dạng file không được hỗ trợ.")
+
+# ====== Xử lý một khối ======
+def label_chunk(df, text_cache, matcher, near_duplicates=False):
+    # Chỉ dịch / làm sạch / kiểm tra từ cấm mỗi nhóm bình luận trùng khớp một lần rồi trả kết quả về mọi dòng.
+    # near_duplicates: các nhóm gần trùng chỉ dùng chung nhãn cảm xúc của bình luận đại diện;
+    # clean_content và has_bad_words vẫn là của chính từng bình luận.
+    # Trả về (DataFrame đã gán nhãn, số dòng được bỏ qua bước dịch / làm sạch nhờ gộp).
+    df = df.copy()
+    with utils.metrics.timer("dedup"):
+        groups = utils.dedup.collapse(df["content"], near=near_duplicates)
+    exact = groups.exact
+    _, clean_content = utils.cache.translate_and_clean(exact.unique, text_cache)
+    clean_content = clean_content.tolist()
+    sentiment = utils.func.predict_labels([clean_content[i] for i in groups.representatives])
+    with utils.metrics.timer("banned_words"):
+        has_bad_words = matcher.mask(clean_content)
+    df["clean_content"] = exact.scatter(clean_content)
+    df["sentiment"] = groups.scatter(sentiment)
+    df["has_bad_words"] = exact.scatter(has_bad_words).astype(bool)
+    utils.metrics.inc("dedup_saved_rows_total", exact.saved)
+    return df, exact.saved
+
+# ====== Gán nhãn cả file theo luồng ======
+def label_upload(uploaded_file, file_name, text_cache, progress=None,
+                 chunksize=CHUNK_SIZE, preview_rows=PREVIEW_ROWS, output_path=None, near_duplicates=False):
+    # Đọc -> làm sạch -> dự đoán -> ghi nối tiếp vào file CSV tạm, từng khối một.
+    # Bộ nhớ chỉ phụ thuộc kích thước khối, không phụ thuộc kích thước file.
+    # progress(fraction, rows, eta_seconds) được gọi sau mỗi khối.
+    if output_path is None:
+        fd, output_path = tempfile.mkstemp(prefix="ket_qua_du_doan_", suffix=".csv")
+        os.close(fd)
+    matcher = utils.banned.get_matcher("bad_words.txt")
+    sentiment_counts = Counter()
+    preview = []
+    rows = bad_rows = saved_rows = 0
+    started = time.monotonic()
+
+    # Lỗi giữa chừng (thiếu cột content, file hỏng...): xóa file kết quả dở dang, không để rác trong thư mục tạm
+    try:
+        with open(output_path, "w", encoding="utf-8-sig", newline="") as out:
+            for i, (chunk, fraction) in enumerate(iter_upload_chunks(uploaded_file, file_name, chunksize)):
+                if i == 0 and "content" not in chunk.columns:
+                    raise ValueError("File cần có cột tên là `content`.")
+                with utils.metrics.timer("label_chunk"):
+                    labeled, saved = label_chunk(chunk, text_cache, matcher, near_duplicates)
+                labeled.to_csv(out, index=False, header=(i == 0))
+
+                rows += len(labeled)
+                saved_rows += saved
+                bad_rows += int(labeled["has_bad_words"].sum())
+                sentiment_counts.update(labeled["sentiment"])
+                if sum(len(p) for p in preview) < preview_rows:
+                    preview.append(labeled[["content", "clean_content", "sentiment"]])
+
+                if progress:
+                    elapsed = time.monotonic() - started
+                    eta = elapsed / fraction * (1 - fraction) if fraction > 0 else None
+                    progress(fraction, rows, eta)
+    except BaseException:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+
+    seconds = time.monotonic() - started
+    # Thông lượng của trang gán nhãn: tốc độ = labeling_rows_total / labeling_seconds_total
+    utils.metrics.inc("labeling_files_total")
+    utils.metrics.inc("labeling_rows_total", rows)
+    utils.metrics.inc("labeling_seconds_total", seconds)
+    utils.metrics.set_gauge("labeling_last_rows_per_second", rows / seconds if seconds else 0.0)
+
+    preview_df = pd.concat(preview, ignore_index=True).head(preview_rows) if preview else pd.DataFrame()
+    return {
+        "output_path": output_path,
+        "rows": rows,
+        "bad_rows": bad_rows,
+        "saved_rows": saved_rows,
+        "sentiment_counts": pd.Series(sentiment_counts).sort_values(ascending=False),
+        "preview": preview_df,
+        "seconds": seconds,
+    }
@@ -0,0 +1,113 @@
+# utils/translate.py
+
+import os
+import re
+import time
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import utils.metrics
+
+# ====== Cấu hình ======
+STOPWORDS_FILE = "vietnamese-stopwords.txt"
+TRANSLATE_WORKERS = int(os.environ.get("TRANSLATE_WORKERS", 8))
+TRANSLATE_BATCH_SIZE = 20
+TRANSLATE_TIMEOUT = 15   # giây cho mỗi lô
+TRANSLATE_RETRIES = 2
+
+# Chữ cái chỉ có trong tiếng Việt (không trùng với dấu của tiếng Pháp, Tây Ban Nha...)
+VIETNAMESE_ONLY_CHARS = set(
+    "ăđơư"
+    "ạảấầẩẫậắằẳẵặẹẻẽếềểễệỉịọỏốồổỗộớờởỡợụủứừửữựỳỵỷỹĩũ"
+)
+letter_pattern = re.compile(r"[^\W\d_]+")
+
+# ====== Từ vựng tiếng Việt ======
+@lru_cache(maxsize=None)
+def load_vietnamese_vocabulary(file_path=STOPWORDS_FILE):
+    # Tách các cụm trong vietnamese-stopwords.txt thành từng âm tiết
+    from utils.func import short_word_dict
+    vocabulary = set(short_word_dict)
+    for expansion in short_word_dict.values():
+        vocabulary.update(expansion.split())
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            for line in f:
+                vocabulary.update(line.strip().lower().split())
+    except OSError:
+        pass
+    return frozenset(vocabulary)
+
+# ====== Nhận diện tiếng Việt ======
+def is_vietnamese(text, threshold=0.5):
+    # Nhận diện nhanh tại chỗ, không cần gọi mạng:
+    # 1) có chữ cái đặc trưng tiếng Việt -> tiếng Việt
+    # 2) không có chữ cái nào (số, emoji...) -> không cần dịch
+    # 3) tỉ lệ từ thuộc từ vựng tiếng Việt >= threshold -> tiếng Việt
+    text = str(text).lower()
+    if not VIETNAMESE_ONLY_CHARS.isdisjoint(text):
+        return True
+    words = letter_pattern.findall(text)
+    if not words:
+        return True
+    vocabulary = load_vietnamese_vocabulary()
+    known = sum(1 for w in words if w in vocabulary)
+    return known / len(words) >= threshold
+
+# ====== Dịch theo lô, đồng thời ======
+def google_translate_batch(texts):
+    from deep_translator import GoogleTranslator
+    translator = GoogleTranslator(source='auto', target='vi')
+    return [translator.translate(text) for text in texts]
+
+_executor = None
+
+def _get_executor(workers):
+    global _executor
+    if _executor is None or _executor._max_workers != workers:
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="translate")
+    return _executor
+
+def _translate_with_retry(translator, texts, retries):
+    for attempt in range(retries + 1):
+        try:
+            result = list(translator(texts))
+            if len(result) == len(texts):
+                return [r if r else t for r, t in zip(result, texts)]
+        except Exception:
+            pass
+        if attempt < retries:
+            time.sleep(0.5 * 2 ** attempt)
+    return list(texts)  # hết số lần thử: giữ nguyên văn bản gốc như translate_to_vietnamese
+
+@utils.metrics.timed("translate")
+def translate_batch(texts, translator=None, workers=TRANSLATE_WORKERS,
+                    batch_size=TRANSLATE_BATCH_SIZE, timeout=TRANSLATE_TIMEOUT,
+                    retries=TRANSLATE_RETRIES):
+    # Chỉ các dòng không phải tiếng Việt mới được gửi đi dịch.
+    # translator: hàm nhận list[str] và trả về list[str] (mặc định Google Translate);
+    # truyền vào một hàm giả lập để chạy không cần mạng.
+    translator = translator or google_translate_batch
+    texts = [str(text) for text in texts]
+    results = list(texts)
+    pending = [i for i, text in enumerate(texts) if not is_vietnamese(text)]
+    if not pending:
+        return results
+
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    executor = _get_executor(workers)
+    futures = [
+        executor.submit(_translate_with_retry, translator, [texts[i] for i in batch], retries)
+        for batch in batches
+    ]
+    # Mỗi lô có tối đa `timeout` giây; các lô xếp hàng chờ luồng rảnh được cộng thêm thời gian
+    rounds = -(-len(batches) // workers)
+    deadline = time.monotonic() + timeout * rounds
+    for batch, future in zip(batches, futures):
+        try:
+            translated = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            future.cancel()
+            continue  # quá thời gian: giữ nguyên văn bản gốc
+        for i, value in zip(batch, translated):
+            results[i] = value
+    return results